@@ -19,6 +19,54 @@ class Settings(BaseModel):
         ),
         description="SQLAlchemy connection URL",
     )
+    database_async: bool = Field(
+        default_factory=lambda: os.getenv("DATABASE_ASYNC", "false").lower() == "true",
+        description="Serve requests with an AsyncSession on the event loop instead of sync sessions on the threadpool",
+    )
+    database_replica_urls: List[str] = Field(
+        default_factory=lambda: [
+            url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+        ],
+        description="Read replicas serving read-only endpoints; empty sends reads to the primary",
+    )
+    database_replica_selection: str = Field(
+        default_factory=lambda: os.getenv("DATABASE_REPLICA_SELECTION", "round_robin").lower(),
+        description="How a replica is picked per request: round_robin or least_connections",
+    )
+    read_your_writes_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("READ_YOUR_WRITES_SECONDS", "5")),
+        description="After a write, reads of the same user go to the primary for this long",
+    )
+    db_pool_size: int = Field(default_factory=lambda: int(os.getenv("DB_POOL_SIZE", "5")))
+    db_max_overflow: int = Field(default_factory=lambda: int(os.getenv("DB_MAX_OVERFLOW", "10")))
+    db_pool_timeout: float = Field(
+        default_factory=lambda: float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        description="Seconds a request waits for a free connection before failing",
+    )
+    db_pool_recycle: int = Field(
+        default_factory=lambda: int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        description="Replace connections older than this many seconds; -1 keeps them forever",
+    )
+    db_pool_use_lifo: bool = Field(
+        default_factory=lambda: os.getenv("DB_POOL_USE_LIFO", "true").lower() == "true",
+        description="Reuse the most recently returned connection so surplus ones can time out server-side",
+    )
+    db_pool_pre_ping: bool = Field(
+        default_factory=lambda: os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+        description="Ping on every checkout; off by default in favour of pinging only idle connections",
+    )
+    db_pool_idle_ping_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("DB_POOL_IDLE_PING_SECONDS", "30")),
+        description="Ping a connection at checkout when it sat idle in the pool this long; 0 disables",
+    )
+    db_pool_warmup_connections: int = Field(
+        default_factory=lambda: int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "0")),
+        description="Connections opened in every pool at startup, before the app serves requests; 0 disables",
+    )
+    db_pgbouncer: bool = Field(
+        default_factory=lambda: os.getenv("DB_PGBOUNCER", "false").lower() == "true",
+        description="Running behind PgBouncer: no client-side pool and no server-side prepared statements",
+    )
 
     jwt_secret_key: str = Field(
         default_factory=lambda: os.getenv("JWT_SECRET", "L9k9M9W9bQXdd6cojXruU2pZTd7rsiAjpCB")
@@ -27,6 +75,45 @@ class Settings(BaseModel):
     jwt_expiration_ms: int = Field(
         default_factory=lambda: int(os.getenv("JWT_EXPIRATION_MS", "86400000"))
     )
+    jwt_embed_claims: bool = Field(
+        default_factory=lambda: os.getenv("JWT_EMBED_CLAIMS", "false").lower() == "true",
+        description="Issue tokens carrying user id, role and token version for database-free authorization",
+    )
+    jwt_token_cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("JWT_TOKEN_CACHE_ENABLED", "true").lower() == "true",
+        description="Keep verified token claims in memory until the token expires",
+    )
+    jwt_token_cache_size: int = Field(default_factory=lambda: int(os.getenv("JWT_TOKEN_CACHE_SIZE", "4096")))
+    bcrypt_rounds: int = Field(
+        default_factory=lambda: int(os.getenv("BCRYPT_ROUNDS", "12")),
+        description="bcrypt cost factor; hashes with another cost are upgraded on login",
+    )
+    password_hash_workers: int = Field(
+        default_factory=lambda: int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))),
+        description="Processes hashing and verifying passwords; 0 hashes in the request thread",
+    )
+    token_version_cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", "30")),
+        description="How long a user's token version is trusted before being re-read from the database",
+    )
+
+    sql_repeat_threshold: int = Field(
+        default_factory=lambda: int(os.getenv("SQL_REPEAT_THRESHOLD", "10")),
+        description="Flag requests running the same statement more than this many times; 0 disables",
+    )
+    sql_repeat_raise: bool = Field(
+        default_factory=lambda: os.getenv("SQL_REPEAT_RAISE", "false").lower() == "true",
+        description="Fail such requests instead of logging a warning (meant for test runs)",
+    )
+
+    metrics_enabled: bool = Field(
+        default_factory=lambda: os.getenv("METRICS_ENABLED", "true").lower() == "true",
+        description="Collect Prometheus metrics and serve them on /metrics",
+    )
+    metrics_token: Optional[str] = Field(
+        default_factory=lambda: os.getenv("METRICS_TOKEN") or None,
+        description="Static bearer token of the Prometheus scraper; without it /metrics requires an admin token",
+    )
 
     cors_allowed_origins: List[str] = Field(
         default_factory=lambda: [
@@ -51,12 +138,51 @@ class Settings(BaseModel):
         default_factory=lambda: [
             header.strip()
             for header in os.getenv(
-                "CORS_ALLOWED_HEADERS", "Authorization,Content-Type,Accept,Origin"
+                "CORS_ALLOWED_HEADERS", "Authorization,Content-Type,Accept,Origin,If-Match,If-None-Match"
             ).split(",")
             if header.strip()
         ]
     )
 
+    count_estimate_threshold: int = Field(
+        default_factory=lambda: int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "10000")),
+        description="Below this planner estimate, `count=estimate` falls back to an exact count",
+    )
+    count_cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("COUNT_CACHE_TTL_SECONDS", "0")),
+        description="Lifetime of cached listing totals; 0 disables the cache",
+    )
+    count_cache_size: int = Field(default_factory=lambda: int(os.getenv("COUNT_CACHE_SIZE", "1024")))
+
+    import_batch_size: int = Field(
+        default_factory=lambda: int(os.getenv("IMPORT_BATCH_SIZE", "1000")),
+        description="Records validated, checked and inserted together by bulk imports",
+    )
+    export_batch_size: int = Field(
+        default_factory=lambda: int(os.getenv("EXPORT_BATCH_SIZE", "1000")),
+        description="Rows fetched per round trip from the server-side cursor of exports",
+    )
+    batch_get_max_ids: int = Field(
+        default_factory=lambda: int(os.getenv("BATCH_GET_MAX_IDS", "200")),
+        description="Most ids accepted by one `batch-get` request",
+    )
+    bulk_max_ids: int = Field(
+        default_factory=lambda: int(os.getenv("BULK_MAX_IDS", "1000")),
+        description="Most ids accepted by one bulk update or delete",
+    )
+
+    reference_data_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("REFERENCE_DATA_TTL_SECONDS", "3600")),
+        description="How long the reference-data bundle is kept before re-reading the specialties, "
+        "and its max-age for clients",
+    )
+
+    principal_cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60")),
+        description="Lifetime of cached authenticated users; 0 disables the cache",
+    )
+    principal_cache_size: int = Field(default_factory=lambda: int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")))
+
     @property
     def jwt_expiration_seconds(self) -> int:
         return self.jwt_expiration_ms // 1000
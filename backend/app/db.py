@@ -1,19 +1,335 @@
+"""Engines, sessions and the declarative base.
+
+Nothing connects, or even creates an engine, at import time. The engines are built by
+:func:`init_engines`, which the app lifespan calls at startup and every session factory
+calls on first use otherwise (scripts, benchmarks, clients that skip the lifespan).
+Importing the models therefore stays cheap, and a process that forks workers after
+importing the app hands them no pools. A worker forked after the engines were built
+drops the inherited pools without closing the parent's sockets, see
+:func:`_discard_inherited_pools`.
+"""
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Generator
+import itertools
+import logging
+import os
+import threading
+from contextlib import AsyncExitStack, ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence, TypeVar, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+# Starlette's function, which fastapi.concurrency re-exports: importing it from here
+# does not load all of FastAPI for the models and scripts.
+from starlette.concurrency import run_in_threadpool
 
 from app.config import settings
+from app.pool import engine_options, ping_idle_on_checkout
+
+R = TypeVar("R")
 
+logger = logging.getLogger(__name__)
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 Base = declarative_base()
 
 
+class _LazySessionmaker(sessionmaker):
+    """``sessionmaker`` of the primary engine, which it has :func:`init_engines` create when needed."""
+
+    def __call__(self, **local_kw: Any) -> Session:
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            init_engines()
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw: Any) -> AsyncSession:
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            init_engines()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autoflush=False, autocommit=False, expire_on_commit=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
+
+
+class ReadOnlySession(Session):
+    """Session whose transactions are started with ``SET TRANSACTION READ ONLY``."""
+
+
+@event.listens_for(ReadOnlySession, "after_begin")
+def _set_read_only(session, transaction, connection) -> None:
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current transaction of ``db`` commits; drop it on rollback.
+
+    For in-process caches mirroring rows: updating them before the commit lets a
+    concurrent request cache the old row again, and leaves them wrong on rollback.
+    A callback registered inside a savepoint is dropped when that savepoint rolls back.
+    """
+    transaction = db.get_nested_transaction() or db.get_transaction()
+    db.info.setdefault(_AFTER_COMMIT, []).append((transaction, callback))
+
+
+def _within(transaction: Any, ancestor: Any) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session) -> None:
+    for _, callback in session.info.pop(_AFTER_COMMIT, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back(session, previous_transaction) -> None:
+    callbacks = session.info.get(_AFTER_COMMIT)
+    if callbacks:
+        session.info[_AFTER_COMMIT] = [
+            (transaction, callback)
+            for transaction, callback in callbacks
+            if not _within(transaction, previous_transaction)
+        ]
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_after_commit(session, transaction) -> None:
+    # Fires after ``after_commit``: whatever is left was never committed (e.g. closed).
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT, None)
+
+
+class ReplicaSelector:
+    """Pick the engine serving the next read: round robin or fewest checked-out connections."""
+
+    def __init__(self, engines: Sequence[Any], strategy: str) -> None:
+        self._engines = list(engines)
+        self._least_connections = strategy == "least_connections"
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self._engines)
+
+    def pick(self) -> Any:
+        if self._least_connections:
+            return min(self._engines, key=_checked_out)
+        return self._engines[next(self._counter) % len(self._engines)]
+
+
+def _checked_out(engine: Any) -> int:
+    pool = engine.sync_engine.pool if isinstance(engine, AsyncEngine) else engine.pool
+    return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+ReadSessionLocal = sessionmaker(class_=ReadOnlySession, autoflush=False, autocommit=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(sync_session_class=ReadOnlySession, autoflush=False, expire_on_commit=False)
+
+
+@dataclass(frozen=True)
+class Engines:
+    """The engines of this process: the primary and the replicas, sync and, with ``DATABASE_ASYNC``, async."""
+
+    primary: Engine
+    replicas: List[Engine]
+    async_primary: Optional[AsyncEngine]
+    async_replicas: List[AsyncEngine]
+    replica_selector: ReplicaSelector
+    async_replica_selector: ReplicaSelector
+
+    def by_name(self) -> Dict[str, Engine]:
+        engines = {"sync": self.primary}
+        if self.async_primary is not None:
+            engines["async"] = self.async_primary.sync_engine
+        for index, replica in enumerate(self.replicas):
+            engines[f"replica{index}"] = replica
+        for index, async_replica in enumerate(self.async_replicas):
+            engines[f"replica{index}-async"] = async_replica.sync_engine
+        return engines
+
+
+_engines: Optional[Engines] = None
+_engines_lock = threading.Lock()
+_init_hooks: List[Callable[[Dict[str, Engine]], None]] = []
+
+
+def _create_engines() -> Engines:
+    primary = create_engine(settings.database_url, **engine_options(settings))
+    replicas = [create_engine(url, **engine_options(settings)) for url in settings.database_replica_urls]
+
+    async_primary: Optional[AsyncEngine] = None
+    async_replicas: List[AsyncEngine] = []
+    if settings.database_async:
+        async_options = engine_options(settings, is_async=True)
+        async_primary = create_async_engine(settings.database_url, **async_options)
+        async_replicas = [create_async_engine(url, **async_options) for url in settings.database_replica_urls]
+
+    async_engines = [async_primary, *async_replicas] if async_primary is not None else []
+    for pooled_engine in (primary, *replicas, *(async_engine.sync_engine for async_engine in async_engines)):
+        ping_idle_on_checkout(pooled_engine, settings.db_pool_idle_ping_seconds)
+
+    return Engines(
+        primary=primary,
+        replicas=replicas,
+        async_primary=async_primary,
+        async_replicas=async_replicas,
+        replica_selector=ReplicaSelector(replicas, settings.database_replica_selection),
+        async_replica_selector=ReplicaSelector(async_replicas, settings.database_replica_selection),
+    )
+
+
+def init_engines() -> Engines:
+    """Create the engines once per process and bind the session factories to them."""
+    global _engines
+    engines = _engines
+    if engines is not None:
+        return engines
+    with _engines_lock:
+        if _engines is None:
+            engines = _create_engines()
+            SessionLocal.configure(bind=engines.primary)
+            if engines.async_primary is not None:
+                AsyncSessionLocal.configure(bind=engines.async_primary)
+            by_name = engines.by_name()
+            for hook in _init_hooks:
+                hook(by_name)
+            _engines = engines
+        return _engines
+
+
+def on_engines_created(hook: Callable[[Dict[str, Engine]], None]) -> None:
+    """Call ``hook`` with :func:`engines_by_name` once the engines exist, right away if they do already.
+
+    Used to attach event listeners (metrics, query statistics) without creating the
+    engines early. A hook registered again, e.g. by every ``create_app()`` of a test
+    suite, is ignored: it would attach its listeners twice.
+    """
+    with _engines_lock:
+        if hook in _init_hooks:
+            return
+        _init_hooks.append(hook)
+        engines = _engines
+    if engines is not None:
+        hook(engines.by_name())
+
+
+async def warm_up_pools(connections: int) -> None:
+    """Open up to ``connections`` connections in every pool, so the first requests do not pay for them.
+
+    Capped at each pool's size, since overflow connections are closed on checkin. A
+    failure is logged: the API must start even when the database is not up yet.
+    """
+    if connections <= 0:
+        return
+    engines = init_engines()
+    try:
+        for sync_engine in (engines.primary, *engines.replicas):
+            await run_in_threadpool(_open_connections, sync_engine, _warm_up_count(sync_engine, connections))
+        if engines.async_primary is not None:
+            for async_engine in (engines.async_primary, *engines.async_replicas):
+                await _open_async_connections(async_engine, _warm_up_count(async_engine.sync_engine, connections))
+    except Exception:  # noqa: BLE001 - connections missing now are opened on demand
+        logger.exception("Could not warm up the connection pools")
+
+
+def _warm_up_count(engine: Engine, connections: int) -> int:
+    pool = engine.pool
+    return min(connections, pool.size()) if isinstance(pool, QueuePool) else 0
+
+
+def _open_connections(engine: Engine, count: int) -> None:
+    with ExitStack() as stack:
+        for _ in range(count):
+            stack.enter_context(engine.connect())
+
+
+async def _open_async_connections(engine: AsyncEngine, count: int) -> None:
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            await stack.enter_async_context(engine.connect())
+
+
+async def dispose_engines() -> None:
+    """Close the pooled connections at shutdown; the engines stay usable and reconnect if needed."""
+    engines = _engines
+    if engines is None:
+        return
+    if engines.async_primary is not None:
+        for async_engine in (engines.async_primary, *engines.async_replicas):
+            await async_engine.dispose()
+    for sync_engine in (engines.primary, *engines.replicas):
+        await run_in_threadpool(sync_engine.dispose)
+
+
+def _discard_inherited_pools() -> None:
+    """Give a forked child fresh pools; ``close=False`` leaves the sockets to the parent still using them."""
+    engines = _engines
+    if engines is not None:
+        for db_engine in engines.by_name().values():
+            db_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_discard_inherited_pools)
+
+
+def read_engine(use_primary: bool = False) -> Engine:
+    """Engine for a read-only session: a replica unless ``use_primary`` or none is configured."""
+    engines = init_engines()
+    return engines.replica_selector.pick() if engines.replica_selector and not use_primary else engines.primary
+
+
+def async_read_engine(use_primary: bool = False) -> AsyncEngine:
+    engines = init_engines()
+    if engines.async_replica_selector and not use_primary:
+        return engines.async_replica_selector.pick()
+    return engines.async_primary
+
+
+def engines_by_name() -> Dict[str, Engine]:
+    """Every engine of the app, keyed by its name in metrics and ``/health/pool``.
+
+    Async engines are listed through their sync facade, which is what pool and cursor
+    events attach to.
+    """
+    return init_engines().by_name()
+
+
+_ENGINE_ATTRIBUTES = {
+    "engine": "primary",
+    "async_engine": "async_primary",
+    "replica_engines": "replicas",
+    "async_replica_engines": "async_replicas",
+    "replicas": "replica_selector",
+    "async_replicas": "async_replica_selector",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """The former module-level engines (``from app.db import engine``), created on access."""
+    field = _ENGINE_ATTRIBUTES.get(name)
+    if field is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(init_engines(), field)
+
+
+DbSession = Union[Session, AsyncSession]
+
+
 @contextmanager
 def session_scope() -> Generator:
     session = SessionLocal()
@@ -25,3 +341,23 @@ def session_scope() -> Generator:
         raise
     finally:
         session.close()
+
+
+async def run_db(db: DbSession, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+    """Call a service function written against a sync ``Session`` from async code.
+
+    With an ``AsyncSession`` the function runs through ``run_sync``: it executes on the
+    event loop and its queries are awaited by the async driver, so no thread is held.
+    With a sync ``Session`` (``DATABASE_ASYNC=false``) it runs on the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def commit_db(db: DbSession) -> None:
+    """Commit ``db`` from async code; a sync ``Session`` commits on the threadpool."""
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        await run_in_threadpool(db.commit)
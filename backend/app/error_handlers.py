@@ -7,6 +7,7 @@ from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.schemas.common import ApiError, ApiErrorDetail
 
@@ -17,6 +18,7 @@ _STATUS_CODE_MAPPING = {
     status.HTTP_404_NOT_FOUND: ("Not Found", "ERR_NOT_FOUND"),
     status.HTTP_405_METHOD_NOT_ALLOWED: ("Method Not Allowed", "ERR_METHOD_NOT_ALLOWED"),
     status.HTTP_409_CONFLICT: ("Conflict", "ERR_CONFLICT"),
+    status.HTTP_412_PRECONDITION_FAILED: ("Precondition Failed", "ERR_PRECONDITION_FAILED"),
     status.HTTP_422_UNPROCESSABLE_ENTITY: ("Unprocessable Entity", "ERR_VALIDATION"),
     status.HTTP_500_INTERNAL_SERVER_ERROR: ("Internal Server Error", "ERR_INTERNAL"),
 }
@@ -92,6 +94,23 @@ async def _integrity_error_handler(request: Request, exc: IntegrityError) -> Res
     return JSONResponse(status_code=status.HTTP_409_CONFLICT, content=body)
 
 
+async def _stale_data_error_handler(request: Request, exc: StaleDataError) -> Response:
+    # The row changed between the read and the versioned UPDATE. A client that sent
+    # ``If-Match`` made the write conditional on that version: its precondition failed.
+    status_code = (
+        status.HTTP_412_PRECONDITION_FAILED if "if-match" in request.headers else status.HTTP_409_CONFLICT
+    )
+    error, code = _STATUS_CODE_MAPPING[status_code]
+    body = _build_error(
+        request=request,
+        status_code=status_code,
+        message="O registro foi alterado por outra requisição. Recarregue e tente novamente.",
+        code=code,
+        error=error,
+    )
+    return JSONResponse(status_code=status_code, content=body)
+
+
 async def _generic_exception_handler(request: Request, exc: Exception) -> Response:
     body = _build_error(
         request=request,
@@ -107,4 +126,5 @@ def register_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(RequestValidationError, _validation_exception_handler)
     app.add_exception_handler(HTTPException, _http_exception_handler)
     app.add_exception_handler(IntegrityError, _integrity_error_handler)
+    app.add_exception_handler(StaleDataError, _stale_data_error_handler)
     app.add_exception_handler(Exception, _generic_exception_handler)
@@ -1,20 +1,60 @@
+"""Application factory.
+
+Routers, and the services and schemas behind them, are imported by :func:`create_app`
+and the module-level ``app`` is only built when first accessed (``uvicorn
+app.main:app``): importing this module for ``create_app`` stays cheap, e.g. in test
+collection. The lifespan creates the database engines, optionally fills their pools,
+and disposes of them at shutdown, along with the password hashing workers.
+"""
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import Engine
 
+from app import metrics as app_metrics
+from app import query_stats
 from app.config import settings
+from app.db import dispose_engines, init_engines, on_engines_created, warm_up_pools
 from app.error_handlers import register_exception_handlers
-from app.middleware import CorrelationIdMiddleware
-from app.routers import auth, doctors, domains, health, patients, users
+from app.middleware import CorrelationIdMiddleware, MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    from app import reference_data
+    from app.security import password
+
+    init_engines()
+    await warm_up_pools(settings.db_pool_warmup_connections)
+    await run_in_threadpool(reference_data.warm_up)
+    try:
+        yield
+    finally:
+        password.shutdown_executor()
+        await dispose_engines()
+
+
+def _instrument_engines(engines: Dict[str, Engine]) -> None:
+    for name, db_engine in engines.items():
+        query_stats.instrument_engine(db_engine)
+        if settings.metrics_enabled:
+            app_metrics.instrument_engine(db_engine, name)
 
 
 def create_app() -> FastAPI:
+    from app.routers import auth, doctors, domains, health, metrics, patients, users
+
     app = FastAPI(
         title=settings.app_name,
         debug=settings.debug,
         openapi_url="/v3/api-docs",
         docs_url="/swagger-ui",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -23,9 +63,12 @@ def create_app() -> FastAPI:
         allow_credentials=settings.cors_allow_credentials,
         allow_methods=settings.cors_allowed_methods,
         allow_headers=settings.cors_allowed_headers,
-        expose_headers=["Authorization", "X-Correlation-Id"],
+        expose_headers=["Authorization", "ETag", "X-Correlation-Id", "Server-Timing"],
     )
     app.add_middleware(CorrelationIdMiddleware)
+    on_engines_created(_instrument_engines)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
 
     prefix = settings.api_prefix or ""
     app.include_router(health.router, prefix=prefix)
@@ -34,10 +77,16 @@ def create_app() -> FastAPI:
     app.include_router(patients.router, prefix=prefix)
     app.include_router(doctors.router, prefix=prefix)
     app.include_router(domains.router, prefix=prefix)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
     register_exception_handlers(app)
 
     return app
 
 
-app = create_app()
+def __getattr__(name: str) -> Any:
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
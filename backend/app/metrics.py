@@ -0,0 +1,159 @@
+"""Prometheus metrics of the API.
+
+Metrics live in the default registry of ``prometheus_client``. When the service runs
+with several worker processes, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory
+shared by the workers: each process then writes its samples to memory-mapped files
+there and ``/metrics`` aggregates all of them, whichever worker answers the scrape.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, List, Set, Tuple
+
+from anyio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests served, by route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving HTTP requests, by route template.",
+    ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Connections handed out by the SQLAlchemy pool.",
+    ["engine"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the SQLAlchemy pool.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections currently open beyond the pool size.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool, including opening new ones.",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads",
+    "Worker threads of the request threadpool currently in use.",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_LIMIT = Gauge(
+    "threadpool_max_threads",
+    "Size of the request threadpool.",
+    multiprocess_mode="livesum",
+)
+LOGINS = Counter(
+    "auth_logins_total",
+    "Login attempts, by outcome.",
+    ["outcome"],
+)
+LOGIN_SUCCEEDED = LOGINS.labels("success")
+LOGIN_FAILED = LOGINS.labels("failure")
+
+_request_children: Dict[Tuple[str, str, int], tuple] = {}
+_instrumented_engines: Set[int] = set()
+_pool_samplers: List[Callable[[], None]] = []
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    """Record a served request.
+
+    The labelled children are resolved once per ``(method, route, status)`` and reused,
+    so the hot path is a dict lookup plus the metric updates.
+    """
+    key = (method, route, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children.setdefault(
+            key,
+            (REQUESTS.labels(method, route, str(status)), REQUEST_DURATION.labels(method, route)),
+        )
+    children[0].inc()
+    children[1].observe(seconds)
+
+
+def observe_threadpool() -> None:
+    """Sample the usage of the threadpool running sync endpoints and dependencies."""
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_LIMIT.set(limiter.total_tokens)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Track checkouts, checked-out connections, overflow and wait time of ``engine``'s pool.
+
+    Checkouts are counted from pool events; overflow is sampled by
+    :func:`observe_pools` after each request and on scrape.
+    """
+    if id(engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(engine))
+
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        checkouts.inc()
+        checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        checked_out.dec()
+
+    pool = engine.pool
+    if hasattr(pool, "on_wait"):
+        pool.on_wait = DB_POOL_WAIT.labels(name).observe
+    if hasattr(pool, "overflow"):
+        overflow = DB_POOL_OVERFLOW.labels(name)
+        _pool_samplers.append(lambda: overflow.set(max(pool.overflow(), 0)))
+
+
+def observe_pools() -> None:
+    for sample in _pool_samplers:
+        sample()
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition of all metrics, aggregated across workers in multiprocess mode."""
+    observe_threadpool()
+    observe_pools()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
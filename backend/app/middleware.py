@@ -1,19 +1,120 @@
 from __future__ import annotations
 
-from typing import Callable
+import logging
+import time
+from typing import List, Optional, Tuple
 from uuid import uuid4
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app import metrics, query_stats
+
+logger = logging.getLogger(__name__)
+
+ServerTiming = Tuple[str, float, Optional[str]]
+
+
+def _format_server_timing(timings: List[ServerTiming]) -> str:
+    metrics = []
+    for name, duration_ms, description in timings:
+        metric = f"{name};dur={duration_ms:.3f}"
+        if description:
+            metric += f';desc="{description}"'
+        metrics.append(metric)
+    return ", ".join(metrics)
+
+
+class CorrelationIdMiddleware:
+    """Propagate ``X-Correlation-Id`` and report the request duration in ``Server-Timing``.
+
+    Written as a plain ASGI middleware: unlike ``BaseHTTPMiddleware`` it does not run
+    the endpoint in a separate task or re-wrap the response body, so streaming
+    responses pass through untouched. The ``app`` metric is measured until the
+    response headers are sent, i.e. the time to first byte; ``db`` holds the number of
+    queries and the database time up to that point.
+    """
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
     header = "X-Correlation-Id"
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
-        correlation_id = request.headers.get(self.header, "") or str(uuid4())
-        request.state.correlation_id = correlation_id
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        correlation_id = Headers(scope=scope).get(self.header, "") or str(uuid4())
+        state = scope.setdefault("state", {})
+        state["correlation_id"] = correlation_id
+        stats_token = query_stats.start_request(correlation_id)
+        stats = query_stats.current()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers[self.header] = correlation_id
+                headers.append(
+                    "Server-Timing",
+                    _format_server_timing([("db", stats.duration_ms, f"{stats.count} queries"), ("app", elapsed_ms, None)]),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            query_stats.finish_request(stats_token)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s %s [%s]: %d queries, %.2f ms in the database, %.2f ms total",
+                    scope["method"],
+                    scope["path"],
+                    correlation_id,
+                    stats.count,
+                    stats.duration_ms,
+                    (time.perf_counter() - started) * 1000,
+                )
+
+
+class MetricsMiddleware:
+    """Count requests and time them per route template for ``/metrics``.
+
+    The route label is the matched path template (``/patients/{patient_id}``), never
+    the raw path, so label cardinality stays bounded; unmatched requests share the
+    ``unmatched`` label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-        response = await call_next(request)
-        response.headers[self.header] = correlation_id
-        return response
+        metrics.IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.IN_FLIGHT.dec()
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", None) or "unmatched",
+                status_code,
+                time.perf_counter() - started,
+            )
+            metrics.observe_threadpool()
+            metrics.observe_pools()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, DateTime, String, func
+from sqlalchemy import Column, DateTime, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from app.db import Base
@@ -17,3 +17,6 @@ class Doctor(Base):
     crm: str = Column(String(30), nullable=False, unique=True, index=True)
     specialty: str = Column(String(120), nullable=False)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+    version: int = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
@@ -3,7 +3,8 @@ from __future__ import annotations
 from datetime import date
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, String, Text, func
+from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy.orm import deferred
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from app.db import Base
@@ -23,6 +24,12 @@ class Patient(Base):
         nullable=False,
     )
     phone: str = Column(String(20), nullable=True)
-    notes: str = Column(Text, nullable=True)
+    # Unbounded free text, only loaded on request (see app.utils.fieldsets).
+    notes = deferred(Column(Text, nullable=True))
     user_id: UUID | None = Column(PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, unique=True)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
+    # Incremented by a database trigger on every update; fetched back after each
+    # flush and checked in the UPDATE's WHERE clause (optimistic locking).
+    version: int = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, DateTime, Enum, String, func
+from sqlalchemy import Column, DateTime, Enum, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 from app.db import Base
@@ -22,3 +22,7 @@ class User(Base):
         nullable=False,
     )
     created_at = Column("created_at", DateTime, nullable=False, server_default=func.now())
+    token_version: int = Column("token_version", Integer, nullable=False, default=0, server_default="0")
+    version: int = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
@@ -0,0 +1,162 @@
+"""Connection pool configuration and telemetry for the engines in :mod:`app.db`."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolWaitStats:
+    """How long checkouts waited for a connection, including opening new ones."""
+
+    __slots__ = ("_lock", "checkouts", "total_seconds", "max_seconds", "timeouts")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            mean = self.total_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_mean_ms": round(mean * 1000, 3),
+                "wait_max_ms": round(self.max_seconds * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Time every checkout and hand the wait to ``on_wait`` (e.g. a Prometheus histogram)."""
+
+    wait_stats: PoolWaitStats
+    on_wait: Optional[Callable[[float], None]] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_stats.record(waited, timed_out)
+            if self.on_wait is not None:
+                self.on_wait(waited)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        pool.on_wait = self.on_wait
+        return pool
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self) -> "InstrumentedAsyncAdaptedQueuePool":
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        pool.on_wait = self.on_wait
+        return pool
+
+
+def engine_options(settings: Settings, *, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for ``create_engine``/``create_async_engine`` built from ``settings``.
+
+    In PgBouncer mode pooling is left to PgBouncer: SQLAlchemy opens a connection per
+    checkout (``NullPool``) and psycopg's server-side prepared statements are disabled,
+    since a transaction-pooled backend cannot keep them across transactions.
+    """
+    if settings.db_pgbouncer:
+        return {
+            "poolclass": NullPool,
+            "pool_pre_ping": False,
+            "connect_args": {"prepare_threshold": None},
+        }
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def ping_idle_on_checkout(engine: Engine, idle_seconds: float) -> None:
+    """Ping a pooled connection at checkout only when it sat idle for ``idle_seconds``.
+
+    Replaces ``pool_pre_ping``: connections in steady use skip the round trip, while
+    one that may have been dropped by the server or a firewall meanwhile is checked.
+    A dead connection raises ``DisconnectionError``, on which the pool discards it and
+    hands out another one, so requests never see it. Works for async engines too,
+    through their ``sync_engine``.
+    """
+    if idle_seconds <= 0:
+        return
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_in_at = connection_record.info.pop("checked_in_at", None)
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            alive = engine.dialect.do_ping(dbapi_connection)
+        except Exception as error:  # noqa: BLE001 - any failure means the connection is unusable
+            logger.info("Dropping dead pooled connection: %s", error)
+            raise exc.DisconnectionError() from error
+        if not alive:
+            raise exc.DisconnectionError()
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    wait_stats: Optional[PoolWaitStats] = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.snapshot())
+    return status
@@ -0,0 +1,105 @@
+"""Per-request SQL statistics.
+
+Cursor events of the instrumented engines add every statement executed while a
+request is being served to that request's :class:`QueryStats`: number of queries, time
+spent in the database and how often each statement shape ran. A shape running more
+than ``SQL_REPEAT_THRESHOLD`` times in one request (the classic N+1 loop) is logged
+as a warning, or raises :class:`RepeatedQueryError` when ``SQL_REPEAT_RAISE`` is set,
+which is meant for test runs.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised in strict mode when a request repeats the same statement too many times."""
+
+
+class QueryStats:
+    __slots__ = ("correlation_id", "count", "duration", "statements", "flagged")
+
+    def __init__(self, correlation_id: Optional[str]) -> None:
+        self.correlation_id = correlation_id
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+        self.flagged: Set[str] = set()
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] += 1
+
+        threshold = settings.sql_repeat_threshold
+        if threshold and self.statements[statement] > threshold and statement not in self.flagged:
+            self.flagged.add(statement)
+            message = (
+                f"Statement executed more than {threshold} times in request {self.correlation_id} "
+                f"(possible N+1): {' '.join(statement.split())[:300]}"
+            )
+            if settings.sql_repeat_raise:
+                raise RepeatedQueryError(message)
+            logger.warning(message)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_instrumented_engines: Set[int] = set()
+
+
+def start_request(correlation_id: Optional[str]) -> Token:
+    return _current.set(QueryStats(correlation_id))
+
+
+def finish_request(token: Token) -> Optional[QueryStats]:
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute the statements run on ``engine`` to the request being served."""
+    if id(engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _current.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        stats = _current.get()
+        if stats is None:
+            return
+        started = conn.info.get("query_started")
+        if started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and _current.get() is not None:
+            started = conn.info.get("query_started")
+            if started:
+                started.pop()
@@ -0,0 +1,137 @@
+"""Reference data served by ``/domains``: roles, genders and the specialties in use.
+
+Everything is serialized once and kept as bytes. Roles and genders come from enums
+and only change with a deploy, so they are encoded at import time. The bundle also
+lists the specialties of the registered doctors. It is built at startup and rebuilt
+from a read session once it is older than ``REFERENCE_DATA_TTL_SECONDS``. A committed
+doctor write marks it stale with :func:`invalidate`, so this worker rebuilds it from
+the primary on the next request; other workers catch up within the TTL. Its
+``version`` is a hash of the content, which also serves as its ``ETag``. A rebuild
+that finds the same specialties therefore keeps the same tag, and clients keep
+their cached copy.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Iterable, List, Optional, Type
+
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.db import ReadSessionLocal, read_engine
+from app.models.enums import GenderEnum, RoleEnum
+from app.schemas.common import Domain, ReferenceData
+
+logger = logging.getLogger(__name__)
+
+_domains_adapter = TypeAdapter(List[Domain])
+
+
+def _to_domains(enum_cls: Type[Enum]) -> List[Domain]:
+    return [Domain(code=item.value, label=item.label) for item in enum_cls]
+
+
+ROLES = _to_domains(RoleEnum)
+GENDERS = _to_domains(GenderEnum)
+ROLES_JSON = _domains_adapter.dump_json(ROLES)
+GENDERS_JSON = _domains_adapter.dump_json(GENDERS)
+
+
+@dataclass(frozen=True)
+class Bundle:
+    body: bytes
+    etag: str
+    built_at: float
+    stale: bool = False
+
+    @property
+    def expired(self) -> bool:
+        return self.stale or time.monotonic() - self.built_at >= settings.reference_data_ttl_seconds
+
+
+def build(specialties: Iterable[str]) -> Bundle:
+    specialty_domains = [Domain(code=name, label=name) for name in specialties]
+    digest = hashlib.sha256(
+        b"\n".join(_domains_adapter.dump_json(domains) for domains in (ROLES, GENDERS, specialty_domains))
+    ).hexdigest()[:16]
+    data = ReferenceData(version=digest, roles=ROLES, genders=GENDERS, specialties=specialty_domains)
+    return Bundle(body=data.model_dump_json().encode("utf-8"), etag=f'"{digest}"', built_at=time.monotonic())
+
+
+def _load_specialties(use_primary: bool = False) -> List[str]:
+    # Imported here: the doctor service invalidates the bundle, so it imports this module.
+    from app.services import doctor_service
+
+    db = ReadSessionLocal(bind=read_engine(use_primary))
+    try:
+        return doctor_service.list_specialties(db)
+    finally:
+        db.close()
+
+
+_bundle: Optional[Bundle] = None
+_lock = threading.Lock()
+# Bumped by :func:`invalidate`; a rebuild that overlapped a bump may have read old rows.
+_generation = 0
+
+
+def cached() -> Optional[Bundle]:
+    """The current bundle, or ``None`` when it must be (re)built with :func:`current`."""
+    bundle = _bundle
+    return None if bundle is None or bundle.expired else bundle
+
+
+def current() -> Bundle:
+    """The current bundle, rebuilt first when missing or expired; runs queries, so call it off the event loop.
+
+    A single thread rebuilds at a time and the others keep serving the expired bundle
+    meanwhile. When the rebuild fails the expired bundle is served for another period.
+    """
+    global _bundle
+    bundle = _bundle
+    if bundle is not None and not bundle.expired:
+        return bundle
+    if not _lock.acquire(blocking=bundle is None):
+        return bundle
+    try:
+        if _bundle is not bundle:
+            return _bundle
+        try:
+            generation = _generation
+            # After a doctor write a lagging replica could still return the old specialties.
+            _bundle = build(_load_specialties(use_primary=bundle is not None and bundle.stale))
+            if generation != _generation:
+                _bundle = replace(_bundle, stale=True)
+        except Exception:
+            if bundle is None:
+                raise
+            logger.exception("Could not rebuild the reference-data bundle; serving the previous one")
+            _bundle = replace(bundle, built_at=time.monotonic(), stale=False)
+        return _bundle
+    finally:
+        _lock.release()
+
+
+def invalidate() -> None:
+    """Have the next request rebuild the bundle; the current one is served until then.
+
+    Does not wait for :data:`_lock`, since it runs on the event loop after async commits.
+    """
+    global _bundle, _generation
+    _generation += 1
+    bundle = _bundle
+    if bundle is not None:
+        _bundle = replace(bundle, stale=True)
+
+
+def warm_up() -> None:
+    """Build the bundle at startup; failures are logged and retried on the first request."""
+    try:
+        current()
+    except Exception:  # noqa: BLE001 - the API must start even when the database is not up yet
+        logger.exception("Could not build the reference-data bundle at startup")
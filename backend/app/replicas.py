@@ -0,0 +1,45 @@
+"""Sessions of the read-only endpoints, served by the read replicas.
+
+Sessions come from ``DATABASE_REPLICA_URLS`` when configured and from the primary
+otherwise. They run their transactions as ``READ ONLY`` and are never committed. A
+caller who wrote something in the last ``READ_YOUR_WRITES_SECONDS`` reads from the
+primary instead, so replication lag never hides their own changes.
+"""
+from __future__ import annotations
+
+from typing import AsyncGenerator, Generator
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import AsyncReadSessionLocal, ReadSessionLocal, async_read_engine, read_engine
+from app.schemas.auth import Principal
+from app.security.auth import get_current_principal, wrote_recently
+
+
+def open_read_session(user_id: UUID) -> Session:
+    """Read-only session for ``user_id``; the caller closes it."""
+    return ReadSessionLocal(bind=read_engine(use_primary=wrote_recently(user_id)))
+
+
+def get_read_db(principal: Principal = Depends(get_current_principal)) -> Generator[Session, None, None]:
+    db = open_read_session(principal.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(
+    principal: Principal = Depends(get_current_principal),
+) -> AsyncGenerator[AsyncSession, None]:
+    bind = async_read_engine(use_primary=wrote_recently(principal.id))
+    async with AsyncReadSessionLocal(bind=bind) as db:
+        yield db
+
+
+get_read_session = get_async_read_db if settings.database_async else get_read_db
+"""Session dependency of the read-only routes; like ``get_session`` but on a replica."""
@@ -1,3 +1,10 @@
-from app.routers import auth, doctors, domains, health, patients, users
+from typing import TYPE_CHECKING
+
+from app.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.routers import auth, doctors, domains, health, patients, users
 
 __all__ = ["auth", "domains", "health", "patients", "users", "doctors"]
+
+__getattr__, __dir__ = lazy_exports(__name__, dict.fromkeys(__all__))
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.orm import Session
 
-from app.dependencies import get_db
+from app.db import DbSession
+from app.dependencies import get_session
 from app.schemas.auth import Credentials
-from app.services.auth_service import InvalidCredentialsError, authenticate
+from app.services.auth_service import InvalidCredentialsError, authenticate_async
 
 router = APIRouter(tags=["auth"])
 
@@ -34,10 +34,10 @@ router = APIRouter(tags=["auth"])
         401: {"description": "Invalid credentials."},
     },
 )
-def login(credentials: Credentials, db: Session = Depends(get_db)) -> Response:
+async def login(credentials: Credentials, db: DbSession = Depends(get_session)) -> Response:
     """Authenticate the user and return the JWT in the `Authorization` header."""
     try:
-        token = authenticate(db, email=credentials.email, password=credentials.password)
+        token = await authenticate_async(db, email=credentials.email, password=credentials.password)
     except InvalidCredentialsError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
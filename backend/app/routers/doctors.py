@@ -3,73 +3,183 @@ from __future__ import annotations
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.dependencies import get_db
+from app.db import DbSession, run_db
+from app.dependencies import get_session
 from app.models.enums import RoleEnum
-from app.schemas.common import PageResponse
-from app.schemas.doctor import DoctorCreate, DoctorOut, DoctorUpdate
-from app.security.auth import require_roles
+from app.replicas import get_read_session, open_read_session
+from app.schemas.auth import Principal
+from app.schemas.common import (
+    BatchGetRequest,
+    BatchGetResponse,
+    BulkIdsRequest,
+    BulkResponse,
+    BulkStatus,
+    PageResponse,
+)
+from app.schemas.doctor import DoctorBulkUpdate, DoctorCreate, DoctorOut, DoctorUpdate
+from app.security.auth import read_only_request, require_roles
 from app.services import doctor_service
 from app.services.doctor_service import (
     DoctorCrmAlreadyInUseError,
     DoctorEmailAlreadyInUseError,
     DoctorNotFoundError,
 )
-from app.utils.pagination import build_page
+from app.utils.batch import bulk_response
+from app.utils.etags import (
+    IF_MATCH_DESCRIPTION,
+    PRECONDITION_FAILED_DESCRIPTION,
+    VersionMismatchError,
+    if_match_versions,
+    is_not_modified,
+    make_etag,
+    not_modified,
+)
+from app.utils.fieldsets import InvalidFieldsError, parse_fields
+from app.utils.pagination import CountMode, InvalidCursorError, build_page
+from app.utils.serialization import batch_response, from_row, from_rows, item_response, page_response
+from app.utils.streaming import ExportFormat, export_response
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
 read_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR)
-write_permission = require_roles(RoleEnum.ADMIN)
+write_permission = require_roles(RoleEnum.ADMIN, fresh=True)
 
 
 @router.get("", response_model=PageResponse[DoctorOut], summary="List doctors")
-def list_doctors(
+async def list_doctors(
     page: int = Query(0, ge=0),
     size: int = Query(10, ge=1, le=100),
     sort: str = Query("name"),
     direction: str = Query("asc"),
     specialty: Optional[str] = Query(None),
     text: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query(CountMode.EXACT),
+    fields: Optional[str] = Query(None),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
-    doctors, total = doctor_service.list_doctors(
+    try:
+        columns = parse_fields(DoctorOut, fields)
+        doctors, total, total_type, next_cursor = await run_db(
+            db,
+            doctor_service.list_doctors,
+            page=page,
+            size=size,
+            specialty=specialty,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+            cursor=cursor,
+            count=count,
+            columns=columns,
+        )
+    except (InvalidCursorError, InvalidFieldsError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    dtos = from_rows(DoctorOut, doctors, columns)
+    return page_response(
+        build_page(
+            dtos,
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor,
+            total_type=total_type,
+            item_type=DoctorOut,
+        ),
+        columns,
+    )
+
+
+@router.get("/export", summary="Stream doctors as NDJSON or CSV", response_class=StreamingResponse)
+def export_doctors(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    sort: str = Query("name"),
+    direction: str = Query("asc"),
+    specialty: Optional[str] = Query(None),
+    text: Optional[str] = Query(None),
+    principal: Principal = Depends(read_permission),
+):
+    db = open_read_session(principal.id)
+    try:
+        doctors = doctor_service.export_doctors(
+            db,
+            specialty=specialty,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+        )
+    except Exception:
+        db.close()
+        raise
+    return export_response(
         db,
-        page=page,
-        size=size,
-        specialty=specialty,
-        text=text,
-        sort_field=sort,
-        sort_direction=direction,
+        doctors,
+        lambda doctor: DoctorOut.model_validate(doctor).model_dump(mode="json", by_alias=True),
+        format,
+        "doctors",
     )
-    dtos = [DoctorOut.model_validate(doc) for doc in doctors]
-    return build_page(dtos, total=total, page=page, size=size)
 
 
 @router.get("/{doctor_id}", response_model=DoctorOut, summary="Get doctor by ID")
-def get_doctor(
+async def get_doctor(
     doctor_id: UUID,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
     try:
-        doctor = doctor_service.get_doctor(db, doctor_id)
+        columns = parse_fields(DoctorOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    try:
+        if if_none_match:
+            etag = make_etag(await run_db(db, doctor_service.get_doctor_version, doctor_id), columns)
+            if is_not_modified(if_none_match, etag):
+                return not_modified(etag)
+        doctor = await run_db(db, doctor_service.get_doctor, doctor_id, columns=columns)
     except DoctorNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    return DoctorOut.model_validate(doctor)
+    response = item_response(from_row(DoctorOut, doctor, columns), columns)
+    response.headers["ETag"] = make_etag(doctor.version, columns)
+    return response
+
+
+@router.post(
+    "/batch-get",
+    response_model=BatchGetResponse[DoctorOut],
+    summary="Get doctors by ID in one request",
+    dependencies=[Depends(read_only_request)],
+)
+async def batch_get_doctors(
+    body: BatchGetRequest,
+    fields: Optional[str] = Query(None),
+    db: DbSession = Depends(get_read_session),
+    _: None = Depends(read_permission),
+):
+    try:
+        columns = parse_fields(DoctorOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    doctors, missing = await run_db(db, doctor_service.get_doctors_by_ids, body.ids, columns=columns)
+    return batch_response(
+        BatchGetResponse[DoctorOut].model_construct(content=from_rows(DoctorOut, doctors, columns), missing=missing),
+        columns,
+    )
 
 
 @router.post("", response_model=DoctorOut, status_code=status.HTTP_201_CREATED, summary="Create doctor")
-def create_doctor(
+async def create_doctor(
     payload: DoctorCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        doctor = doctor_service.create_doctor(db, payload.model_dump())
+        doctor = await run_db(db, doctor_service.create_doctor, payload.model_dump())
     except DoctorEmailAlreadyInUseError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
     except DoctorCrmAlreadyInUseError as exc:
@@ -77,29 +187,73 @@ def create_doctor(
     return DoctorOut.model_validate(doctor)
 
 
-@router.put("/{doctor_id}", response_model=DoctorOut, summary="Update doctor")
-def update_doctor(
+@router.put(
+    "/{doctor_id}",
+    response_model=DoctorOut,
+    summary="Update doctor",
+    responses={412: {"description": PRECONDITION_FAILED_DESCRIPTION}},
+)
+async def update_doctor(
     doctor_id: UUID,
     payload: DoctorUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None, description=IF_MATCH_DESCRIPTION),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        doctor = doctor_service.update_doctor(db, doctor_id, payload.model_dump(exclude_unset=True))
+        doctor = await run_db(
+            db,
+            doctor_service.update_doctor,
+            doctor_id,
+            payload.model_dump(exclude_unset=True),
+            expected_versions=if_match_versions(if_match),
+        )
     except DoctorNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except VersionMismatchError as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(exc)) from exc
     except (DoctorEmailAlreadyInUseError, DoctorCrmAlreadyInUseError) as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    response.headers["ETag"] = make_etag(doctor.version)
     return DoctorOut.model_validate(doctor)
 
 
 @router.delete("/{doctor_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete doctor")
-def delete_doctor(
+async def delete_doctor(
     doctor_id: UUID,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        doctor_service.delete_doctor(db, doctor_id)
+        await run_db(db, doctor_service.delete_doctor, doctor_id)
     except DoctorNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.post("/bulk-update", response_model=BulkResponse, summary="Update several doctors at once")
+async def bulk_update_doctors(
+    payload: DoctorBulkUpdate,
+    db: DbSession = Depends(get_session),
+    _: None = Depends(write_permission),
+):
+    try:
+        _, missing = await run_db(
+            db,
+            doctor_service.bulk_update_doctors,
+            payload.ids,
+            payload.changes.model_dump(exclude_unset=True),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return bulk_response(payload.ids, missing, BulkStatus.UPDATED)
+
+
+@router.post("/bulk-delete", response_model=BulkResponse, summary="Delete several doctors at once")
+async def bulk_delete_doctors(
+    payload: BulkIdsRequest,
+    db: DbSession = Depends(get_session),
+    _: None = Depends(write_permission),
+):
+    _, missing = await run_db(db, doctor_service.bulk_delete_doctors, payload.ids)
+    return bulk_response(payload.ids, missing, BulkStatus.DELETED)
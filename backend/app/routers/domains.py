@@ -1,19 +1,22 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from typing import Optional
 
-from app.models.enums import GenderEnum, RoleEnum
-from app.schemas.common import Domain
-from app.security.auth import require_roles
+from fastapi import APIRouter, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
 
-router = APIRouter(prefix="/domains", tags=["domains"])
-
-read_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR, RoleEnum.PATIENT)
+from app import reference_data
+from app.config import settings
+from app.models.enums import RoleEnum
+from app.schemas.common import Domain, ReferenceData
+from app.security.auth import require_token_roles
+from app.utils.etags import is_not_modified
+from app.utils.serialization import JSONBytesResponse
 
+router = APIRouter(prefix="/domains", tags=["domains"])
 
-def _to_domain(enum_cls):
-    """Convert an enum into a list of Domain objects."""
-    return [Domain(code=item.value, label=item.label) for item in enum_cls]
+read_permission = require_token_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR, RoleEnum.PATIENT)
 
 
 @router.get(
@@ -22,9 +25,9 @@ def _to_domain(enum_cls):
     summary="List available roles",
     description="Returns the complete set of roles accepted by the platform.",
 )
-def list_roles(_: None = Depends(read_permission)):
+async def list_roles(_: None = Depends(read_permission)):
     """Expose the RoleEnum values as code/label pairs."""
-    return _to_domain(RoleEnum)
+    return JSONBytesResponse(reference_data.ROLES_JSON)
 
 
 @router.get(
@@ -33,6 +36,31 @@ def list_roles(_: None = Depends(read_permission)):
     summary="List available genders",
     description="Returns all gender values accepted when registering patients.",
 )
-def list_genders(_: None = Depends(read_permission)):
+async def list_genders(_: None = Depends(read_permission)):
     """Expose GenderEnum to populate dropdowns."""
-    return _to_domain(GenderEnum)
+    return JSONBytesResponse(reference_data.GENDERS_JSON)
+
+
+@router.get(
+    "/bundle",
+    response_model=ReferenceData,
+    summary="Reference-data bundle",
+    description=(
+        "Returns roles, genders and the specialties in use in a single document. The `ETag` is a hash "
+        "of the content: send it back in `If-None-Match` to get `304 Not Modified` while nothing changed."
+    ),
+    responses={304: {"description": "The bundle did not change since the given `ETag`."}},
+)
+async def get_bundle(
+    if_none_match: Optional[str] = Header(None),
+    _: None = Depends(read_permission),
+):
+    """Serve the pre-encoded bundle; it is only rebuilt, off the event loop, once expired."""
+    bundle = reference_data.cached() or await run_in_threadpool(reference_data.current)
+    headers = {
+        "ETag": bundle.etag,
+        "Cache-Control": f"private, max-age={int(settings.reference_data_ttl_seconds)}",
+    }
+    if is_not_modified(if_none_match, bundle.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONBytesResponse(bundle.body, headers=headers)
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from typing import Any, Dict
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app.db import engines_by_name
+from app.models.enums import RoleEnum
+from app.pool import pool_status
 from app.schemas.common import HealthStatus
+from app.security.auth import principal_cache_stats, require_roles
+from app.security.jwt import token_cache_stats
 
 router = APIRouter(tags=["health"])
 
+# /health answers uptime monitors; the internals of the workers are for admins only.
+stats_permission = require_roles(RoleEnum.ADMIN)
+
 
 @router.get(
     "/health",
@@ -15,6 +24,28 @@ router = APIRouter(tags=["health"])
     summary="Service health check",
     description="Provides a lightweight status payload for uptime monitors.",
 )
-def health() -> HealthStatus:
+async def health() -> HealthStatus:
     """Return a simple heartbeat payload used for infrastructure checks."""
     return HealthStatus(timestamp=datetime.now(timezone.utc))
+
+
+@router.get(
+    "/health/caches",
+    response_model=Dict[str, Dict[str, int]],
+    summary="In-process cache statistics",
+    description="Size, capacity and hit/miss counters of the in-process caches of this worker.",
+)
+async def cache_stats(_: None = Depends(stats_permission)) -> Dict[str, Dict[str, int]]:
+    """Expose cache counters so hit ratios can be tracked per worker."""
+    return {"principal": principal_cache_stats(), "token": token_cache_stats()}
+
+
+@router.get(
+    "/health/pool",
+    response_model=Dict[str, Dict[str, Any]],
+    summary="Database connection pool statistics",
+    description="Occupancy of the connection pools of this worker and how long checkouts waited for a connection.",
+)
+async def pool_stats(_: None = Depends(stats_permission)) -> Dict[str, Dict[str, Any]]:
+    """Expose pool occupancy and checkout wait times to size pools per worker."""
+    return {name: pool_status(db_engine) for name, db_engine in engines_by_name().items()}
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app import metrics
+from app.config import settings
+from app.models.enums import RoleEnum
+from app.security.auth import require_roles
+
+router = APIRouter(tags=["metrics"])
+
+_scraper_bearer = HTTPBearer(auto_error=False)
+
+
+async def _require_scraper_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_scraper_bearer),
+) -> None:
+    if credentials is None or not hmac.compare_digest(credentials.credentials, settings.metrics_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid credentials.")
+
+
+# Scrapers cannot log in, so ``METRICS_TOKEN`` gives them a static token; without it
+# only admins can read the metrics.
+scrape_permission = _require_scraper_token if settings.metrics_token else require_roles(RoleEnum.ADMIN)
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="Request, database pool, threadpool and login metrics in the Prometheus text format.",
+    response_class=Response,
+    include_in_schema=False,
+)
+async def prometheus_metrics(_: None = Depends(scrape_permission)) -> Response:
+    """Expose the metrics of every worker to the Prometheus scraper."""
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
@@ -1,17 +1,31 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from app.dependencies import get_db
+from app.config import settings
+from app.db import DbSession, commit_db, run_db
+from app.dependencies import get_session
 from app.models.enums import RoleEnum
-from app.schemas.common import PageResponse
-from app.schemas.patient import PatientCreate, PatientOut, PatientUpdate
+from app.replicas import get_read_session, open_read_session
+from app.schemas.auth import Principal
+from app.schemas.common import (
+    BatchGetRequest,
+    BatchGetResponse,
+    BulkIdsRequest,
+    BulkResponse,
+    BulkStatus,
+    ImportReport,
+    ImportRowError,
+    PageResponse,
+)
+from app.schemas.patient import PatientBulkUpdate, PatientCreate, PatientOut, PatientUpdate
 from app.schemas.user import UserOut
-from app.security.auth import require_roles
+from app.security.auth import read_only_request, require_roles
 from app.services import patient_service
 from app.services.patient_service import (
     PatientDocumentAlreadyInUseError,
@@ -19,12 +33,31 @@ from app.services.patient_service import (
     PatientNotFoundError,
     PatientAlreadyLinkedToUserError,
 )
-from app.utils.pagination import build_page
+from app.utils.batch import bulk_response
+from app.utils.etags import (
+    IF_MATCH_DESCRIPTION,
+    PRECONDITION_FAILED_DESCRIPTION,
+    VersionMismatchError,
+    if_match_versions,
+    is_not_modified,
+    make_etag,
+    not_modified,
+)
+from app.utils.fieldsets import InvalidFieldsError, parse_fields
+from app.utils.pagination import CountMode, InvalidCursorError, build_page
+from app.utils.serialization import batch_response, from_row, from_rows, item_response, page_response
+from app.utils.streaming import ExportFormat, export_response, iter_records
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
 read_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR)
-write_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR)
+write_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR, fresh=True)
+bulk_permission = require_roles(RoleEnum.ADMIN, fresh=True)
+
+_FIELDS_DESCRIPTION = (
+    "Campos a retornar, separados por vírgula (ex.: `name,email,birthDate`); `id` sempre é incluído. "
+    "Sem o parâmetro todos os campos são retornados, inclusive `notes`."
+)
 
 
 @router.get(
@@ -32,27 +65,96 @@ write_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR)
     response_model=PageResponse[PatientOut],
     summary="Lista pacientes com paginação",
 )
-def list_patients(
+async def list_patients(
     page: int = Query(0, ge=0, description="Página desejada (base zero)."),
     size: int = Query(10, ge=1, le=100, description="Quantidade por página."),
     sort: str = Query("name", description="Campo de ordenação."),
     direction: str = Query("asc", description="Direção asc/desc."),
     gender: Optional[str] = Query(None, description="Filtrar por gênero: FEMALE, MALE, OTHER."),
     text: Optional[str] = Query(None, description="Filtro aplicado em nome/e-mail/documento."),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor `nextCursor` da página anterior. Quando informado, `page` é ignorado.",
+    ),
+    count: CountMode = Query(
+        CountMode.EXACT,
+        description="Total: `exact` (contagem), `estimate` (estimativa do planner) ou `none` (sem total).",
+    ),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
-    items, total = patient_service.list_patients(
+    try:
+        columns = parse_fields(PatientOut, fields)
+        items, total, total_type, next_cursor = await run_db(
+            db,
+            patient_service.list_patients,
+            page=page,
+            size=size,
+            gender=gender,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+            cursor=cursor,
+            count=count,
+            columns=columns,
+        )
+    except (InvalidCursorError, InvalidFieldsError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    dtos = from_rows(PatientOut, items, columns)
+    return page_response(
+        build_page(
+            dtos,
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor,
+            total_type=total_type,
+            item_type=PatientOut,
+        ),
+        columns,
+    )
+
+
+@router.get(
+    "/export",
+    summary="Exporta pacientes em streaming (NDJSON ou CSV)",
+    description=(
+        "Aceita os mesmos filtros e ordenação da listagem e devolve todos os pacientes de uma vez, "
+        "lidos do banco por cursor no servidor, sem contagem nem paginação."
+    ),
+    response_class=StreamingResponse,
+)
+def export_patients(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Formato: `ndjson` ou `csv`."),
+    sort: str = Query("name", description="Campo de ordenação."),
+    direction: str = Query("asc", description="Direção asc/desc."),
+    gender: Optional[str] = Query(None, description="Filtrar por gênero: FEMALE, MALE, OTHER."),
+    text: Optional[str] = Query(None, description="Filtro aplicado em nome/e-mail/documento."),
+    principal: Principal = Depends(read_permission),
+):
+    db = open_read_session(principal.id)
+    try:
+        patients = patient_service.export_patients(
+            db,
+            gender=gender,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+        )
+    except ValueError as exc:
+        db.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception:
+        db.close()
+        raise
+    return export_response(
         db,
-        page=page,
-        size=size,
-        gender=gender,
-        text=text,
-        sort_field=sort,
-        sort_direction=direction,
+        patients,
+        lambda patient: PatientOut.model_validate(patient).model_dump(mode="json", by_alias=True),
+        format,
+        "patients",
     )
-    dtos = [PatientOut.model_validate(item) for item in items]
-    return build_page(dtos, total=total, page=page, size=size)
 
 
 @router.get(
@@ -60,16 +162,55 @@ def list_patients(
     response_model=PatientOut,
     summary="Obtém paciente por ID",
 )
-def get_patient(
+async def get_patient(
     patient_id: UUID,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None, description="ETag já conhecido; se não mudou a resposta é `304`."),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
     try:
-        patient = patient_service.get_patient(db, patient_id)
+        columns = parse_fields(PatientOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    try:
+        if if_none_match:
+            etag = make_etag(await run_db(db, patient_service.get_patient_version, patient_id), columns)
+            if is_not_modified(if_none_match, etag):
+                return not_modified(etag)
+        patient = await run_db(db, patient_service.get_patient, patient_id, columns=columns)
     except PatientNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    return PatientOut.model_validate(patient)
+    response = item_response(from_row(PatientOut, patient, columns), columns)
+    response.headers["ETag"] = make_etag(patient.version, columns)
+    return response
+
+
+@router.post(
+    "/batch-get",
+    response_model=BatchGetResponse[PatientOut],
+    summary="Obtém vários pacientes por ID",
+    description=(
+        "Resolve até `BATCH_GET_MAX_IDS` ids com uma única consulta. Os pacientes vêm na ordem dos ids "
+        "informados e os ids inexistentes são listados em `missing`."
+    ),
+    dependencies=[Depends(read_only_request)],
+)
+async def batch_get_patients(
+    body: BatchGetRequest,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    db: DbSession = Depends(get_read_session),
+    _: None = Depends(read_permission),
+):
+    try:
+        columns = parse_fields(PatientOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    patients, missing = await run_db(db, patient_service.get_patients_by_ids, body.ids, columns=columns)
+    return batch_response(
+        BatchGetResponse[PatientOut].model_construct(content=from_rows(PatientOut, patients, columns), missing=missing),
+        columns,
+    )
 
 
 @router.post(
@@ -78,13 +219,13 @@ def get_patient(
     status_code=status.HTTP_201_CREATED,
     summary="Cadastra paciente",
 )
-def create_patient(
+async def create_patient(
     payload: PatientCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        patient = patient_service.create_patient(db, payload.model_dump())
+        patient = await run_db(db, patient_service.create_patient, payload.model_dump())
     except (PatientEmailAlreadyInUseError, PatientDocumentAlreadyInUseError) as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
     except ValueError as exc:
@@ -93,26 +234,104 @@ def create_patient(
     return PatientOut.model_validate(patient)
 
 
+@router.post(
+    "/import",
+    response_model=ImportReport,
+    summary="Importa pacientes em lote (CSV ou NDJSON)",
+    description=(
+        "Recebe o corpo em streaming como `text/csv` (primeira linha com os nomes dos campos) "
+        "ou `application/x-ndjson` (um objeto JSON por linha). As linhas são validadas e gravadas "
+        "em lotes de `IMPORT_BATCH_SIZE`, cada um confirmado em sua própria transação; linhas inválidas "
+        "ou duplicadas, inclusive as gravadas por outra requisição durante a importação, são listadas "
+        "em `errors` sem interromper a importação. Com `create_users=true` cada paciente recebe um hash "
+        "bcrypt próprio, que limita a importação a poucos registros por segundo por núcleo; para "
+        "cargas grandes use `create_users=false`."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def import_patients(
+    request: Request,
+    create_users: bool = Query(True, description="Cria usuários do portal para os pacientes importados; cada um custa um hash bcrypt."),
+    db: DbSession = Depends(get_session),
+    _: None = Depends(write_permission),
+):
+    report = ImportReport()
+    batch: List[Tuple[int, dict]] = []
+
+    async def flush() -> None:
+        imported, errors = await run_db(db, patient_service.import_patients, batch, create_portal_users=create_users)
+        # Each batch is committed on its own, so a long import holds no locks between
+        # batches and a failure does not discard the batches already written.
+        await commit_db(db)
+        report.imported += imported
+        report.errors.extend(ImportRowError(line=line, field=field, message=message) for line, field, message in errors)
+        batch.clear()
+
+    async for line, data, error in iter_records(request.stream(), request.headers.get("content-type")):
+        report.received += 1
+        if error is not None:
+            report.errors.append(ImportRowError(line=line, message=error))
+            continue
+        try:
+            payload = PatientCreate.model_validate(data)
+        except ValidationError as exc:
+            report.errors.extend(
+                ImportRowError(line=line, field=".".join(str(part) for part in err["loc"]) or None, message=err["msg"])
+                for err in exc.errors()
+            )
+            continue
+        batch.append((line, payload.model_dump()))
+        if len(batch) >= settings.import_batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+
+    report.failed = report.received - report.imported
+    report.errors.sort(key=lambda err: err.line)
+    return report
+
+
 @router.put(
     "/{patient_id}",
     response_model=PatientOut,
     summary="Atualiza paciente",
+    responses={412: {"description": PRECONDITION_FAILED_DESCRIPTION}},
 )
-def update_patient(
+async def update_patient(
     patient_id: UUID,
     payload: PatientUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None, description=IF_MATCH_DESCRIPTION),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        patient = patient_service.update_patient(db, patient_id, payload.model_dump(exclude_unset=True))
+        patient = await run_db(
+            db,
+            patient_service.update_patient,
+            patient_id,
+            payload.model_dump(exclude_unset=True),
+            expected_versions=if_match_versions(if_match),
+        )
     except PatientNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except VersionMismatchError as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(exc)) from exc
     except (PatientEmailAlreadyInUseError, PatientDocumentAlreadyInUseError) as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+    response.headers["ETag"] = make_etag(patient.version)
     return PatientOut.model_validate(patient)
 
 
@@ -121,30 +340,74 @@ def update_patient(
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Remove paciente",
 )
-def delete_patient(
+async def delete_patient(
     patient_id: UUID,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        patient_service.delete_patient(db, patient_id)
+        await run_db(db, patient_service.delete_patient, patient_id)
     except PatientNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
 
+@router.post(
+    "/bulk-update",
+    response_model=BulkResponse,
+    summary="Atualiza vários pacientes de uma vez",
+    description=(
+        "Aplica as mesmas alterações a todos os ids informados com um único `UPDATE`, numa só transação. "
+        "O resultado traz o status de cada id (`updated` ou `not_found`). Restrito a administradores."
+    ),
+)
+async def bulk_update_patients(
+    payload: PatientBulkUpdate,
+    db: DbSession = Depends(get_session),
+    _: None = Depends(bulk_permission),
+):
+    try:
+        _, missing = await run_db(
+            db,
+            patient_service.bulk_update_patients,
+            payload.ids,
+            payload.changes.model_dump(exclude_unset=True),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return bulk_response(payload.ids, missing, BulkStatus.UPDATED)
+
+
+@router.post(
+    "/bulk-delete",
+    response_model=BulkResponse,
+    summary="Remove vários pacientes de uma vez",
+    description=(
+        "Remove todos os ids informados com um único `DELETE`, numa só transação. O resultado traz o "
+        "status de cada id (`deleted` ou `not_found`). Restrito a administradores."
+    ),
+)
+async def bulk_delete_patients(
+    payload: BulkIdsRequest,
+    db: DbSession = Depends(get_session),
+    _: None = Depends(bulk_permission),
+):
+    _, missing = await run_db(db, patient_service.bulk_delete_patients, payload.ids)
+    return bulk_response(payload.ids, missing, BulkStatus.DELETED)
+
+
 @router.post(
     "/{patient_id}/create-user",
     response_model=UserOut,
     status_code=status.HTTP_201_CREATED,
     summary="Cria um usuário a partir do paciente",
 )
-def create_user_from_patient(
+async def create_user_from_patient(
     patient_id: UUID,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user = patient_service.create_user_from_patient(db, patient_id)
+        user = await run_db(db, patient_service.create_user_from_patient, patient_id)
     except PatientNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except PatientAlreadyLinkedToUserError as exc:
@@ -3,28 +3,50 @@ from __future__ import annotations
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.dependencies import get_db
+from app.db import DbSession, run_db
+from app.dependencies import get_session
 from app.models.enums import RoleEnum
-from app.schemas.common import PageResponse
+from app.replicas import get_read_session, open_read_session
+from app.schemas.auth import Principal
+from app.schemas.common import BatchGetRequest, BatchGetResponse, BulkResponse, BulkStatus, PageResponse
 from app.schemas.user import (
+    UserBulkRoleUpdate,
     UserCreate,
     UserOut,
     UserPasswordUpdate,
     UserRoleUpdate,
     UserUpdate,
 )
-from app.security.auth import require_roles
+from app.security.auth import read_only_request, require_roles
 from app.services import user_service
 from app.services.user_service import EmailAlreadyInUseError, UserNotFoundError
-from app.utils.pagination import build_page
+from app.utils.batch import bulk_response
+from app.utils.etags import (
+    IF_MATCH_DESCRIPTION,
+    PRECONDITION_FAILED_DESCRIPTION,
+    VersionMismatchError,
+    if_match_versions,
+    is_not_modified,
+    make_etag,
+    not_modified,
+)
+from app.utils.fieldsets import InvalidFieldsError, parse_fields
+from app.utils.pagination import CountMode, InvalidCursorError, build_page
+from app.utils.serialization import batch_response, from_row, from_rows, item_response, page_response
+from app.utils.streaming import ExportFormat, export_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 read_permission = require_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR, RoleEnum.PATIENT)
-write_permission = require_roles(RoleEnum.ADMIN)
+write_permission = require_roles(RoleEnum.ADMIN, fresh=True)
+
+_FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return (e.g. `name,email,createdAt`); `id` is always included. "
+    "All fields are returned when omitted."
+)
 
 
 @router.get(
@@ -36,29 +58,99 @@ write_permission = require_roles(RoleEnum.ADMIN)
         "You may try the default admin `admin@hospital.com` to explore the listing."
     ),
 )
-def list_users(
+async def list_users(
     page: int = Query(0, ge=0, description="Desired page (zero-based index)."),
     size: int = Query(10, ge=1, le=100, description="Number of items per page."),
     sort: str = Query("name", description="Field used to sort results."),
     direction: str = Query("asc", description="Sort direction: asc or desc."),
     role: Optional[str] = Query(None, description="Filter by role: ADMIN, DOCTOR, PATIENT."),
     text: Optional[str] = Query(None, description="Free-text filter applied to name and e-mail."),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None,
+        description="`nextCursor` returned by the previous page. When provided, `page` is ignored.",
+    ),
+    count: CountMode = Query(
+        CountMode.EXACT,
+        description="Total to compute: `exact`, `estimate` (planner estimate) or `none` (skip the count).",
+    ),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
     """Return paginated users applying optional filters."""
-    items, total = user_service.list_users(
-        db,
-        page=page,
-        size=size,
-        role=role,
-        text=text,
-        sort_field=sort,
-        sort_direction=direction,
+    try:
+        columns = parse_fields(UserOut, fields)
+        items, total, total_type, next_cursor = await run_db(
+            db,
+            user_service.list_users,
+            page=page,
+            size=size,
+            role=role,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+            cursor=cursor,
+            count=count,
+            columns=columns,
+        )
+    except (InvalidCursorError, InvalidFieldsError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    dtos = from_rows(UserOut, items, columns)
+    return page_response(
+        build_page(
+            dtos,
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor,
+            total_type=total_type,
+            item_type=UserOut,
+        ),
+        columns,
     )
 
-    dtos = [UserOut.model_validate(item) for item in items]
-    return build_page(dtos, total=total, page=page, size=size)
+
+@router.get(
+    "/export",
+    summary="Stream users as NDJSON or CSV",
+    description=(
+        "Accepts the same filters and sorting as the listing and streams every matching user, "
+        "read through a server-side cursor, without counting or paging."
+    ),
+    response_class=StreamingResponse,
+)
+def export_users(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="Body format: `ndjson` or `csv`."),
+    sort: str = Query("name", description="Field used to sort results."),
+    direction: str = Query("asc", description="Sort direction: asc or desc."),
+    role: Optional[str] = Query(None, description="Filter by role: ADMIN, DOCTOR, PATIENT."),
+    text: Optional[str] = Query(None, description="Free-text filter applied to name and e-mail."),
+    principal: Principal = Depends(read_permission),
+):
+    """Stream users applying optional filters."""
+    db = open_read_session(principal.id)
+    try:
+        users = user_service.export_users(
+            db,
+            role=role,
+            text=text,
+            sort_field=sort,
+            sort_direction=direction,
+        )
+    except ValueError as exc:
+        db.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    except Exception:
+        db.close()
+        raise
+    return export_response(
+        db,
+        users,
+        lambda user: UserOut.model_validate(user).model_dump(mode="json", by_alias=True),
+        format,
+        "users",
+    )
 
 
 @router.get(
@@ -70,17 +162,61 @@ def list_users(
         404: {"description": "User not found."},
     },
 )
-def get_by_id(
+async def get_by_id(
     user_id: UUID,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(
+        None, description="ETag of a previous response; `304 Not Modified` is returned while it is current."
+    ),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
     try:
-        user = user_service.get_user(db, user_id)
+        columns = parse_fields(UserOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    try:
+        if if_none_match:
+            etag = make_etag(await run_db(db, user_service.get_user_version, user_id), columns)
+            if is_not_modified(if_none_match, etag):
+                return not_modified(etag)
+        user = await run_db(db, user_service.get_user, user_id, columns=columns)
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
-    return UserOut.model_validate(user)
+    response = item_response(from_row(UserOut, user, columns), columns)
+    response.headers["ETag"] = make_etag(user.version, columns)
+    return response
+
+
+@router.post(
+    "/batch-get",
+    response_model=BatchGetResponse[UserOut],
+    summary="Retrieve several users by ID",
+    description=(
+        "Resolves up to `BATCH_GET_MAX_IDS` ids with a single query. Users are returned in the order "
+        "of the requested ids; ids that do not exist are listed in `missing`."
+    ),
+    dependencies=[Depends(read_only_request)],
+    responses={
+        422: {"description": "No ids, more than the maximum, or malformed ids."},
+    },
+)
+async def batch_get(
+    body: BatchGetRequest,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    db: DbSession = Depends(get_read_session),
+    _: None = Depends(read_permission),
+):
+    try:
+        columns = parse_fields(UserOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    users, missing = await run_db(db, user_service.get_users_by_ids, body.ids, columns=columns)
+    return batch_response(
+        BatchGetResponse[UserOut].model_construct(content=from_rows(UserOut, users, columns), missing=missing),
+        columns,
+    )
 
 
 @router.get(
@@ -92,17 +228,22 @@ def get_by_id(
         404: {"description": "User not found for the provided e-mail."},
     },
 )
-def get_by_email(
+async def get_by_email(
     email: str,
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    db: DbSession = Depends(get_read_session),
     _: None = Depends(read_permission),
 ):
     try:
-        user = user_service.get_user_by_email(db, email)
+        columns = parse_fields(UserOut, fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    try:
+        user = await run_db(db, user_service.get_user_by_email, email, columns=columns)
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
-    return UserOut.model_validate(user)
+    return item_response(from_row(UserOut, user, columns), columns)
 
 
 @router.post(
@@ -130,13 +271,13 @@ def get_by_email(
         409: {"description": "E-mail already registered."},
     },
 )
-def create(
+async def create(
     payload: UserCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user = user_service.create_user(db, payload.model_dump())
+        user = await run_db(db, user_service.create_user, payload.model_dump())
     except EmailAlreadyInUseError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
     except ValueError as exc:
@@ -154,23 +295,35 @@ def create(
         400: {"description": "Invalid payload."},
         404: {"description": "User not found."},
         409: {"description": "E-mail already used by another user."},
+        412: {"description": PRECONDITION_FAILED_DESCRIPTION},
     },
 )
-def update(
+async def update(
     user_id: UUID,
     payload: UserUpdate,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_match: Optional[str] = Header(None, description=IF_MATCH_DESCRIPTION),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user = user_service.update_user(db, user_id, payload.model_dump())
+        user = await run_db(
+            db,
+            user_service.update_user,
+            user_id,
+            payload.model_dump(),
+            expected_versions=if_match_versions(if_match),
+        )
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except VersionMismatchError as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(exc)) from exc
     except EmailAlreadyInUseError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
+    response.headers["ETag"] = make_etag(user.version)
     return UserOut.model_validate(user)
 
 
@@ -184,14 +337,14 @@ def update(
         404: {"description": "User not found."},
     },
 )
-def change_role(
+async def change_role(
     user_id: UUID,
     payload: UserRoleUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user = user_service.change_role(db, user_id, payload.role)
+        user = await run_db(db, user_service.change_role, user_id, payload.role)
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -200,6 +353,31 @@ def change_role(
     return UserOut.model_validate(user)
 
 
+@router.post(
+    "/bulk-role",
+    response_model=BulkResponse,
+    summary="Change the role of several users",
+    description=(
+        "Gives the same access role to every listed user with a single `UPDATE`, in one transaction. "
+        "Tokens issued to them before the change stop being accepted. Each id is reported as "
+        "`updated` or `not_found`."
+    ),
+    responses={
+        400: {"description": "Provided role is invalid."},
+    },
+)
+async def bulk_change_role(
+    payload: UserBulkRoleUpdate,
+    db: DbSession = Depends(get_session),
+    _: None = Depends(write_permission),
+):
+    try:
+        _, missing = await run_db(db, user_service.bulk_change_role, payload.ids, payload.role)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return bulk_response(payload.ids, missing, BulkStatus.UPDATED)
+
+
 @router.patch(
     "/{user_id}/password",
     response_model=UserOut,
@@ -210,14 +388,14 @@ def change_role(
         404: {"description": "User not found."},
     },
 )
-def change_password(
+async def change_password(
     user_id: UUID,
     payload: UserPasswordUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user = user_service.change_password(db, user_id, payload.password)
+        user = await run_db(db, user_service.change_password, user_id, payload.password)
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -236,12 +414,12 @@ def change_password(
         404: {"description": "User not found."},
     },
 )
-def delete(
+async def delete(
     user_id: UUID,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session),
     _: None = Depends(write_permission),
 ):
     try:
-        user_service.delete_user(db, user_id)
+        await run_db(db, user_service.delete_user, user_id)
     except UserNotFoundError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
@@ -1,19 +1,33 @@
-from app.schemas.auth import Credentials
-from app.schemas.common import ApiError, ApiErrorDetail, Domain, PageResponse
-from app.schemas.doctor import DoctorCreate, DoctorOut, DoctorUpdate
-from app.schemas.patient import PatientCreate, PatientOut, PatientUpdate
-from app.schemas.user import (
-    UserCreate,
-    UserOut,
-    UserPasswordUpdate,
-    UserRoleUpdate,
-    UserUpdate,
-)
+from typing import TYPE_CHECKING
+
+from app.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.schemas.auth import Credentials, Principal
+    from app.schemas.common import (
+        ApiError,
+        ApiErrorDetail,
+        Domain,
+        ImportReport,
+        ImportRowError,
+        PageResponse,
+    )
+    from app.schemas.doctor import DoctorCreate, DoctorOut, DoctorUpdate
+    from app.schemas.patient import PatientCreate, PatientOut, PatientUpdate
+    from app.schemas.user import (
+        UserCreate,
+        UserOut,
+        UserPasswordUpdate,
+        UserRoleUpdate,
+        UserUpdate,
+    )
 
 __all__ = [
     "ApiError",
     "ApiErrorDetail",
     "Domain",
+    "ImportReport",
+    "ImportRowError",
     "PageResponse",
     "PatientCreate",
     "PatientOut",
@@ -27,4 +41,30 @@ __all__ = [
     "UserPasswordUpdate",
     "UserUpdate",
     "Credentials",
+    "Principal",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "ApiError": "app.schemas.common",
+        "ApiErrorDetail": "app.schemas.common",
+        "Domain": "app.schemas.common",
+        "ImportReport": "app.schemas.common",
+        "ImportRowError": "app.schemas.common",
+        "PageResponse": "app.schemas.common",
+        "PatientCreate": "app.schemas.patient",
+        "PatientOut": "app.schemas.patient",
+        "PatientUpdate": "app.schemas.patient",
+        "DoctorCreate": "app.schemas.doctor",
+        "DoctorOut": "app.schemas.doctor",
+        "DoctorUpdate": "app.schemas.doctor",
+        "UserCreate": "app.schemas.user",
+        "UserOut": "app.schemas.user",
+        "UserRoleUpdate": "app.schemas.user",
+        "UserPasswordUpdate": "app.schemas.user",
+        "UserUpdate": "app.schemas.user",
+        "Credentials": "app.schemas.auth",
+        "Principal": "app.schemas.auth",
+    },
+)
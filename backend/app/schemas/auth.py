@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from typing import Optional
+from uuid import UUID
+
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
+from app.models.enums import RoleEnum
+
 
 class Credentials(BaseModel):
     """User credentials required to obtain a JWT token."""
@@ -17,3 +22,18 @@ class Credentials(BaseModel):
 
     email: EmailStr = Field(description="User e-mail used for login.")
     password: str = Field(description="Plain password that will be validated.")
+
+
+class Principal(BaseModel):
+    """Authenticated identity resolved from a bearer token.
+
+    Immutable snapshot of the user row, safe to share between requests and sessions.
+    ``name`` is not set when the principal comes from the claims of a self-contained token.
+    """
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: UUID
+    name: Optional[str] = None
+    email: str
+    role: RoleEnum
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from datetime import datetime
+from enum import Enum
 from typing import Generic, List, Optional, Sequence, TypeVar
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
 from pydantic.generics import GenericModel
 
+from app.config import settings
+
 
 class ApiErrorDetail(BaseModel):
     """Represents a single field-level validation issue."""
@@ -42,7 +45,9 @@ class PageResponse(GenericModel, Generic[T]):
                 "size": 10,
                 "totalElements": 0,
                 "totalPages": 0,
+                "totalType": "exact",
                 "last": True,
+                "nextCursor": None,
             }
         }
     )
@@ -50,9 +55,82 @@ class PageResponse(GenericModel, Generic[T]):
     content: Sequence[T]
     page: int
     size: int
-    totalElements: int
-    totalPages: int
+    totalElements: Optional[int] = Field(description="Total of matching rows; null when `count=none`.")
+    totalPages: Optional[int] = Field(description="Number of pages; null when `count=none`.")
+    totalType: str = Field(
+        default="exact",
+        description="Kind of total returned: `exact`, `estimate` (planner estimate) or `none`.",
+    )
     last: bool
+    nextCursor: Optional[str] = Field(
+        default=None,
+        description="Opaque cursor to request the following page; null on the last page.",
+    )
+
+
+class BatchGetRequest(BaseModel):
+    """Ids to resolve in a single request."""
+
+    model_config = ConfigDict(
+        json_schema_extra={"example": {"ids": ["11111111-1111-1111-1111-111111111111"]}}
+    )
+
+    ids: List[UUID] = Field(
+        min_length=1,
+        max_length=settings.batch_get_max_ids,
+        description="Ids to fetch; repeated ids are returned once.",
+    )
+
+
+class BatchGetResponse(GenericModel, Generic[T]):
+    """Records found by a batch get, in the order of the requested ids."""
+
+    content: Sequence[T]
+    missing: List[UUID] = Field(description="Requested ids that do not exist, in request order.")
+
+
+class BulkIdsRequest(BaseModel):
+    """Ids of the records a bulk operation applies to."""
+
+    model_config = ConfigDict(
+        json_schema_extra={"example": {"ids": ["11111111-1111-1111-1111-111111111111"]}}
+    )
+
+    ids: List[UUID] = Field(
+        min_length=1,
+        max_length=settings.bulk_max_ids,
+        description="Ids of the records; repeated ids are processed once.",
+    )
+
+
+class BulkStatus(str, Enum):
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+
+
+class BulkItemResult(BaseModel):
+    id: UUID
+    status: BulkStatus
+
+
+class BulkResponse(BaseModel):
+    """Outcome of a bulk operation, one entry per requested id in request order."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "affected": 1,
+                "results": [
+                    {"id": "11111111-1111-1111-1111-111111111111", "status": "updated"},
+                    {"id": "22222222-2222-2222-2222-222222222222", "status": "not_found"},
+                ],
+            }
+        }
+    )
+
+    affected: int = Field(description="Records updated or deleted.")
+    results: List[BulkItemResult]
 
 
 class Domain(BaseModel):
@@ -71,6 +149,54 @@ class Domain(BaseModel):
     label: str
 
 
+class ReferenceData(BaseModel):
+    """Every domain the clients need to render forms and filters, in one document."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "version": "3f1c2a9d0b7e4c55",
+                "roles": [{"code": "ADMIN", "label": "Administrator"}],
+                "genders": [{"code": "FEMALE", "label": "Female"}],
+                "specialties": [{"code": "Cardiologia", "label": "Cardiologia"}],
+            }
+        }
+    )
+
+    version: str = Field(description="Hash of the content; changes whenever any domain changes.")
+    roles: List[Domain]
+    genders: List[Domain]
+    specialties: List[Domain] = Field(description="Specialties of the registered doctors.")
+
+
+class ImportRowError(BaseModel):
+    """Problem found in one record of a bulk import."""
+
+    line: int = Field(description="Line of the record in the uploaded file (1-based).")
+    field: Optional[str] = Field(default=None, description="Offending field, when known.")
+    message: str
+
+
+class ImportReport(BaseModel):
+    """Outcome of a bulk import."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "received": 3,
+                "imported": 2,
+                "failed": 1,
+                "errors": [{"line": 3, "field": "email", "message": "E-mail already used by another patient."}],
+            }
+        }
+    )
+
+    received: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = Field(default_factory=list)
+
+
 class HealthStatus(BaseModel):
     """Simple status payload returned by the health check endpoint."""
 
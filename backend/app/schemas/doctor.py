@@ -6,6 +6,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
+from app.schemas.common import BulkIdsRequest
+
 
 class DoctorBase(BaseModel):
     name: str = Field(description="Nome completo do médico.")
@@ -32,6 +34,22 @@ class DoctorUpdate(BaseModel):
     specialty: Optional[str] = None
 
 
+class DoctorBulkChanges(BaseModel):
+    name: Optional[str] = None
+    specialty: Optional[str] = None
+
+
+class DoctorBulkUpdate(BulkIdsRequest):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "ids": ["44444444-4444-4444-4444-444444444444"],
+            "changes": {"specialty": "Cardiologia"},
+        }
+    })
+
+    changes: DoctorBulkChanges
+
+
 class DoctorOut(BaseModel):
     id: UUID
     name: str
@@ -7,6 +7,18 @@ from uuid import UUID
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_serializer, field_validator
 
 from app.models.enums import GenderEnum
+from app.schemas.common import BulkIdsRequest
+
+
+def _gender_code(value: object) -> str:
+    """Aceita o sexo como código, ``GenderEnum`` ou o objeto ``{"code", "label"}`` devolvido pela API."""
+    if isinstance(value, dict):
+        value = value.get("code")
+    if isinstance(value, GenderEnum):
+        return value.value
+    if isinstance(value, str):
+        return value.upper()
+    raise ValueError("Invalid gender value.")
 
 
 class PatientBase(BaseModel):
@@ -26,13 +38,7 @@ class PatientBase(BaseModel):
     @field_validator("gender", mode="before")
     @classmethod
     def coerce_gender(cls, value: object) -> str:
-        if isinstance(value, dict):
-            value = value.get("code")
-        if isinstance(value, GenderEnum):
-            return value.value
-        if isinstance(value, str):
-            return value.upper()
-        raise ValueError("Invalid gender value.")
+        return _gender_code(value)
 
 
 class PatientCreate(PatientBase):
@@ -72,15 +78,40 @@ class PatientUpdate(BaseModel):
     @field_validator("gender", mode="before")
     @classmethod
     def coerce_gender(cls, value: object) -> Optional[str]:
-        if value is None:
-            return None
-        if isinstance(value, dict):
-            value = value.get("code")
-        if isinstance(value, GenderEnum):
-            return value.value
-        if isinstance(value, str):
-            return value.upper()
-        raise ValueError("Invalid gender value.")
+        return None if value is None else _gender_code(value)
+
+
+class PatientBulkChanges(BaseModel):
+    """Campos aplicados igualmente a todos os pacientes de uma atualização em lote.
+
+    E-mail e documento são únicos por paciente e por isso não podem ser alterados em lote.
+    """
+
+    name: Optional[str] = Field(default=None, description="Nome completo.")
+    birth_date: Optional[date] = Field(default=None, description="Data de nascimento.")
+    gender: Optional[str] = Field(default=None, description="Valores: FEMALE, MALE, OTHER.")
+    phone: Optional[str] = Field(default=None, description="Telefone.")
+    notes: Optional[str] = Field(default=None, description="Observações.")
+
+    @field_validator("gender", mode="before")
+    @classmethod
+    def coerce_gender(cls, value: object) -> Optional[str]:
+        return None if value is None else _gender_code(value)
+
+
+class PatientBulkUpdate(BulkIdsRequest):
+    """Payload da atualização em lote de pacientes."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "ids": ["8a6d8dd8-1111-4f3b-b2c1-0c1f2030a001"],
+                "changes": {"phone": None, "notes": "Transferido para a unidade 2."},
+            }
+        }
+    )
+
+    changes: PatientBulkChanges
 
 
 class PatientOut(BaseModel):
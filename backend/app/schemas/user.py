@@ -7,6 +7,18 @@ from uuid import UUID
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_serializer, field_validator
 
 from app.models.enums import RoleEnum
+from app.schemas.common import BulkIdsRequest
+
+
+def _role_code(value: object) -> str:
+    """Accept a role as its code, a ``RoleEnum`` or the ``{"code", "label"}`` object the API returns."""
+    if isinstance(value, dict):
+        value = value.get("code")
+    if isinstance(value, RoleEnum):
+        return value.value
+    if isinstance(value, str):
+        return value
+    raise ValueError("Invalid role.")
 
 
 class UserCreate(BaseModel):
@@ -38,13 +50,7 @@ class UserCreate(BaseModel):
     @field_validator("role", mode="before")
     @classmethod
     def coerce_role(cls, value: object) -> str:
-        if isinstance(value, dict):
-            value = value.get("code")
-        if isinstance(value, RoleEnum):
-            return value.value
-        if isinstance(value, str):
-            return value
-        raise ValueError("Invalid role.")
+        return _role_code(value)
 
 
 class UserUpdate(BaseModel):
@@ -79,13 +85,27 @@ class UserRoleUpdate(BaseModel):
     @field_validator("role", mode="before")
     @classmethod
     def coerce_role(cls, value: object) -> str:
-        if isinstance(value, dict):
-            value = value.get("code")
-        if isinstance(value, RoleEnum):
-            return value.value
-        if isinstance(value, str):
-            return value
-        raise ValueError("Invalid role.")
+        return _role_code(value)
+
+
+class UserBulkRoleUpdate(BulkIdsRequest):
+    """Payload used to give the same access role to several users."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "ids": ["22222222-2222-2222-2222-222222222222"],
+                "role": "DOCTOR",
+            }
+        }
+    )
+
+    role: str = Field(description="New access role. Allowed values: ADMIN, DOCTOR, PATIENT.")
+
+    @field_validator("role", mode="before")
+    @classmethod
+    def coerce_role(cls, value: object) -> str:
+        return _role_code(value)
 
 
 class UserPasswordUpdate(BaseModel):
@@ -1,3 +1,10 @@
-from app.security import auth, jwt, password
+from typing import TYPE_CHECKING
+
+from app.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.security import auth, jwt, password
 
 __all__ = ["auth", "jwt", "password"]
+
+__getattr__, __dir__ = lazy_exports(__name__, dict.fromkeys(__all__))
@@ -1,44 +1,224 @@
 from __future__ import annotations
 
-from typing import Callable, Iterable, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, Mapping, Optional, Tuple
+from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_db
+from app.config import settings
+from app.db import DbSession, R, run_db
+from app.dependencies import get_session
 from app.models.enums import RoleEnum
 from app.models.user import User
-from app.security.jwt import validate_token
+from app.schemas.auth import Principal
+from app.security.jwt import verify_token
+from app.utils.cache import TTLCache
 
 _http_bearer = HTTPBearer(auto_error=False)
 
+_principal_cache = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds,
+)
+_token_versions = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.token_version_cache_ttl_seconds,
+)
+_recent_writers = TTLCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.read_your_writes_seconds,
+)
 
-def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_http_bearer),
-    db: Session = Depends(get_db),
-) -> User:
+_REVOKED = -1
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid credentials.")
+
+
+def invalidate_principal(subject: str) -> None:
+    """Forget the cached principal of ``subject`` (the token subject, i.e. the e-mail)."""
+    _principal_cache.invalidate(subject)
+
+
+def invalidate_principals(subjects: Iterable[str]) -> None:
+    """Bulk counterpart of :func:`invalidate_principal`."""
+    _principal_cache.invalidate_many(subjects)
+
+
+def note_token_version(user_id: UUID, version: Optional[int]) -> None:
+    """Record the new token version of a user so this worker rejects older tokens at once.
+
+    ``None`` means the user no longer exists.
+    """
+    _token_versions.set(user_id, _REVOKED if version is None else version)
+
+
+def note_token_versions(versions: Mapping[UUID, Optional[int]]) -> None:
+    """Bulk counterpart of :func:`note_token_version`."""
+    _token_versions.set_many(
+        (user_id, _REVOKED if version is None else version) for user_id, version in versions.items()
+    )
+
+
+def wrote_recently(user_id: UUID) -> bool:
+    """Whether ``user_id`` sent a write request in the last ``READ_YOUR_WRITES_SECONDS``.
+
+    Reads of such users are served by the primary, so they see their own changes even
+    while the replicas lag behind. Tracked per worker process.
+    """
+    return _recent_writers.get(user_id, False)
+
+
+async def read_only_request(request: Request) -> None:
+    """Mark a request sent with a write method (a ``POST`` carrying a query) as a read.
+
+    Such requests do not send their caller to the primary for read-your-writes. Add it to
+    the route's ``dependencies`` so it runs before the principal is resolved.
+    """
+    request.state.read_only = True
+
+
+def principal_cache_stats() -> Dict[str, int]:
+    return _principal_cache.stats()
+
+
+def _bearer_claims(credentials: Optional[HTTPAuthorizationCredentials]) -> Mapping[str, Any]:
     if credentials is None or not credentials.scheme.lower() == "bearer":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid credentials.")
+        raise _unauthorized()
+
+    payload = verify_token(credentials.credentials)
+    if payload is None or not payload.get("sub"):
+        raise _unauthorized()
+    return payload
 
-    subject = validate_token(credentials.credentials)
-    if subject is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid credentials.")
 
+def _fetch_principal(db: Session, subject: str) -> Principal:
     user = db.query(User).filter(User.email == subject).first()
     if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing or invalid credentials.")
+        raise _unauthorized()
+
+    principal = Principal.model_validate(user)
+    _principal_cache.set(subject, principal)
+    return principal
+
+
+def _current_token_version(db: Session, user_id: UUID) -> int:
+    version = db.query(User.token_version).filter(User.id == user_id).scalar()
+    version = _REVOKED if version is None else version
+    _token_versions.set(user_id, version)
+    return version
+
+
+def _parse_claims(payload: Mapping[str, Any]) -> Tuple[Principal, int]:
+    try:
+        principal = Principal(id=UUID(str(payload["uid"])), email=payload["sub"], role=RoleEnum(payload["role"]))
+        return principal, int(payload["ver"])
+    except (TypeError, ValueError):
+        raise _unauthorized()
+
+
+async def _lookup(db: DbSession, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+    """Run an auth query on the request session and end its transaction in the same call.
+
+    Committing hands the connection back to the pool. Read-only routes query through a
+    second session, and a request holding this connection meanwhile needs two of them:
+    with more requests in flight than pooled connections, each holds one and waits for
+    another until the pool times out. The commit runs in the same threadpool call as the
+    query, so a connection is never held while waiting for a free thread.
+    """
+    return await run_db(db, _query_and_commit, fn, *args, **kwargs)
+
+
+def _query_and_commit(db: Session, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+    result = fn(db, *args, **kwargs)
+    db.commit()
+    return result
+
+
+def _resolve_principal(fresh: bool) -> Callable[..., Awaitable[Principal]]:
+    async def dependency(
+        request: Request,
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(_http_bearer),
+        db: DbSession = Depends(get_session),
+    ) -> Principal:
+        payload = _bearer_claims(credentials)
+        # Answer from the in-process caches when possible; only misses go to the database.
+        if {"uid", "role", "ver"} <= payload.keys():
+            principal, version = _parse_claims(payload)
+            current = None if fresh else _token_versions.get(principal.id)
+            if current is None:
+                current = await _lookup(db, _current_token_version, principal.id)
+            if version != current:
+                raise _unauthorized()
+        else:
+            principal = _principal_cache.get(payload["sub"])
+            if principal is None:
+                principal = await _lookup(db, _fetch_principal, payload["sub"])
+
+        if request.method not in _READ_METHODS and not getattr(request.state, "read_only", False):
+            _recent_writers.set(principal.id, True)
+        return principal
+
+    return dependency
+
+
+get_current_principal = _resolve_principal(fresh=False)
+get_fresh_principal = _resolve_principal(fresh=True)
+
+
+def require_token_roles(*roles: RoleEnum | str) -> Callable[..., Awaitable[Optional[Principal]]]:
+    """Authorize callers holding one of ``roles`` from the signed token alone.
+
+    Self-contained tokens never touch the database, so revoked ones keep working until
+    they expire; use it only for data every role may read. Tokens without a role claim
+    carry no role to check: they are accepted when ``roles`` covers every role, and
+    otherwise their user is read from the principal cache, or the database on a miss.
+    """
+    expected = {
+        role if isinstance(role, str) else role.value
+        for role in roles
+    }
+    any_role = expected >= {role.value for role in RoleEnum}
+
+    async def dependency(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(_http_bearer),
+        db: DbSession = Depends(get_session),
+    ) -> Optional[Principal]:
+        payload = _bearer_claims(credentials)
+        if {"uid", "role", "ver"} <= payload.keys():
+            principal, _ = _parse_claims(payload)
+        else:
+            principal = _principal_cache.get(payload["sub"])
+            if principal is None:
+                if any_role:
+                    return None
+                principal = await _lookup(db, _fetch_principal, payload["sub"])
+        if principal.role.value not in expected:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed to access this resource.")
+        return principal
+
+    return dependency
 
-    return user
 
+def require_roles(*roles: RoleEnum | str, fresh: bool = False) -> Callable[[Principal], Awaitable[Principal]]:
+    """Authorize callers holding one of ``roles``.
 
-def require_roles(*roles: RoleEnum | str) -> Callable[[User], User]:
+    Self-contained tokens are authorized from their own claims; their token version is
+    compared with a briefly cached copy of ``users.token_version`` (re-read from the
+    database on every call when ``fresh`` is set, which write routes use). Tokens
+    carrying only the subject fall back to loading the user.
+    """
     expected = {
         role if isinstance(role, str) else role.value
         for role in roles
     }
+    resolver = get_fresh_principal if fresh else get_current_principal
 
-    def dependency(user: User = Depends(get_current_user)) -> User:
+    async def dependency(user: Principal = Depends(resolver)) -> Principal:
         if user.role.value not in expected:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You are not allowed to access this resource.")
         return user
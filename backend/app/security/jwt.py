@@ -1,18 +1,31 @@
 from __future__ import annotations
 
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 
 from app.config import settings
+from app.utils.cache import TTLCache
 
+_token_cache = TTLCache(
+    maxsize=settings.jwt_token_cache_size if settings.jwt_token_cache_enabled else 0,
+    ttl=settings.jwt_expiration_seconds,
+)
 
-def create_access_token(subject: str, expires_in_seconds: Optional[int] = None) -> str:
+
+def create_access_token(
+    subject: str,
+    expires_in_seconds: Optional[int] = None,
+    claims: Optional[dict] = None,
+) -> str:
     expires_delta = expires_in_seconds or settings.jwt_expiration_seconds
     expire = datetime.now(tz=timezone.utc) + timedelta(seconds=expires_delta)
-    payload = {"sub": subject, "exp": expire}
+    payload = {**(claims or {}), "sub": subject, "exp": expire}
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
@@ -20,12 +33,48 @@ def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
 
 
-def validate_token(token: str) -> Optional[str]:
+def verify_token(token: str) -> Optional[Mapping[str, Any]]:
+    """Return the claims of a valid token, or ``None`` when it is invalid or expired.
+
+    Verified claims are cached under a SHA-256 digest of the token until the token's
+    own ``exp``, so the signature check runs once per token per worker. The returned
+    mapping is shared between requests and therefore read-only.
+    """
+    if not _token_cache.enabled:
+        return _decode_or_none(token)
+
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    payload = _decode_or_none(token)
+    if payload is None:
+        return None
+
+    claims = MappingProxyType(payload)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache.set(key, claims, ttl=exp - time.time())
+    return claims
+
+
+def _decode_or_none(token: str) -> Optional[dict]:
     try:
-        payload = decode_token(token)
+        return decode_token(token)
     except ExpiredSignatureError:
         return None
     except InvalidTokenError:
         return None
 
+
+def validate_token(token: str) -> Optional[str]:
+    payload = verify_token(token)
+    if payload is None:
+        return None
+
     return payload.get("sub")
+
+
+def token_cache_stats() -> Dict[str, int]:
+    return _token_cache.stats()
@@ -1,13 +1,109 @@
 from __future__ import annotations
 
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
+from sqlalchemy.util.concurrency import await_only, in_greenlet
 
-_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import settings
 
+R = TypeVar("R")
 
-def hash_password(raw_password: str) -> str:
+_pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Process pool running the bcrypt work, created on first use.
+
+    Returns ``None`` when ``PASSWORD_HASH_WORKERS`` is 0, in which case hashing runs
+    in the calling thread as before.
+    """
+    global _executor
+    if settings.password_hash_workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.password_hash_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the pool workers at shutdown; a later hash starts a new pool."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# Executed inside the pool workers: keep them module-level so they can be pickled.
+def _hash(raw_password: str) -> str:
     return _pwd_context.hash(raw_password)
 
 
-def verify_password(raw_password: str, hashed_password: str) -> bool:
-    return _pwd_context.verify(raw_password, hashed_password)
+def _verify_and_update(raw_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _pwd_context.verify_and_update(raw_password, hashed_password)
+
+
+def _run(fn: Callable[..., R], *args) -> R:
+    if in_greenlet():
+        # Called from a service driven by AsyncSession.run_sync: we are on the event
+        # loop, so suspend on the result instead of blocking it.
+        return await_only(_run_async(fn, *args))
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+
+async def _run_async(fn: Callable[..., R], *args) -> R:
+    executor = _get_executor()
+    if executor is None:
+        return await run_in_threadpool(fn, *args)
+    return await asyncio.wrap_future(executor.submit(fn, *args))
+
+
+def hash_password(raw_password: str) -> str:
+    return _run(_hash, raw_password)
+
+
+def hash_passwords(raw_passwords: Sequence[str]) -> List[str]:
+    """Hash several passwords, spreading them across the pool workers."""
+    if in_greenlet():
+        return await_only(run_in_threadpool(_hash_many, raw_passwords))
+    return _hash_many(raw_passwords)
+
+
+def _hash_many(raw_passwords: Sequence[str]) -> List[str]:
+    executor = _get_executor()
+    if executor is None:
+        return [_hash(raw) for raw in raw_passwords]
+    chunksize = max(1, len(raw_passwords) // (settings.password_hash_workers * 4))
+    return list(executor.map(_hash, raw_passwords, chunksize=chunksize))
+
+
+async def verify_and_update_async(raw_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash when the stored one is outdated.
+
+    The replacement is produced when the hash was created with a cost factor other
+    than ``BCRYPT_ROUNDS``; it is ``None`` otherwise or when the password is wrong.
+    """
+    return await _run_async(_verify_and_update, raw_password, hashed_password)
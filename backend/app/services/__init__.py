@@ -1,3 +1,10 @@
-from app.services import auth_service, doctor_service, patient_service, user_service
+from typing import TYPE_CHECKING
+
+from app.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.services import auth_service, doctor_service, patient_service, user_service
 
 __all__ = ["auth_service", "user_service", "patient_service", "doctor_service"]
+
+__getattr__, __dir__ = lazy_exports(__name__, dict.fromkeys(__all__))
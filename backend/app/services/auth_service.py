@@ -1,20 +1,49 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.config import settings
+from app.db import DbSession, run_db
+from app.metrics import LOGIN_FAILED, LOGIN_SUCCEEDED
 from app.models.user import User
 from app.security.jwt import create_access_token
-from app.security.password import verify_password
+from app.security.password import verify_and_update_async
 
 
 class InvalidCredentialsError(Exception):
     pass
 
 
-def authenticate(db: Session, *, email: str, password: str) -> str:
-    user = db.query(User).filter(func.lower(User.email) == email.lower()).first()
-    if user is None or not verify_password(password, user.password):
+def _find_user(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(func.lower(User.email) == email.lower()).first()
+
+
+def _issue_token(db: Session, user: User, new_hash: Optional[str]) -> str:
+    if new_hash:
+        user.password = new_hash
+        db.flush()
+
+    claims = None
+    if settings.jwt_embed_claims:
+        claims = {"uid": str(user.id), "role": user.role.value, "ver": user.token_version or 0}
+    return create_access_token(user.email, claims=claims)
+
+
+async def authenticate_async(db: DbSession, *, email: str, password: str) -> str:
+    """Return a token for valid credentials; the bcrypt check runs off the event loop."""
+    user = await run_db(db, _find_user, email)
+    if user is None:
+        LOGIN_FAILED.inc()
+        raise InvalidCredentialsError("Invalid credentials.")
+
+    valid, new_hash = await verify_and_update_async(password, user.password)
+    if not valid:
+        LOGIN_FAILED.inc()
         raise InvalidCredentialsError("Invalid credentials.")
 
-    return create_access_token(user.email)
+    token = await run_db(db, _issue_token, user, new_hash)
+    LOGIN_SUCCEEDED.inc()
+    return token
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple
+from functools import partial
+from typing import Collection, Iterator, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import asc, desc, func, or_
+from sqlalchemy import asc, delete, desc, func, update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 
+from app import reference_data
+from app.config import settings
+from app.db import after_commit
 from app.models.doctor import Doctor
 from app.models.enums import RoleEnum
 from app.services import user_service
 from app.services.user_service import EmailAlreadyInUseError
+from app.utils.batch import apply_to_ids, fetch_by_ids
+from app.utils.etags import VersionMismatchError
+from app.utils.fieldsets import column_loader
+from app.utils.pagination import CountMode, count_total, invalidate_counts, paginate
+from app.utils.search import text_search
+from app.utils.unique import insert_unless_conflict
 
 
 class DoctorNotFoundError(NoResultFound):
@@ -25,18 +35,21 @@ class DoctorCrmAlreadyInUseError(ValueError):
     """Raised when trying to reuse a CRM."""
 
 
+_SORT_FIELDS = {
+    "name": Doctor.name,
+    "email": Doctor.email,
+    "crm": Doctor.crm,
+    "specialty": Doctor.specialty,
+    "createdAt": Doctor.created_at,
+}
+
+
 def _apply_filters(query, specialty: Optional[str], text: Optional[str]):
     if specialty:
         query = query.filter(func.lower(Doctor.specialty) == specialty.lower())
-    if text:
-        lowered = f"%{text.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(Doctor.name).like(lowered),
-                func.lower(Doctor.email).like(lowered),
-                func.lower(Doctor.crm).like(lowered),
-            )
-        )
+    search = text_search(Doctor.name, Doctor.email, Doctor.crm, text=text)
+    if search is not None:
+        query = query.filter(search)
     return query
 
 
@@ -49,35 +62,81 @@ def list_doctors(
     text: Optional[str],
     sort_field: str,
     sort_direction: str,
-) -> Tuple[Sequence[Doctor], int]:
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[Sequence[Doctor], Optional[int], CountMode, Optional[str]]:
     query = db.query(Doctor)
     query = _apply_filters(query, specialty, text)
 
-    total = query.count()
+    total, total_type = count_total(query, count, cache_key=("doctors", specialty, text))
+
+    sort_attr = _SORT_FIELDS.get(sort_field, Doctor.name)
+
+    doctors, next_cursor = paginate(
+        query.options(column_loader(Doctor, columns, sort_attr)),
+        sort_attr=sort_attr,
+        id_attr=Doctor.id,
+        descending=sort_direction.lower() == "desc",
+        page=page,
+        size=size,
+        cursor=cursor,
+    )
+    return doctors, total, total_type, next_cursor
 
-    sort_attr = {
-        "name": Doctor.name,
-        "email": Doctor.email,
-        "crm": Doctor.crm,
-        "specialty": Doctor.specialty,
-        "createdAt": Doctor.created_at,
-    }.get(sort_field, Doctor.name)
 
+def export_doctors(
+    db: Session,
+    *,
+    specialty: Optional[str],
+    text: Optional[str],
+    sort_field: str,
+    sort_direction: str,
+) -> Iterator[Doctor]:
+    """Iterate over every doctor matching the filters through a server-side cursor."""
+    query = _apply_filters(db.query(Doctor), specialty, text)
+    sort_attr = _SORT_FIELDS.get(sort_field, Doctor.name)
     direction = desc if sort_direction.lower() == "desc" else asc
-    query = query.order_by(direction(sort_attr))
+    return iter(query.order_by(direction(sort_attr), direction(Doctor.id)).yield_per(settings.export_batch_size))
 
-    offset = page * size
-    doctors = query.offset(offset).limit(size).all()
-    return doctors, total
 
+def list_specialties(db: Session) -> List[str]:
+    """Distinct specialties of the registered doctors, in alphabetical order."""
+    rows = db.query(Doctor.specialty).distinct().order_by(Doctor.specialty)
+    return [specialty for (specialty,) in rows]
 
-def get_doctor(db: Session, doctor_id: UUID) -> Doctor:
-    doctor = db.query(Doctor).filter_by(id=doctor_id).first()
+
+def get_doctor(db: Session, doctor_id: UUID, *, columns: Optional[Collection[str]] = None) -> Doctor:
+    doctor = (
+        db.query(Doctor)
+        .options(column_loader(Doctor, columns, Doctor.version))
+        .filter_by(id=doctor_id)
+        .first()
+    )
     if doctor is None:
         raise DoctorNotFoundError("Doctor not found")
     return doctor
 
 
+def get_doctors_by_ids(
+    db: Session,
+    doctor_ids: Sequence[UUID],
+    *,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[List[Doctor], List[UUID]]:
+    """Doctors with the given ids in the same order, and the ids that do not exist, in one query."""
+    query = db.query(Doctor).options(column_loader(Doctor, columns))
+    return fetch_by_ids(query, Doctor.id, doctor_ids)
+
+
+def get_doctor_version(db: Session, doctor_id: UUID) -> int:
+    """Current row version of a doctor, read without loading the doctor."""
+    version = db.query(Doctor.version).filter(Doctor.id == doctor_id).scalar()
+    if version is None:
+        raise DoctorNotFoundError("Doctor not found")
+    return version
+
+
 def _ensure_unique_email(db: Session, email: str, ignore_id: Optional[UUID] = None):
     query = db.query(Doctor).filter(func.lower(Doctor.email) == email.lower())
     if ignore_id:
@@ -94,20 +153,24 @@ def _ensure_unique_crm(db: Session, crm: str, ignore_id: Optional[UUID] = None):
         raise DoctorCrmAlreadyInUseError("CRM already used by another doctor.")
 
 
+def _specialties_changed(db: Session) -> None:
+    """Rebuild the ``/domains/bundle`` specialties once ``db`` commits the change."""
+    after_commit(db, reference_data.invalidate)
+
+
 def create_doctor(db: Session, payload: dict, *, create_portal_user: bool = True) -> Doctor:
+    """Insert a doctor in one statement, relying on the unique indexes for e-mail and CRM."""
     payload = payload.copy()
     email = payload["email"].lower()
     crm = payload["crm"].lower()
 
-    _ensure_unique_email(db, email)
-    _ensure_unique_crm(db, crm)
-
     payload["email"] = email
     payload["crm"] = crm
 
-    doctor = Doctor(**payload)
-    db.add(doctor)
-    db.flush()
+    doctor = insert_unless_conflict(db, Doctor, payload)
+    if doctor is None:
+        _ensure_unique_email(db, email)
+        raise DoctorCrmAlreadyInUseError("CRM already used by another doctor.")
 
     if create_portal_user:
         try:
@@ -123,11 +186,22 @@ def create_doctor(db: Session, payload: dict, *, create_portal_user: bool = True
         except EmailAlreadyInUseError:
             pass
 
+    _specialties_changed(db)
+    after_commit(db, partial(invalidate_counts, "doctors"))
     return doctor
 
 
-def update_doctor(db: Session, doctor_id: UUID, payload: dict) -> Doctor:
+def update_doctor(
+    db: Session,
+    doctor_id: UUID,
+    payload: dict,
+    *,
+    expected_versions: Optional[Collection[int]] = None,
+) -> Doctor:
+    """Apply ``payload``; with ``expected_versions`` only if the doctor is still at one of them."""
     doctor = get_doctor(db, doctor_id)
+    if expected_versions is not None and doctor.version not in expected_versions:
+        raise VersionMismatchError("Doctor was modified by another request.")
 
     if "email" in payload and payload["email"]:
         email = payload["email"].lower()
@@ -144,13 +218,42 @@ def update_doctor(db: Session, doctor_id: UUID, payload: dict) -> Doctor:
     if "name" in payload and payload["name"]:
         doctor.name = payload["name"]
 
-    if "specialty" in payload and payload["specialty"]:
+    if "specialty" in payload and payload["specialty"] and payload["specialty"] != doctor.specialty:
         doctor.specialty = payload["specialty"]
+        _specialties_changed(db)
 
     db.flush()
+    after_commit(db, partial(invalidate_counts, "doctors"))
     return doctor
 
 
 def delete_doctor(db: Session, doctor_id: UUID) -> None:
     doctor = get_doctor(db, doctor_id)
     db.delete(doctor)
+    _specialties_changed(db)
+    after_commit(db, partial(invalidate_counts, "doctors"))
+
+
+def bulk_update_doctors(db: Session, doctor_ids: Sequence[UUID], changes: dict) -> Tuple[List[UUID], List[UUID]]:
+    """Apply the same ``changes`` to every doctor of ``doctor_ids`` with one ``UPDATE``.
+
+    Returns the updated ids and the ids that do not exist.
+    """
+    values = {field: changes[field] for field in ("name", "specialty") if changes.get(field)}
+    if not values:
+        raise ValueError("No changes to apply.")
+
+    updated, missing = apply_to_ids(db, update(Doctor).values(**values), Doctor.id, doctor_ids)
+    if "specialty" in values and updated:
+        _specialties_changed(db)
+    after_commit(db, partial(invalidate_counts, "doctors"))
+    return [row.id for row in updated], missing
+
+
+def bulk_delete_doctors(db: Session, doctor_ids: Sequence[UUID]) -> Tuple[List[UUID], List[UUID]]:
+    """Delete every doctor of ``doctor_ids`` with one ``DELETE``; returns the deleted and missing ids."""
+    deleted, missing = apply_to_ids(db, delete(Doctor), Doctor.id, doctor_ids)
+    if deleted:
+        _specialties_changed(db)
+    after_commit(db, partial(invalidate_counts, "doctors"))
+    return [row.id for row in deleted], missing
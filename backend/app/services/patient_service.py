@@ -1,16 +1,27 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple
-from uuid import UUID
+from functools import partial
+from typing import Collection, Iterator, List, NoReturn, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
 
-from sqlalchemy import asc, desc, func, or_
+from sqlalchemy import asc, bindparam, delete, desc, func, or_, update
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 
+from app.config import settings
+from app.db import after_commit
 from app.models.enums import GenderEnum, RoleEnum
 from app.models.patient import Patient
+from app.models.user import User
+from app.security import password
 from app.services import user_service
 from app.services.user_service import EmailAlreadyInUseError
+from app.utils.batch import apply_to_ids, fetch_by_ids
+from app.utils.etags import VersionMismatchError
+from app.utils.fieldsets import column_loader
+from app.utils.pagination import CountMode, count_total, invalidate_counts, paginate
+from app.utils.search import text_search
+from app.utils.unique import insert_many_unless_conflict, insert_unless_conflict
 
 
 class PatientNotFoundError(NoResultFound):
@@ -38,20 +49,23 @@ def _parse_gender(value: Optional[str]) -> Optional[GenderEnum]:
         raise ValueError("Invalid gender. Allowed values: FEMALE, MALE, OTHER.") from exc
 
 
+_SORT_FIELDS = {
+    "name": Patient.name,
+    "document": Patient.document,
+    "email": Patient.email,
+    "birthDate": Patient.birth_date,
+    "createdAt": Patient.created_at,
+}
+
+
 def _apply_filters(query, gender: Optional[str], text: Optional[str]):
     gender_enum = _parse_gender(gender) if gender else None
     if gender_enum:
         query = query.filter(Patient.gender == gender_enum)
 
-    if text:
-        lowered = f"%{text.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(Patient.name).like(lowered),
-                func.lower(Patient.email).like(lowered),
-                func.lower(Patient.document).like(lowered),
-            )
-        )
+    search = text_search(Patient.name, Patient.email, Patient.document, text=text)
+    if search is not None:
+        query = query.filter(search)
     return query
 
 
@@ -64,35 +78,79 @@ def list_patients(
     text: Optional[str],
     sort_field: str,
     sort_direction: str,
-) -> Tuple[Sequence[Patient], int]:
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[Sequence[Patient], Optional[int], CountMode, Optional[str]]:
     query = db.query(Patient)
     query = _apply_filters(query, gender, text)
 
-    total = query.count()
+    total, total_type = count_total(query, count, cache_key=("patients", gender, text))
 
-    sort_attr = {
-        "name": Patient.name,
-        "document": Patient.document,
-        "email": Patient.email,
-        "birthDate": Patient.birth_date,
-        "createdAt": Patient.created_at,
-    }.get(sort_field, Patient.name)
+    sort_attr = _SORT_FIELDS.get(sort_field, Patient.name)
+
+    items, next_cursor = paginate(
+        query.options(column_loader(Patient, columns, sort_attr)),
+        sort_attr=sort_attr,
+        id_attr=Patient.id,
+        descending=sort_direction.lower() == "desc",
+        page=page,
+        size=size,
+        cursor=cursor,
+    )
+    return items, total, total_type, next_cursor
 
-    direction = desc if sort_direction.lower() == "desc" else asc
-    query = query.order_by(direction(sort_attr))
 
-    offset = page * size
-    items = query.offset(offset).limit(size).all()
-    return items, total
+def export_patients(
+    db: Session,
+    *,
+    gender: Optional[str],
+    text: Optional[str],
+    sort_field: str,
+    sort_direction: str,
+) -> Iterator[Patient]:
+    """Iterate over every patient matching the filters through a server-side cursor.
+
+    Rows are fetched ``EXPORT_BATCH_SIZE`` at a time, so memory does not grow with the
+    table. Filters are validated before returning, not on the first iteration.
+    """
+    query = _apply_filters(db.query(Patient).options(undefer(Patient.notes)), gender, text)
+    sort_attr = _SORT_FIELDS.get(sort_field, Patient.name)
+    direction = desc if sort_direction.lower() == "desc" else asc
+    return iter(query.order_by(direction(sort_attr), direction(Patient.id)).yield_per(settings.export_batch_size))
 
 
-def get_patient(db: Session, patient_id: UUID) -> Patient:
-    patient = db.query(Patient).filter_by(id=patient_id).first()
+def get_patient(db: Session, patient_id: UUID, *, columns: Optional[Collection[str]] = None) -> Patient:
+    patient = (
+        db.query(Patient)
+        .options(column_loader(Patient, columns, Patient.version))
+        .filter_by(id=patient_id)
+        .first()
+    )
     if patient is None:
         raise PatientNotFoundError("Patient not found.")
     return patient
 
 
+def get_patients_by_ids(
+    db: Session,
+    patient_ids: Sequence[UUID],
+    *,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[List[Patient], List[UUID]]:
+    """Patients with the given ids in the same order, and the ids that do not exist, in one query."""
+    query = db.query(Patient).options(column_loader(Patient, columns))
+    return fetch_by_ids(query, Patient.id, patient_ids)
+
+
+def get_patient_version(db: Session, patient_id: UUID) -> int:
+    """Current row version of a patient, read without loading the patient."""
+    version = db.query(Patient.version).filter(Patient.id == patient_id).scalar()
+    if version is None:
+        raise PatientNotFoundError("Patient not found.")
+    return version
+
+
 def _ensure_unique_email(db: Session, email: str, ignore_patient_id: Optional[UUID] = None) -> None:
     query = db.query(Patient).filter(func.lower(Patient.email) == email.lower())
     if ignore_patient_id:
@@ -109,14 +167,19 @@ def _ensure_unique_document(db: Session, document: str, ignore_patient_id: Optio
         raise PatientDocumentAlreadyInUseError("Document already used by another patient.")
 
 
+def _raise_conflict(db: Session, email: str, document: str) -> NoReturn:
+    """Report which key made the insert of a new patient conflict."""
+    if db.query(Patient.id).filter(func.lower(Patient.email) == email).first():
+        raise PatientEmailAlreadyInUseError("E-mail already used by another patient.")
+    raise PatientDocumentAlreadyInUseError("Document already used by another patient.")
+
+
 def create_patient(db: Session, payload: dict, *, create_portal_user: bool = True) -> Patient:
+    """Insert a patient in one statement, relying on the unique indexes for e-mail and document."""
     payload = payload.copy()
     email = payload["email"].lower()
     document = payload["document"].lower()
 
-    _ensure_unique_email(db, email)
-    _ensure_unique_document(db, document)
-
     payload["email"] = email
     payload["document"] = document
     gender = _parse_gender(payload.get("gender"))
@@ -124,9 +187,9 @@ def create_patient(db: Session, payload: dict, *, create_portal_user: bool = Tru
         raise ValueError("Gender is required.")
     payload["gender"] = gender
 
-    patient = Patient(**payload)
-    db.add(patient)
-    db.flush()
+    patient = insert_unless_conflict(db, Patient, payload)
+    if patient is None:
+        _raise_conflict(db, email, document)
 
     if create_portal_user:
         try:
@@ -144,11 +207,21 @@ def create_patient(db: Session, payload: dict, *, create_portal_user: bool = Tru
         except EmailAlreadyInUseError:
             patient.user_id = None
 
+    after_commit(db, partial(invalidate_counts, "patients"))
     return patient
 
 
-def update_patient(db: Session, patient_id: UUID, payload: dict) -> Patient:
+def update_patient(
+    db: Session,
+    patient_id: UUID,
+    payload: dict,
+    *,
+    expected_versions: Optional[Collection[int]] = None,
+) -> Patient:
+    """Apply ``payload``; with ``expected_versions`` only if the patient is still at one of them."""
     patient = get_patient(db, patient_id)
+    if expected_versions is not None and patient.version not in expected_versions:
+        raise VersionMismatchError("Patient was modified by another request.")
 
     if "email" in payload and payload["email"]:
         email = payload["email"].lower()
@@ -174,12 +247,39 @@ def update_patient(db: Session, patient_id: UUID, payload: dict) -> Patient:
         patient.notes = payload["notes"]
 
     db.flush()
+    after_commit(db, partial(invalidate_counts, "patients"))
     return patient
 
 
 def delete_patient(db: Session, patient_id: UUID) -> None:
     patient = get_patient(db, patient_id)
     db.delete(patient)
+    after_commit(db, partial(invalidate_counts, "patients"))
+
+
+def bulk_update_patients(db: Session, patient_ids: Sequence[UUID], changes: dict) -> Tuple[List[UUID], List[UUID]]:
+    """Apply the same ``changes`` to every patient of ``patient_ids`` with one ``UPDATE``.
+
+    Values are handled as in :func:`update_patient`. The version trigger bumps each
+    updated row. Returns the updated ids and the ids that do not exist.
+    """
+    values = {field: changes[field] for field in ("name", "birth_date") if changes.get(field)}
+    if changes.get("gender"):
+        values["gender"] = _parse_gender(changes["gender"])
+    values.update({field: changes[field] for field in ("phone", "notes") if field in changes})
+    if not values:
+        raise ValueError("No changes to apply.")
+
+    updated, missing = apply_to_ids(db, update(Patient).values(**values), Patient.id, patient_ids)
+    after_commit(db, partial(invalidate_counts, "patients"))
+    return [row.id for row in updated], missing
+
+
+def bulk_delete_patients(db: Session, patient_ids: Sequence[UUID]) -> Tuple[List[UUID], List[UUID]]:
+    """Delete every patient of ``patient_ids`` with one ``DELETE``; returns the deleted and missing ids."""
+    deleted, missing = apply_to_ids(db, delete(Patient), Patient.id, patient_ids)
+    after_commit(db, partial(invalidate_counts, "patients"))
+    return [row.id for row in deleted], missing
 
 
 def create_user_from_patient(db: Session, patient_id: UUID, default_password: str = "123456"):
@@ -203,3 +303,126 @@ def create_user_from_patient(db: Session, patient_id: UUID, default_password: st
     patient.user_id = user.id
     db.flush()
     return user
+
+
+RowError = Tuple[int, Optional[str], str]
+
+
+def import_patients(
+    db: Session,
+    rows: Sequence[Tuple[int, dict]],
+    *,
+    create_portal_users: bool = True,
+    default_password: str = "123456",
+) -> Tuple[int, List[RowError]]:
+    """Insert a batch of validated ``PatientCreate`` payloads, keyed by their line in the upload.
+
+    E-mail and document uniqueness is checked for the whole batch with a single query
+    (rows committed by earlier batches of the same import are seen too), and patients
+    and their portal users are written with multi-row ``INSERT ... ON CONFLICT DO
+    NOTHING``. A row taken by a concurrent request after the check is therefore
+    skipped rather than failing the batch. Rejected rows are reported as ``(line,
+    field, message)`` instead of aborting the batch.
+    """
+    errors: List[RowError] = []
+    candidates = []
+    for line, payload in rows:
+        try:
+            gender = _parse_gender(payload.get("gender"))
+        except ValueError as exc:
+            errors.append((line, "gender", str(exc)))
+            continue
+        if gender is None:
+            errors.append((line, "gender", "Gender is required."))
+            continue
+        candidates.append(
+            (line, {**payload, "email": payload["email"].lower(), "document": payload["document"].lower(), "gender": gender})
+        )
+
+    emails = {payload["email"] for _, payload in candidates}
+    documents = {payload["document"] for _, payload in candidates}
+    taken_emails, taken_documents = _taken_keys(db, emails, documents) if candidates else (set(), set())
+
+    pending = []
+    for line, payload in candidates:
+        if payload["email"] in taken_emails:
+            errors.append((line, "email", "E-mail already used by another patient."))
+            continue
+        if payload["document"] in taken_documents:
+            errors.append((line, "document", "Document already used by another patient."))
+            continue
+        taken_emails.add(payload["email"])
+        taken_documents.add(payload["document"])
+        pending.append((line, {**payload, "id": uuid4(), "user_id": None}))
+
+    if not pending:
+        return 0, errors
+
+    inserted_ids = set(insert_many_unless_conflict(db, Patient, [patient for _, patient in pending], Patient.id))
+    patients = [patient for _, patient in pending if patient["id"] in inserted_ids]
+    if len(patients) < len(pending):
+        # Lost the race with a concurrent insert: find out which key was taken, as create_patient does.
+        losers = [(line, patient) for line, patient in pending if patient["id"] not in inserted_ids]
+        lost_emails, _ = _taken_keys(db, {patient["email"] for _, patient in losers}, set())
+        for line, patient in losers:
+            if patient["email"] in lost_emails:
+                errors.append((line, "email", "E-mail already used by another patient."))
+            else:
+                errors.append((line, "document", "Document already used by another patient."))
+
+    if patients:
+        if create_portal_users:
+            _create_portal_users(db, patients, default_password)
+        after_commit(db, partial(invalidate_counts, "patients"))
+    return len(patients), errors
+
+
+def _taken_keys(db: Session, emails: Collection[str], documents: Collection[str]) -> Tuple[set, set]:
+    """The e-mails and documents among ``emails`` and ``documents`` that patients already use."""
+    taken_emails, taken_documents = set(), set()
+    existing = db.query(func.lower(Patient.email), func.lower(Patient.document)).filter(
+        or_(func.lower(Patient.email).in_(emails), func.lower(Patient.document).in_(documents))
+    )
+    for email, document in existing:
+        taken_emails.add(email)
+        taken_documents.add(document)
+    return taken_emails, taken_documents
+
+
+def _create_portal_users(db: Session, patients: List[dict], default_password: str) -> None:
+    """Create and link the portal users of imported patients whose e-mail has no user yet.
+
+    One insert for the users, skipping e-mails a concurrent request took meanwhile,
+    and one executemany ``UPDATE`` linking them to their patients.
+    """
+    emails = [patient["email"] for patient in patients]
+    existing = {email for (email,) in db.query(func.lower(User.email)).filter(func.lower(User.email).in_(emails))}
+    pending = [patient for patient in patients if patient["email"] not in existing]
+    if not pending:
+        return
+
+    hashes = password.hash_passwords([default_password] * len(pending))
+    users = [
+        {
+            "id": uuid4(),
+            "name": patient["name"],
+            "email": patient["email"],
+            "password": hashed,
+            "role": RoleEnum.PATIENT,
+        }
+        for patient, hashed in zip(pending, hashes)
+    ]
+    created = set(insert_many_unless_conflict(db, User, users, User.id))
+    links = [
+        {"patient_id": patient["id"], "new_user_id": user["id"]}
+        for patient, user in zip(pending, users)
+        if user["id"] in created
+    ]
+    if links:
+        # A Core executemany: the ORM's bulk UPDATE by primary key would also require the rows' versions.
+        table = Patient.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("patient_id")).values(user_id=bindparam("new_user_id")),
+            links,
+        )
+    after_commit(db, partial(invalidate_counts, "users"))
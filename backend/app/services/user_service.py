@@ -1,15 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional, Sequence, Tuple
+from functools import partial
+from typing import Collection, Iterator, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import asc, desc, func, or_
+from sqlalchemy import asc, desc, func, update
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.orm import Session
 
+from app.config import settings
+from app.db import after_commit
 from app.models.enums import RoleEnum
 from app.models.user import User
 from app.security import password
+from app.security.auth import invalidate_principal, invalidate_principals, note_token_version, note_token_versions
+from app.utils.batch import apply_to_ids, fetch_by_ids
+from app.utils.etags import VersionMismatchError
+from app.utils.fieldsets import column_loader
+from app.utils.pagination import CountMode, count_total, invalidate_counts, paginate
+from app.utils.search import text_search
+from app.utils.unique import insert_unless_conflict
 
 
 class UserNotFoundError(NoResultFound):
@@ -20,20 +30,32 @@ class EmailAlreadyInUseError(ValueError):
     pass
 
 
+_SORT_FIELDS = {
+    "nome": User.name,
+    "name": User.name,
+    "email": User.email,
+    "perfil": User.role,
+    "role": User.role,
+    "dataCriacao": User.created_at,
+    "created_at": User.created_at,
+    "createdAt": User.created_at,
+}
+
+
 def _apply_filters(query, role: Optional[str], text: Optional[str]):
     if role:
         query = query.filter(User.role == _parse_role(role))
-    if text:
-        lowered = f"%{text.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(User.name).like(lowered),
-                func.lower(User.email).like(lowered),
-            )
-        )
+    search = text_search(User.name, User.email, text=text)
+    if search is not None:
+        query = query.filter(search)
     return query
 
 
+def _revoke_tokens(user: User) -> None:
+    """Bump the token version so self-contained tokens issued before this change are rejected."""
+    user.token_version = (user.token_version or 0) + 1
+
+
 def _parse_role(value: str) -> RoleEnum:
     try:
         return RoleEnum(value)
@@ -50,89 +72,193 @@ def list_users(
     text: Optional[str],
     sort_field: str,
     sort_direction: str,
-) -> Tuple[Sequence[User], int]:
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[Sequence[User], Optional[int], CountMode, Optional[str]]:
     query = db.query(User)
     query = _apply_filters(query, role, text)
 
-    total = query.count()
+    total, total_type = count_total(query, count, cache_key=("users", role, text))
 
-    sort_attr = {
-        "nome": User.name,
-        "name": User.name,
-        "email": User.email,
-        "perfil": User.role,
-        "role": User.role,
-        "dataCriacao": User.created_at,
-        "created_at": User.created_at,
-    }.get(sort_field, User.name)
+    sort_attr = _SORT_FIELDS.get(sort_field, User.name)
 
-    direction = desc if sort_direction.lower() == "desc" else asc
-    query = query.order_by(direction(sort_attr))
+    items, next_cursor = paginate(
+        query.options(column_loader(User, columns, sort_attr)),
+        sort_attr=sort_attr,
+        id_attr=User.id,
+        descending=sort_direction.lower() == "desc",
+        page=page,
+        size=size,
+        cursor=cursor,
+    )
+    return items, total, total_type, next_cursor
 
-    offset = page * size
-    items = query.offset(offset).limit(size).all()
-    return items, total
+
+def export_users(
+    db: Session,
+    *,
+    role: Optional[str],
+    text: Optional[str],
+    sort_field: str,
+    sort_direction: str,
+) -> Iterator[User]:
+    """Iterate over every user matching the filters through a server-side cursor."""
+    query = _apply_filters(db.query(User), role, text)
+    sort_attr = _SORT_FIELDS.get(sort_field, User.name)
+    direction = desc if sort_direction.lower() == "desc" else asc
+    return iter(query.order_by(direction(sort_attr), direction(User.id)).yield_per(settings.export_batch_size))
 
 
-def get_user(db: Session, user_id: UUID) -> User:
-    user = db.query(User).filter_by(id=user_id).first()
+def get_user(db: Session, user_id: UUID, *, columns: Optional[Collection[str]] = None) -> User:
+    user = (
+        db.query(User)
+        .options(column_loader(User, columns, User.version))
+        .filter_by(id=user_id)
+        .first()
+    )
     if user is None:
         raise UserNotFoundError("User not found")
     return user
 
 
-def get_user_by_email(db: Session, email: str) -> User:
-    user = db.query(User).filter(func.lower(User.email) == email.lower()).first()
+def get_users_by_ids(
+    db: Session,
+    user_ids: Sequence[UUID],
+    *,
+    columns: Optional[Collection[str]] = None,
+) -> Tuple[List[User], List[UUID]]:
+    """Users with the given ids in the same order, and the ids that do not exist, in one query."""
+    query = db.query(User).options(column_loader(User, columns))
+    return fetch_by_ids(query, User.id, user_ids)
+
+
+def get_user_version(db: Session, user_id: UUID) -> int:
+    """Current row version of a user, read without loading the user."""
+    version = db.query(User.version).filter(User.id == user_id).scalar()
+    if version is None:
+        raise UserNotFoundError("User not found")
+    return version
+
+
+def get_user_by_email(db: Session, email: str, *, columns: Optional[Collection[str]] = None) -> User:
+    user = (
+        db.query(User)
+        .options(column_loader(User, columns, User.version))
+        .filter(func.lower(User.email) == email.lower())
+        .first()
+    )
     if user is None:
         raise UserNotFoundError("User not found")
     return user
 
 
 def create_user(db: Session, payload: dict) -> User:
-    payload = payload.copy()
-    email = payload["email"].lower()
+    """Insert a user; the unique index on the e-mail rejects duplicates.
 
-    if db.query(User).filter(func.lower(User.email) == email).first():
+    A taken e-mail is looked up before hashing, so a duplicate is refused without
+    paying for bcrypt. The insert still skips conflicts for requests racing past it.
+    """
+    payload = payload.copy()
+    payload["email"] = payload["email"].lower()
+    if _email_taken(db, payload["email"]):
         raise EmailAlreadyInUseError("Email is already in use.")
-
-    payload["email"] = email
     payload["password"] = password.hash_password(payload.pop("senha", payload.get("password")))
     payload["role"] = _parse_role(payload.pop("perfil", payload.get("role")))
 
-    user = User(**payload)
-    db.add(user)
-    db.flush()
+    user = insert_unless_conflict(db, User, payload)
+    if user is None:
+        raise EmailAlreadyInUseError("Email is already in use.")
+    after_commit(db, partial(invalidate_counts, "users"))
     return user
 
 
-def update_user(db: Session, user_id: UUID, payload: dict) -> User:
+def _email_taken(db: Session, email: str) -> bool:
+    return db.query(db.query(User.id).filter(func.lower(User.email) == email).exists()).scalar()
+
+
+def _forget_principal(db: Session, email: str) -> None:
+    """Drop the cached principal of ``email`` once ``db`` commits the change."""
+    after_commit(db, partial(invalidate_principal, email))
+
+
+def _note_version(db: Session, user_id: UUID, version: Optional[int]) -> None:
+    """Record the new token version of ``user_id`` once ``db`` commits it; ``None`` for a deleted user."""
+    after_commit(db, partial(note_token_version, user_id, version))
+
+
+def update_user(
+    db: Session,
+    user_id: UUID,
+    payload: dict,
+    *,
+    expected_versions: Optional[Collection[int]] = None,
+) -> User:
+    """Apply ``payload``; with ``expected_versions`` only if the user is still at one of them."""
     user = get_user(db, user_id)
+    if expected_versions is not None and user.version not in expected_versions:
+        raise VersionMismatchError("User was modified by another request.")
 
     email = payload["email"].lower()
     if user.email != email:
-        if db.query(User).filter(func.lower(User.email) == email).first():
+        if _email_taken(db, email):
             raise EmailAlreadyInUseError("Email is already in use.")
+        _forget_principal(db, user.email)
         user.email = email
+        _revoke_tokens(user)
 
     user.name = payload.get("name") or payload.get("nome") or user.name
     db.flush()
+    _forget_principal(db, user.email)
+    _note_version(db, user.id, user.token_version)
+    after_commit(db, partial(invalidate_counts, "users"))
     return user
 
 
 def change_role(db: Session, user_id: UUID, role_code: str) -> User:
     user = get_user(db, user_id)
     user.role = _parse_role(role_code)
+    _revoke_tokens(user)
     db.flush()
+    _forget_principal(db, user.email)
+    _note_version(db, user.id, user.token_version)
+    after_commit(db, partial(invalidate_counts, "users"))
     return user
 
 
+def bulk_change_role(db: Session, user_ids: Sequence[UUID], role_code: str) -> Tuple[List[UUID], List[UUID]]:
+    """Give ``role_code`` to every user of ``user_ids`` with one ``UPDATE``, revoking their tokens.
+
+    Returns the updated ids and the ids that do not exist.
+    """
+    role = _parse_role(role_code)
+    updated, missing = apply_to_ids(
+        db,
+        update(User).values(role=role, token_version=func.coalesce(User.token_version, 0) + 1),
+        User.id,
+        user_ids,
+        User.email,
+        User.token_version,
+    )
+    after_commit(db, partial(invalidate_principals, [row.email for row in updated]))
+    after_commit(db, partial(note_token_versions, {row.id: row.token_version for row in updated}))
+    after_commit(db, partial(invalidate_counts, "users"))
+    return [row.id for row in updated], missing
+
+
 def change_password(db: Session, user_id: UUID, raw_password: str) -> User:
     user = get_user(db, user_id)
     user.password = password.hash_password(raw_password)
+    _revoke_tokens(user)
     db.flush()
+    _forget_principal(db, user.email)
+    _note_version(db, user.id, user.token_version)
     return user
 
 
 def delete_user(db: Session, user_id: UUID) -> None:
     user = get_user(db, user_id)
     db.delete(user)
+    _forget_principal(db, user.email)
+    _note_version(db, user.id, None)
+    after_commit(db, partial(invalidate_counts, "users"))
@@ -1,3 +1,19 @@
-from app.utils.pagination import build_page
+from typing import TYPE_CHECKING
 
-__all__ = ["build_page"]
+from app.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from app.utils.pagination import InvalidCursorError, build_page, paginate
+    from app.utils.search import text_search
+
+__all__ = ["InvalidCursorError", "build_page", "paginate", "text_search"]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "InvalidCursorError": "app.utils.pagination",
+        "build_page": "app.utils.pagination",
+        "paginate": "app.utils.pagination",
+        "text_search": "app.utils.search",
+    },
+)
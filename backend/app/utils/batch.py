@@ -0,0 +1,73 @@
+"""Read and write batches of records by id with one statement."""
+from __future__ import annotations
+
+from typing import Any, Iterable, List, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import Delete, Update, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import InstrumentedAttribute, Query, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.schemas.common import BulkItemResult, BulkResponse, BulkStatus
+
+
+def id_in(id_attr: InstrumentedAttribute, ids: Sequence[UUID]) -> ColumnElement[bool]:
+    """``id = ANY(:ids)`` with the ids bound as one array parameter.
+
+    The statement text (and its cached plan) is the same whatever the number of ids,
+    unlike ``IN`` with one parameter per id.
+    """
+    return id_attr == any_(bindparam("ids", list(ids), type_=ARRAY(id_attr.type)))
+
+
+def fetch_by_ids(query: Query, id_attr: InstrumentedAttribute, ids: Iterable[UUID]) -> Tuple[List[Any], List[UUID]]:
+    """Rows of ``query`` whose ``id_attr`` is in ``ids``, in the order of ``ids``, and the ids not found.
+
+    Repeated ids are returned once.
+    """
+    wanted = list(dict.fromkeys(ids))
+    if not wanted:
+        return [], []
+    by_id = {row.id: row for row in query.filter(id_in(id_attr, wanted))}
+    found = [by_id[id_] for id_ in wanted if id_ in by_id]
+    missing = [id_ for id_ in wanted if id_ not in by_id]
+    return found, missing
+
+
+def apply_to_ids(
+    db: Session,
+    statement: Update | Delete,
+    id_attr: InstrumentedAttribute,
+    ids: Iterable[UUID],
+    *returning: Any,
+) -> Tuple[List[Row], List[UUID]]:
+    """Run a set-based ``UPDATE``/``DELETE`` on the rows whose ``id_attr`` is in ``ids``.
+
+    Returns the affected rows (their id plus the ``returning`` columns) in the order of
+    ``ids``, and the ids that matched no row. Instances already loaded in ``db`` are
+    not synchronized: bulk operations run on their own and nothing else reads them in
+    the same session.
+    """
+    wanted = list(dict.fromkeys(ids))
+    if not wanted:
+        return [], []
+    result = db.execute(
+        statement.where(id_in(id_attr, wanted)).returning(id_attr, *returning),
+        execution_options={"synchronize_session": False},
+    )
+    by_id = {row[0]: row for row in result}
+    affected = [by_id[id_] for id_ in wanted if id_ in by_id]
+    missing = [id_ for id_ in wanted if id_ not in by_id]
+    return affected, missing
+
+
+def bulk_response(ids: Iterable[UUID], missing: Iterable[UUID], status: BulkStatus) -> BulkResponse:
+    """Per-id outcome of a bulk operation: ``status`` for each id, unless it is in ``missing``."""
+    not_found = set(missing)
+    results = [
+        BulkItemResult(id=id_, status=BulkStatus.NOT_FOUND if id_ in not_found else status)
+        for id_ in dict.fromkeys(ids)
+    ]
+    return BulkResponse(affected=len(results) - len(not_found), results=results)
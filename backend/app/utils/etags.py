@@ -0,0 +1,60 @@
+"""Strong ETags derived from the row ``version`` of users, patients and doctors.
+
+The tag of a record is its version, plus a short hash of the selected fields for
+sparse responses, since each field selection is a different representation. Versions
+are cheap to read, so ``If-None-Match`` is answered with ``304 Not Modified`` before
+the record itself is loaded, and ``If-Match`` turns an update into a conditional one.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Collection, FrozenSet, Optional
+
+from starlette.responses import Response
+
+_ETAG = re.compile(r'(W/)?"(\d+)(?:-[0-9a-f]{8})?"')
+
+IF_MATCH_DESCRIPTION = "ETag read before editing; `412 Precondition Failed` if the record changed since."
+PRECONDITION_FAILED_DESCRIPTION = "`If-Match` does not match the current version of the record."
+
+
+class VersionMismatchError(ValueError):
+    """Raised when a conditional update targets a version that is no longer current."""
+
+
+def make_etag(version: int, fields: Optional[Collection[str]] = None) -> str:
+    if fields is None:
+        return f'"{version}"'
+    selection = ",".join(sorted(fields)).encode("utf-8")
+    return f'"{version}-{zlib.crc32(selection):08x}"'
+
+
+def is_not_modified(header: Optional[str], etag: str) -> bool:
+    """Whether ``If-None-Match`` matches ``etag`` (weak comparison, as RFC 9110 requires)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def if_match_versions(header: Optional[str]) -> Optional[FrozenSet[int]]:
+    """Versions accepted by an ``If-Match`` header; ``None`` when any version is.
+
+    Weak tags never match (strong comparison), so a header made only of weak or
+    foreign tags yields an empty set and the update is refused.
+    """
+    if not header or header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        match = _ETAG.fullmatch(tag.strip())
+        if match and not match.group(1):
+            versions.add(int(match.group(2)))
+    return frozenset(versions)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,51 @@
+"""Sparse fieldsets of the list and get endpoints.
+
+``fields=name,email`` limits each returned item to the listed attributes, plus ``id``,
+which is always returned. The selection is pushed down to the query with
+``load_only``, so the other columns are neither fetched nor serialized. Without
+``fields`` every attribute is returned, deferred columns included.
+"""
+from __future__ import annotations
+
+from typing import Any, Collection, FrozenSet, Optional, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only, undefer
+from sqlalchemy.orm.interfaces import LoaderOption
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when ``fields`` names an attribute the response does not have."""
+
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Attribute names of ``model`` selected by a comma-separated ``fields`` parameter.
+
+    Items may use the attribute name or its JSON alias (``birthDate``). Returns ``None``
+    when ``fields`` is empty, meaning every attribute.
+    """
+    requested = [item.strip() for item in (fields or "").split(",") if item.strip()]
+    if not requested:
+        return None
+
+    by_name = {}
+    for name, info in model.model_fields.items():
+        by_name[name] = name
+        if info.alias:
+            by_name[info.alias] = name
+
+    unknown = [item for item in requested if item not in by_name]
+    if unknown:
+        allowed = ", ".join(info.alias or name for name, info in model.model_fields.items())
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(unknown)}. Allowed values: {allowed}.")
+    return frozenset(["id", *(by_name[item] for item in requested)])
+
+
+def column_loader(entity: Any, columns: Optional[Collection[str]], *required: Any) -> LoaderOption:
+    """Loader option fetching only ``columns`` of ``entity`` (and the ``required`` attributes).
+
+    ``None`` loads every column, undeferring the ones deferred by the mapping.
+    """
+    if columns is None:
+        return undefer("*")
+    return load_only(*{getattr(entity, name) for name in columns}, *required)
@@ -0,0 +1,35 @@
+"""Package attributes imported on first access (PEP 562).
+
+A package ``__init__`` that imports its modules makes ``from app.services import
+user_service`` load every service and everything they import in turn. With
+:func:`lazy_exports` a name is imported when it is first used instead.
+"""
+from __future__ import annotations
+
+import sys
+from importlib import import_module
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+
+def lazy_exports(
+    package: str, exports: Mapping[str, Optional[str]]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """Module ``__getattr__`` and ``__dir__`` for ``package``.
+
+    ``exports`` maps every exported name to the module defining it, or to ``None`` when
+    the name is a submodule of ``package``.
+    """
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        source = exports[name]
+        value = import_module(f"{package}.{name}") if source is None else getattr(import_module(source), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted({*namespace, *exports})
+
+    return __getattr__, __dir__
@@ -1,22 +1,222 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from enum import Enum
 from math import ceil
-from typing import Sequence, TypeVar
+from typing import Any, Hashable, List, Optional, Sequence, Tuple, Type, TypeVar
+from uuid import UUID
 
+from sqlalchemy import asc, desc, literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.config import settings
 from app.schemas.common import PageResponse
+from app.utils.cache import TTLCache
 
 T = TypeVar("T")
 
 
-def build_page(content: Sequence[T], total: int, page: int, size: int) -> PageResponse[T]:
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the requested sort."""
+
+
+class CountMode(str, Enum):
+    """How the total of a listing is computed."""
+
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+_count_cache = TTLCache(maxsize=settings.count_cache_size, ttl=settings.count_cache_ttl_seconds)
+
+
+def build_page(
+    content: Sequence[T],
+    total: Optional[int],
+    page: int,
+    size: int,
+    next_cursor: Optional[str] = None,
+    total_type: CountMode = CountMode.EXACT,
+    item_type: Optional[Type[T]] = None,
+) -> PageResponse[T]:
+    """Wrap a page of results.
+
+    ``last`` is derived from ``next_cursor``: services always fetch one row past the
+    page, so a missing cursor means there is nothing left to read, both in offset and
+    in cursor mode, and whether or not a total was computed.
+
+    The page is not validated again: ``content`` must already hold DTOs. With
+    ``item_type`` the page is a ``PageResponse[item_type]``, which is what
+    :func:`app.utils.serialization.page_response` serializes.
+    """
     size = max(size, 1)
-    total_pages = ceil(total / size) if total else 0
-    last = page >= (total_pages - 1) if total_pages else True
-    return PageResponse[T](
+    if total is None:
+        total_pages = None
+    else:
+        total_pages = ceil(total / size) if total else 0
+    page_type = PageResponse[item_type] if item_type is not None else PageResponse[T]
+    return page_type.model_construct(
         content=content,
         page=page,
         size=size,
         totalElements=total,
         totalPages=total_pages,
-        last=last,
+        totalType=total_type.value,
+        last=next_cursor is None,
+        nextCursor=next_cursor,
+    )
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _estimate_rows(query) -> Optional[int]:
+    """Row count predicted by the Postgres planner for ``query``, without running it."""
+    session = query.session
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    plan = session.execute(_Explain(query.statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_total(query, mode: CountMode, *, cache_key: Optional[Hashable] = None) -> Tuple[Optional[int], CountMode]:
+    """Compute the total of a listing according to ``mode``.
+
+    ``estimate`` trusts the planner estimate only when it is above
+    ``COUNT_ESTIMATE_THRESHOLD``; small results are cheap to count and get an exact
+    total. ``none`` skips counting altogether. When ``COUNT_CACHE_TTL_SECONDS`` is set,
+    totals are cached per ``cache_key`` (the entity name followed by the filters).
+    Returns the total and the kind of total that was actually produced.
+    """
+    if mode is CountMode.NONE:
+        return None, CountMode.NONE
+
+    key = (cache_key, mode) if cache_key is not None else None
+    if key is not None and _count_cache.enabled:
+        cached = _count_cache.get(key)
+        if cached is not None:
+            return cached
+
+    result: Tuple[Optional[int], CountMode]
+    estimate = _estimate_rows(query) if mode is CountMode.ESTIMATE else None
+    if estimate is not None and estimate >= settings.count_estimate_threshold:
+        result = (estimate, CountMode.ESTIMATE)
+    else:
+        result = (query.count(), CountMode.EXACT)
+
+    if key is not None:
+        _count_cache.set(key, result)
+    return result
+
+
+def invalidate_counts(entity: str) -> None:
+    """Drop the cached totals of ``entity`` after rows were created or removed.
+
+    Services register it with :func:`app.db.after_commit`, so the totals are only
+    dropped once the change is visible to the next count.
+    """
+    if _count_cache.enabled:
+        _count_cache.invalidate_where(lambda key: key[0][0] == entity)
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _from_json(value: Any, column) -> Any:
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    if issubclass(python_type, Enum):
+        return python_type(value)
+    return value
+
+
+def encode_cursor(sort_key: str, descending: bool, values: Sequence[Any]) -> str:
+    payload = {"k": sort_key, "d": "desc" if descending else "asc", "v": [_to_json(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_attr, id_attr, descending: bool) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value, id_value = payload["v"]
+        matches = payload["k"] == sort_attr.key and payload["d"] == ("desc" if descending else "asc")
+        values = [_from_json(sort_value, sort_attr), _from_json(id_value, id_attr)]
+    except (binascii.Error, UnicodeError, TypeError, KeyError, ValueError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor.") from exc
+
+    if not matches:
+        raise InvalidCursorError("Pagination cursor does not match the requested sort.")
+    return values
+
+
+def paginate(
+    query,
+    *,
+    sort_attr,
+    id_attr,
+    descending: bool,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page ordered by ``(sort_attr, id_attr)``.
+
+    With a ``cursor`` the page starts right after the encoded row using a row-value
+    comparison, so the database seeks through the ``(sort, id)`` index instead of
+    scanning and discarding ``page * size`` rows. Without it the classic offset is used.
+    Either way a cursor for the following page is returned when more rows exist.
+    """
+    direction = desc if descending else asc
+    query = query.order_by(direction(sort_attr), direction(id_attr))
+
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, sort_attr, id_attr, descending)
+        row = tuple_(sort_attr, id_attr)
+        boundary = tuple_(literal(sort_value, sort_attr.type), literal(id_value, id_attr.type))
+        query = query.filter(row < boundary if descending else row > boundary)
+    else:
+        query = query.offset(page * size)
+
+    items = query.limit(size + 1).all()
+    if len(items) <= size:
+        return items, None
+
+    items = items[:size]
+    tail = items[-1]
+    next_cursor = encode_cursor(
+        sort_attr.key,
+        descending,
+        [getattr(tail, sort_attr.key), getattr(tail, id_attr.key)],
     )
+    return items, next_cursor
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def text_search(*columns, text: Optional[str]) -> Optional[ColumnElement]:
+    """Build the substring predicate used by the `text` filter of the listings.
+
+    Each column is matched as ``lower(column) LIKE '%term%'``, exactly the expression
+    covered by the ``gin_trgm_ops`` indexes, so Postgres answers the OR with a bitmap
+    scan over the trigram indexes instead of reading the whole table. LIKE wildcards
+    typed by the user are escaped so they are searched literally.
+    """
+    term = (text or "").strip().lower()
+    if not term:
+        return None
+
+    pattern = f"%{_escape_like(term)}%"
+    return or_(*(func.lower(column).like(pattern) for column in columns))
@@ -0,0 +1,76 @@
+"""Fast JSON path for list and get responses.
+
+Returning a model from an endpoint with a ``response_model`` costs three passes:
+the DTOs are validated when built, FastAPI validates the payload again against the
+response model and then encodes it with the stdlib ``json`` module. Rows read from the
+database already hold the types of the schema, so list endpoints build their DTOs
+with :func:`from_rows`, which skips validation, and answer with
+:func:`page_response`, which serializes the page once in pydantic-core and writes the
+bytes as they are (:func:`item_response` does the same for a single item). The JSON
+shape is the same as the ``response_model`` path.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Collection, Iterable, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+from app.schemas.common import BatchGetResponse, PageResponse
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose body was already encoded to bytes."""
+
+    media_type = "application/json"
+
+
+def from_rows(model: Type[M], rows: Iterable[Any], fields: Optional[Collection[str]] = None) -> List[M]:
+    """Build ``model`` instances from ORM rows without validating them.
+
+    Only meant for rows loaded from the database, whose attributes already have the
+    types declared by ``model``; payloads coming from clients must be validated. With
+    ``fields`` only those attributes are read, so columns left out of the query are
+    never lazy-loaded.
+    """
+    names = tuple(model.model_fields) if fields is None else tuple(fields)
+    construct = model.model_construct
+    return [construct(**{name: getattr(row, name) for name in names}) for row in rows]
+
+
+def from_row(model: Type[M], row: Any, fields: Optional[Collection[str]] = None) -> M:
+    return from_rows(model, (row,), fields)[0]
+
+
+@lru_cache(maxsize=None)
+def _adapter(page_type: type) -> TypeAdapter:
+    return TypeAdapter(page_type)
+
+
+def page_response(page: PageResponse[Any], fields: Optional[Collection[str]] = None) -> JSONBytesResponse:
+    """Serialize ``page`` (built by ``build_page`` with its ``item_type``) to a response.
+
+    With ``fields`` each item is limited to those attributes.
+    """
+    include = None
+    if fields is not None:
+        include = {name: True for name in PageResponse.model_fields}
+        include["content"] = {"__all__": set(fields)}
+    return JSONBytesResponse(_adapter(type(page)).dump_json(page, by_alias=True, include=include))
+
+
+def item_response(item: BaseModel, fields: Optional[Collection[str]] = None) -> JSONBytesResponse:
+    """Serialize a single DTO, limited to ``fields`` when given."""
+    include = set(fields) if fields is not None else None
+    return JSONBytesResponse(_adapter(type(item)).dump_json(item, by_alias=True, include=include))
+
+
+def batch_response(batch: BatchGetResponse[Any], fields: Optional[Collection[str]] = None) -> JSONBytesResponse:
+    """Serialize ``batch`` (a ``BatchGetResponse[item type]``), items limited to ``fields`` when given."""
+    include = None
+    if fields is not None:
+        include = {"content": {"__all__": set(fields)}, "missing": True}
+    return JSONBytesResponse(_adapter(type(batch)).dump_json(batch, by_alias=True, include=include))
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Generator, Iterable, Iterator, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session
+
+ParsedRecord = Tuple[int, Optional[dict], Optional[str]]
+"""``(line, data, error)``: ``data`` is set for parsed records, ``error`` for malformed ones."""
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """Parse a newline-delimited JSON body incrementally, one object per line."""
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Invalid JSON."
+            continue
+        if not isinstance(data, dict):
+            yield line_no, None, "Each line must be a JSON object."
+            continue
+        yield line_no, data, None
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """Parse a CSV body incrementally; the first record holds the column names.
+
+    Lines are accumulated while a quoted field is still open, so values containing
+    line breaks are kept whole. Empty cells are returned as ``None``.
+    """
+    header = None
+    pending = []
+    start = line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            start = line_no
+        pending.append(line)
+        record = "\n".join(pending)
+        if record.count('"') % 2:
+            continue
+        pending = []
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Expected {len(header)} columns, found {len(values)}."
+            continue
+        yield start, {name: value or None for name, value in zip(header, values)}, None
+
+    if pending:
+        yield start, None, "Unterminated quoted field."
+
+
+def iter_records(chunks: AsyncIterator[bytes], content_type: Optional[str]) -> AsyncIterator[ParsedRecord]:
+    """Pick the parser from the request ``Content-Type``: CSV for ``text/csv``, NDJSON otherwise."""
+    if content_type and "csv" in content_type.lower():
+        return iter_csv(chunks)
+    return iter_ndjson(chunks)
+
+
+class ExportFormat(str, Enum):
+    """Body formats offered by the export endpoints."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "text/csv; charset=utf-8" if self is ExportFormat.CSV else "application/x-ndjson"
+
+
+_FLUSH_BYTES = 64 * 1024
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, dict):
+        return value["code"] if "code" in value else json.dumps(value, ensure_ascii=False)
+    if isinstance(value, list):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _encode_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _encode_csv(rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({key: _csv_cell(value) for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _chunked(lines: Iterator[str]) -> Generator[bytes, None, None]:
+    """Group encoded rows into ~64 KiB chunks; the first row is sent on its own so it arrives at once."""
+    pending = []
+    size = 0
+    first = True
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if first or size >= _FLUSH_BYTES:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            size = 0
+            first = False
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def export_response(
+    db: Session,
+    rows: Iterable[Any],
+    serialize: Callable[[Any], dict],
+    export_format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """Stream ``rows`` as NDJSON or CSV, closing ``db`` once the response is over.
+
+    The session is owned by the response rather than by ``get_db``: yield dependencies
+    are torn down before a streaming body is sent, which would close the server-side
+    cursor half way through the export. It is closed by a background task, which
+    Starlette runs after the body is sent and also when the client disconnects half
+    way, while a generator left unfinished would hold the connection until collected.
+    """
+    encode = _encode_csv if export_format is ExportFormat.CSV else _encode_ndjson
+    body = _chunked(encode(serialize(row) for row in rows))
+
+    extension = "csv" if export_format is ExportFormat.CSV else "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=export_format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+        background=BackgroundTask(_close_export, body, db),
+    )
+
+
+def _close_export(body: Generator[bytes, None, None], db: Session) -> None:
+    # The body is no longer iterated by then: a disconnect cancels the stream only once
+    # the threadpool call fetching the next chunk has returned.
+    body.close()
+    db.close()
@@ -0,0 +1,43 @@
+"""Inserts that let the unique indexes enforce uniqueness.
+
+Checking e-mails, documents or CRMs with a ``SELECT`` before the ``INSERT`` costs a
+round trip per key and still races with concurrent requests. ``INSERT ... ON
+CONFLICT DO NOTHING RETURNING`` does both in one statement. A conflict does not
+abort the transaction, so the caller can carry on, e.g. when the portal user of a
+new patient already exists. Only the caller knows which key collided and has to
+find out, which is cheap because it only happens on the failure path.
+"""
+from __future__ import annotations
+
+from typing import Any, List, Mapping, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+E = TypeVar("E")
+
+
+def insert_unless_conflict(db: Session, entity: Type[E], values: Mapping[str, Any]) -> Optional[E]:
+    """Insert a row of ``entity`` and return it as a persistent instance; ``None`` if a unique key is taken."""
+    statement = insert(entity).values(**values).on_conflict_do_nothing().returning(entity)
+    instance = db.scalars(statement).first()
+    if instance is not None:
+        # Deferred columns are not part of RETURNING; their values are known already.
+        for key, value in values.items():
+            if key not in instance.__dict__:
+                set_committed_value(instance, key, value)
+    return instance
+
+
+def insert_many_unless_conflict(
+    db: Session, entity: Type[E], rows: Sequence[Mapping[str, Any]], returning: Any
+) -> List[Any]:
+    """Insert ``rows`` of ``entity`` in one multi-row statement, skipping those whose unique keys are taken.
+
+    Returns the ``returning`` column (e.g. the primary key) of the rows actually inserted.
+    """
+    if not rows:
+        return []
+    statement = insert(entity).on_conflict_do_nothing().returning(returning)
+    return list(db.scalars(statement, rows))
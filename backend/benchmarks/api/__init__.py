@@ -0,0 +1,8 @@
+"""Latency and throughput of the API endpoints, checked against a stored baseline.
+
+The suite builds the real app with ``create_app()`` and runs it against the database
+in ``DATABASE_URL``. It seeds the rows it needs, then measures login, list, search,
+get-by-id and create on ``/patients``, ``/doctors`` and ``/users``, and the
+``/domains`` endpoints, and removes its rows afterwards. See ``python -m
+benchmarks.api --help``.
+"""
@@ -0,0 +1,131 @@
+"""Run the API benchmark suite and compare it with a stored baseline.
+
+The app runs in this process by default, called through ASGI, so only the app is
+measured. ``--transport uvicorn`` starts it as a uvicorn subprocess and measures
+over HTTP instead, and ``--url`` points the suite at an API already running on the
+same database. Every scenario prints p50/p95/p99 latency and throughput as JSON:
+
+    python -m benchmarks.api --save-baseline           # on the reference commit
+    python -m benchmarks.api                           # later: compares with it
+    python -m benchmarks.api --only 'patients.*' --latency-threshold 0.1
+
+The exit status is 1 when a scenario regressed beyond the thresholds.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from benchmarks.api import baseline, fixtures
+from benchmarks.api.clients import AsgiTransport, HttpTransport
+from benchmarks.api.runner import Transport, login, run_scenario
+from benchmarks.api.scenarios import Scenario, build_scenarios
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent.parent / "baselines" / "api.json"
+
+
+def _select(scenarios: List[Scenario], patterns: Optional[List[str]]) -> List[Scenario]:
+    if not patterns:
+        return scenarios
+    return [scenario for scenario in scenarios if any(fnmatch.fnmatch(scenario.name, pattern) for pattern in patterns)]
+
+
+def _transport(args: argparse.Namespace) -> Transport:
+    if args.url:
+        return HttpTransport(args.url, prefix=settings.api_prefix)
+    if args.transport == "uvicorn":
+        return HttpTransport(prefix=settings.api_prefix, workers=args.workers)
+    from app.main import create_app
+
+    return AsgiTransport(create_app())
+
+
+async def _run(transport: Transport, scenarios: List[Scenario], args: argparse.Namespace) -> Dict[str, Any]:
+    prefix = settings.api_prefix or ""
+    async with transport.running():
+        token = await login(transport, prefix)
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(
+                transport,
+                scenario,
+                token=token,
+                prefix=prefix,
+                requests=args.requests,
+                warmup=args.warmup,
+                concurrency=args.concurrency,
+            )
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    seeded = fixtures.seed(args.rows)
+    try:
+        scenarios = _select(build_scenarios(seeded, args.page_size), args.only)
+        transport = _transport(args)
+        results = asyncio.run(_run(transport, scenarios, args))
+    finally:
+        fixtures.cleanup()
+    return {
+        "config": {
+            "transport": transport.name,
+            "database_async": settings.database_async,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "page_size": args.page_size,
+            "rows": args.rows,
+        },
+        "scenarios": results,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi", help="How the app is run.")
+    parser.add_argument("--url", help="Base URL of an API already running on DATABASE_URL; overrides --transport.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --transport uvicorn.")
+    parser.add_argument("--requests", type=int, default=300, help="Measured requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=30, help="Unmeasured requests before each scenario.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent connections per scenario.")
+    parser.add_argument("--rows", type=int, default=200, help="Patients, doctors and users seeded.")
+    parser.add_argument("--page-size", type=int, default=20, help="Page size of the list and search scenarios.")
+    parser.add_argument("--only", action="append", metavar="PATTERN", help="Scenarios to run, e.g. 'users.*'.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline to compare with, if present.")
+    parser.add_argument(
+        "--save-baseline",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_BASELINE,
+        help="Store this run as the baseline (default path when no value is given).",
+    )
+    parser.add_argument("--latency-threshold", type=float, default=0.2, help="Allowed p50/p95/p99 growth, 0.2 = 20%%.")
+    parser.add_argument("--throughput-threshold", type=float, default=0.2, help="Allowed throughput drop.")
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=1.0, help="Latency growth below this is never a regression."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    report = run(args)
+
+    stored = baseline.load(args.baseline) if args.save_baseline is None else None
+    if stored is not None:
+        thresholds = baseline.Thresholds(args.latency_threshold, args.throughput_threshold, args.min_delta_ms)
+        report["comparison"] = {"baseline": str(args.baseline), **baseline.compare(report, stored, thresholds)}
+    if args.save_baseline is not None:
+        baseline.save(report, args.save_baseline)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if stored is not None and report["comparison"]["regressions"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
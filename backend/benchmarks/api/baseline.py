@@ -0,0 +1,89 @@
+"""Compare a run with a stored baseline run and flag regressions.
+
+A baseline is simply the JSON report of an earlier run, saved with
+``--save-baseline``. Latency percentiles regress when they grow by more than the
+latency threshold (a fraction: ``0.2`` is 20%) *and* by more than ``min_delta_ms``,
+so sub-millisecond jitter on fast endpoints is not reported. Throughput regresses
+when it drops by more than its threshold, and errors when there are more than in
+the baseline.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+# Runs are only comparable when these match; a mismatch is reported as a warning.
+CONFIG_KEYS = ("transport", "database_async", "concurrency", "page_size", "rows")
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    latency: float = 0.2
+    throughput: float = 0.2
+    min_delta_ms: float = 1.0
+
+
+def load(path: Path) -> Optional[Dict[str, Any]]:
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+
+
+def save(report: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stored = {key: value for key, value in report.items() if key != "comparison"}
+    path.write_text(json.dumps(stored, indent=2) + "\n", encoding="utf-8")
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    return round((after - before) / before, 3) if before else None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], thresholds: Thresholds) -> Dict[str, Any]:
+    warnings: List[str] = [
+        f"{key} differs from the baseline: {baseline['config'].get(key)!r} -> {report['config'].get(key)!r}"
+        for key in CONFIG_KEYS
+        if baseline["config"].get(key) != report["config"].get(key)
+    ]
+    regressions: List[Dict[str, Any]] = []
+    scenarios: Dict[str, Dict[str, Any]] = {}
+
+    for name, current in report["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            warnings.append(f"{name} is not in the baseline")
+            continue
+        metrics: Dict[str, Any] = {}
+        for metric in LATENCY_METRICS:
+            before, after = previous["latency_ms"][metric], current["latency_ms"][metric]
+            change = _change(before, after)
+            regressed = change is not None and change > thresholds.latency and after - before > thresholds.min_delta_ms
+            metrics[metric] = {"baseline": before, "current": after, "change": change, "regressed": regressed}
+
+        before, after = previous["throughput_rps"], current["throughput_rps"]
+        change = _change(before, after)
+        metrics["throughput_rps"] = {
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regressed": change is not None and change < -thresholds.throughput,
+        }
+
+        before, after = sum(previous["errors"].values()), sum(current["errors"].values())
+        metrics["errors"] = {"baseline": before, "current": after, "change": after - before, "regressed": after > before}
+
+        scenarios[name] = metrics
+        regressions += [
+            {"scenario": name, "metric": metric, **{key: values[key] for key in ("baseline", "current", "change")}}
+            for metric, values in metrics.items()
+            if values["regressed"]
+        ]
+
+    return {
+        "thresholds": asdict(thresholds),
+        "warnings": warnings,
+        "regressions": regressions,
+        "scenarios": scenarios,
+    }
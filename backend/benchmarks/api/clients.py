@@ -0,0 +1,235 @@
+"""Ways of sending requests to the app: in process through ASGI, or over HTTP to uvicorn.
+
+Both only use the standard library. A transport hands every benchmark worker its own
+connection, so HTTP clients keep one keep-alive socket each, like real clients do.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@dataclass(frozen=True)
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+def encode_body(payload: Optional[Any]) -> Optional[bytes]:
+    return None if payload is None else json.dumps(payload).encode("utf-8")
+
+
+class AsgiConnection:
+    """Calls the ASGI app directly: no server, no sockets, only the app's own cost."""
+
+    def __init__(self, app: FastAPI) -> None:
+        self._app = app
+
+    async def request(
+        self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes] = None
+    ) -> Response:
+        route, _, query = path.partition("?")
+        raw_headers: List[Tuple[bytes, bytes]] = [(b"host", b"localhost")]
+        raw_headers += [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        if body is not None:
+            raw_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": route,
+            "raw_path": route.encode("utf-8"),
+            "root_path": "",
+            "query_string": query.encode("utf-8"),
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 12345),
+            "server": ("localhost", 80),
+        }
+        request_sent = False
+        disconnected = asyncio.Event()
+        status = 0
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body or b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update(
+                    (name.decode("latin-1").lower(), value.decode("latin-1")) for name, value in message["headers"]
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    disconnected.set()
+
+        await self._app(scope, receive, send)
+        return Response(status, response_headers, b"".join(chunks))
+
+    async def close(self) -> None:
+        pass
+
+
+class AsgiTransport:
+    """The app built by ``create_app()``, its lifespan included, called in this process."""
+
+    name = "asgi"
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator["AsgiTransport"]:
+        async with self.app.router.lifespan_context(self.app):
+            yield self
+
+    async def connect(self) -> AsgiConnection:
+        return AsgiConnection(self.app)
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._host = host
+
+    async def request(
+        self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes] = None
+    ) -> Response:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self._host}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        if body is not None:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await self._writer.drain()
+        return await self._read_response()
+
+    async def _read_response(self) -> Response:
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server.")
+        status = int(status_line.split()[1])
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                chunks.append(await self._reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            body = b"".join(chunk[:-2] for chunk in chunks)
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", "0")))
+        return Response(status, headers, body)
+
+    async def close(self) -> None:
+        self._writer.close()
+
+
+class HttpTransport:
+    """An API listening on ``url``; without one a uvicorn subprocess is started for the run.
+
+    ``prefix`` is the ``API_PREFIX`` of the app, under which ``/health`` is polled
+    until the server is ready.
+    """
+
+    def __init__(
+        self, url: Optional[str] = None, *, prefix: str = "", workers: int = 1, startup_timeout: float = 60.0
+    ) -> None:
+        self.url = url
+        self._prefix = prefix
+        self.name = "http" if url else "uvicorn"
+        self._workers = workers
+        self._startup_timeout = startup_timeout
+        self._host = "127.0.0.1"
+        self._port = 0
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator["HttpTransport"]:
+        if self.url is not None:
+            parts = urlsplit(self.url)
+            self._host, self._port = parts.hostname or "localhost", parts.port or 80
+            yield self
+            return
+
+        self._port = _free_port()
+        self.url = f"http://{self._host}:{self._port}"
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", self._host, "--port", str(self._port),
+                "--workers", str(self._workers), "--log-level", "warning",
+            ],
+            cwd=BACKEND_DIR,
+        )
+        try:
+            await asyncio.to_thread(self._wait_until_ready, process)
+            yield self
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            self.url = None
+
+    def _wait_until_ready(self, process: subprocess.Popen) -> None:
+        deadline = time.monotonic() + self._startup_timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode} during startup.")
+            try:
+                with urllib.request.urlopen(f"{self.url}{self._prefix}/health", timeout=1):
+                    return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.1)
+        raise RuntimeError(f"uvicorn did not answer /health within {self._startup_timeout:.0f}s.")
+
+    async def connect(self) -> HttpConnection:
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        return HttpConnection(reader, writer, f"{self._host}:{self._port}")
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
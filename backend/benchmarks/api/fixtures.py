@@ -0,0 +1,86 @@
+"""Data the scenarios read: an admin to log in with, and patients, doctors and users to list and fetch.
+
+Every row the suite writes, seeded here or created by the scenarios, has an e-mail in
+:data:`EMAIL_DOMAIN`, which is how :func:`cleanup` finds them. Cleanup also runs
+before seeding, so an interrupted run leaves nothing behind for the next one.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List
+from uuid import UUID
+
+from app.db import session_scope
+from app.models.doctor import Doctor
+from app.models.enums import GenderEnum, RoleEnum
+from app.models.patient import Patient
+from app.models.user import User
+from app.security.password import hash_password
+
+EMAIL_DOMAIN = "hospital-benchmark.com"
+ADMIN_EMAIL = f"admin@{EMAIL_DOMAIN}"
+ADMIN_PASSWORD = "benchmark-password"
+SEARCH_TERM = "Benchmark"
+SPECIALTIES = ("Cardiologia", "Dermatologia", "Neurologia", "Pediatria", "Ortopedia")
+
+
+@dataclass(frozen=True)
+class Fixtures:
+    patient_ids: List[UUID]
+    doctor_ids: List[UUID]
+    user_ids: List[UUID]
+
+
+def cleanup() -> None:
+    """Delete every row with a benchmark e-mail; patients first, they reference users."""
+    pattern = f"%@{EMAIL_DOMAIN}"
+    with session_scope() as db:
+        for entity in (Patient, Doctor, User):
+            db.query(entity).filter(entity.email.like(pattern)).delete(synchronize_session=False)
+
+
+def seed(rows: int) -> Fixtures:
+    """Insert ``rows`` patients, doctors and users, plus the admin the scenarios log in with."""
+    cleanup()
+    genders = list(GenderEnum)
+    roles = [RoleEnum.DOCTOR, RoleEnum.PATIENT]
+    password_hash = hash_password(ADMIN_PASSWORD)
+    with session_scope() as db:
+        admin = User(name=f"{SEARCH_TERM} Admin", email=ADMIN_EMAIL, password=password_hash, role=RoleEnum.ADMIN)
+        patients = [
+            Patient(
+                name=f"{SEARCH_TERM} Paciente {index}",
+                email=f"patient{index}@{EMAIL_DOMAIN}",
+                document=f"BENCH-{index:08d}",
+                birth_date=date(1950 + index % 60, 1 + index % 12, 1 + index % 28),
+                gender=genders[index % len(genders)],
+                phone="(11) 99999-0000",
+            )
+            for index in range(rows)
+        ]
+        doctors = [
+            Doctor(
+                name=f"{SEARCH_TERM} Médico {index}",
+                email=f"doctor{index}@{EMAIL_DOMAIN}",
+                crm=f"CRM-BENCH {index:08d}",
+                specialty=SPECIALTIES[index % len(SPECIALTIES)],
+            )
+            for index in range(rows)
+        ]
+        users = [
+            User(
+                name=f"{SEARCH_TERM} Usuário {index}",
+                email=f"user{index}@{EMAIL_DOMAIN}",
+                password=password_hash,
+                role=roles[index % len(roles)],
+            )
+            for index in range(rows)
+        ]
+        db.add_all([admin, *patients, *doctors, *users])
+        db.flush()
+        return Fixtures(
+            patient_ids=[patient.id for patient in patients],
+            doctor_ids=[doctor.id for doctor in doctors],
+            user_ids=[user.id for user in users],
+        )
@@ -0,0 +1,130 @@
+"""Drive the scenarios through a transport and summarize their latencies."""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import Any, AsyncContextManager, Dict, Iterator, List, Optional, Protocol
+
+from benchmarks.api.clients import Response, encode_body
+from benchmarks.api.fixtures import ADMIN_EMAIL, ADMIN_PASSWORD
+from benchmarks.api.scenarios import Scenario
+
+
+class Connection(Protocol):
+    async def request(
+        self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes] = None
+    ) -> Response: ...
+
+    async def close(self) -> None: ...
+
+
+class Transport(Protocol):
+    name: str
+
+    def running(self) -> AsyncContextManager[Any]: ...
+
+    async def connect(self) -> Connection: ...
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def login(transport: Transport, prefix: str) -> str:
+    """The ``Authorization`` header of the benchmark admin."""
+    connection = await transport.connect()
+    try:
+        response = await connection.request(
+            "POST", f"{prefix}/login", {}, encode_body({"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        )
+    finally:
+        await connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"Login of the benchmark admin failed with status {response.status}.")
+    return response.headers["authorization"]
+
+
+async def _worker(
+    connection: Connection,
+    scenario: Scenario,
+    headers: Dict[str, str],
+    prefix: str,
+    indexes: Iterator[int],
+    latencies: List[float],
+    errors: Counter,
+) -> None:
+    # ``indexes`` is shared by all workers of the scenario: each takes the next request.
+    for index in indexes:
+        body = encode_body(scenario.body(index)) if scenario.body is not None else None
+        started = time.perf_counter()
+        response = await connection.request(scenario.method, prefix + scenario.path(index), headers, body)
+        elapsed = time.perf_counter() - started
+        if response.status == scenario.expected_status:
+            latencies.append(elapsed)
+        else:
+            errors[str(response.status)] += 1
+
+
+async def _drive(
+    connections: List[Connection],
+    scenario: Scenario,
+    headers: Dict[str, str],
+    prefix: str,
+    indexes: range,
+    latencies: List[float],
+    errors: Counter,
+) -> float:
+    shared = iter(indexes)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_worker(connection, scenario, headers, prefix, shared, latencies, errors) for connection in connections)
+    )
+    return time.perf_counter() - started
+
+
+async def run_scenario(
+    transport: Transport,
+    scenario: Scenario,
+    *,
+    token: str,
+    prefix: str,
+    requests: int,
+    warmup: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Run ``scenario`` with ``concurrency`` connections; warm-up requests are not measured."""
+    count = max(1, round(requests * scenario.weight))
+    warmup_count = max(0, round(warmup * scenario.weight))
+    headers = {"Authorization": token} if scenario.authorized else {}
+    connections = [await transport.connect() for _ in range(concurrency)]
+    try:
+        await _drive(connections, scenario, headers, prefix, range(warmup_count), [], Counter())
+        latencies: List[float] = []
+        errors: Counter = Counter()
+        elapsed = await _drive(
+            connections, scenario, headers, prefix, range(warmup_count, warmup_count + count), latencies, errors
+        )
+    finally:
+        for connection in connections:
+            await connection.close()
+
+    ordered = sorted(latencies)
+    return {
+        "request": scenario.description,
+        "requests": count,
+        "errors": dict(errors),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+            "p50": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99": round(percentile(ordered, 0.99) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+    }
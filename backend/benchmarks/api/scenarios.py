@@ -0,0 +1,103 @@
+"""The requests the suite measures: one scenario per endpoint and use case.
+
+A scenario builds its ``n``-th request from the request index, which keeps get-by-id
+cycling through the seeded rows and makes every created row unique.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from benchmarks.api.fixtures import ADMIN_EMAIL, ADMIN_PASSWORD, EMAIL_DOMAIN, SEARCH_TERM, Fixtures
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[int], str]
+    body: Optional[Callable[[int], Dict[str, Any]]] = None
+    expected_status: int = 200
+    authorized: bool = True
+    # Share of ``--requests`` the scenario runs: the ones hashing passwords are much
+    # slower than the rest and would otherwise dominate the run time.
+    weight: float = 1.0
+
+    @property
+    def description(self) -> str:
+        return f"{self.method} {self.path(0)}"
+
+
+def _fixed(path: str) -> Callable[[int], str]:
+    return lambda _: path
+
+
+def _cycle(prefix: str, ids: List[Any]) -> Callable[[int], str]:
+    return lambda index: f"{prefix}/{ids[index % len(ids)]}"
+
+
+def build_scenarios(fixtures: Fixtures, page_size: int) -> List[Scenario]:
+    # Unique per run, so creations never collide with rows left by an earlier one.
+    run = uuid4().hex[:8]
+    return [
+        Scenario(
+            "login",
+            "POST",
+            _fixed("/login"),
+            body=lambda _: {"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+            authorized=False,
+            weight=0.1,
+        ),
+        Scenario("patients.list", "GET", _fixed(f"/patients?size={page_size}")),
+        Scenario("patients.search", "GET", _fixed(f"/patients?size={page_size}&text={SEARCH_TERM}")),
+        Scenario("patients.get", "GET", _cycle("/patients", fixtures.patient_ids)),
+        Scenario(
+            "patients.create",
+            "POST",
+            _fixed("/patients"),
+            body=lambda index: {
+                "name": f"{SEARCH_TERM} Paciente Novo {index}",
+                "email": f"new-patient-{run}-{index}@{EMAIL_DOMAIN}",
+                "document": f"B{run}-{index}",
+                "birth_date": "1990-05-10",
+                "gender": "FEMALE",
+            },
+            expected_status=201,
+            weight=0.2,
+        ),
+        Scenario("doctors.list", "GET", _fixed(f"/doctors?size={page_size}")),
+        Scenario("doctors.search", "GET", _fixed(f"/doctors?size={page_size}&text={SEARCH_TERM}")),
+        Scenario("doctors.get", "GET", _cycle("/doctors", fixtures.doctor_ids)),
+        Scenario(
+            "doctors.create",
+            "POST",
+            _fixed("/doctors"),
+            body=lambda index: {
+                "name": f"{SEARCH_TERM} Médico Novo {index}",
+                "email": f"new-doctor-{run}-{index}@{EMAIL_DOMAIN}",
+                "crm": f"CRM-B{run}-{index}",
+                "specialty": "Cardiologia",
+            },
+            expected_status=201,
+            weight=0.2,
+        ),
+        Scenario("users.list", "GET", _fixed(f"/users?size={page_size}")),
+        Scenario("users.search", "GET", _fixed(f"/users?size={page_size}&text={SEARCH_TERM}")),
+        Scenario("users.get", "GET", _cycle("/users", fixtures.user_ids)),
+        Scenario(
+            "users.create",
+            "POST",
+            _fixed("/users"),
+            body=lambda index: {
+                "name": f"{SEARCH_TERM} Usuário Novo {index}",
+                "email": f"new-user-{run}-{index}@{EMAIL_DOMAIN}",
+                "password": ADMIN_PASSWORD,
+                "role": "PATIENT",
+            },
+            weight=0.2,
+        ),
+        Scenario("domains.roles", "GET", _fixed("/domains/roles")),
+        Scenario("domains.genders", "GET", _fixed("/domains/genders")),
+        Scenario("domains.bundle", "GET", _fixed("/domains/bundle")),
+    ]
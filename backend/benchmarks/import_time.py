@@ -0,0 +1,129 @@
+"""Startup cost of the app, from ``python -X importtime``, to catch import-time regressions.
+
+Every run imports the module in a fresh interpreter. The fastest run is reported:
+its wall time, and the modules that took longest including their own imports
+(cumulative) and by themselves (self). ``--build-app`` also builds ``app.main.app``,
+which is what a worker does at boot. With ``--max-ms`` the exit status is 1 when the
+wall time exceeds the budget, so the check can run in CI:
+
+    python -m benchmarks.import_time --build-app --top 15
+    python -m benchmarks.import_time --module app.models --max-ms 800
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass(frozen=True)
+class Run:
+    wall_ms: float
+    records: List[ImportRecord]
+
+
+def _statement(module: str, build_app: bool) -> str:
+    target = f"import {module}"
+    if build_app:
+        target += "; import app.main; app.main.app"
+    return (
+        "import time; started = time.perf_counter(); "
+        f"{target}; "
+        "print((time.perf_counter() - started) * 1000)"
+    )
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Records of the ``import time: self [us] | cumulative | imported package`` lines."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        # One space after the separator, then two per nesting level.
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def measure(module: str, build_app: bool) -> Run:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _statement(module, build_app)],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONWARNINGS": "ignore"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return Run(wall_ms=float(completed.stdout.strip().splitlines()[-1]), records=parse_importtime(completed.stderr))
+
+
+def _ranking(records: List[ImportRecord], key: str, top: int) -> List[Dict[str, object]]:
+    ranked = sorted(records, key=lambda record: getattr(record, key), reverse=True)[:top]
+    return [
+        {
+            "module": record.module,
+            "cumulative_ms": round(record.cumulative_us / 1000, 1),
+            "self_ms": round(record.self_us / 1000, 1),
+        }
+        for record in ranked
+    ]
+
+
+def run(module: str, build_app: bool, repeat: int, top: int, max_ms: Optional[float]) -> dict:
+    measure(module, build_app)  # compiles the bytecode caches, so every timed run reads them
+    best = min((measure(module, build_app) for _ in range(repeat)), key=lambda result: result.wall_ms)
+    app_records = [record for record in best.records if record.module.split(".")[0] == "app"]
+    report = {
+        "module": module,
+        "build_app": build_app,
+        "wall_ms": round(best.wall_ms, 1),
+        "imported_modules": len(best.records),
+        "top_level_ms": {
+            record.module: round(record.cumulative_us / 1000, 1)
+            for record in best.records
+            if record.depth == 0 and record.cumulative_us >= 1000
+        },
+        "slowest_cumulative": _ranking(best.records, "cumulative_us", top),
+        "slowest_self": _ranking(best.records, "self_us", top),
+        "slowest_app_modules": _ranking(app_records, "self_us", top),
+    }
+    if max_ms is not None:
+        report["max_ms"] = max_ms
+        report["within_budget"] = best.wall_ms <= max_ms
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import.")
+    parser.add_argument("--build-app", action="store_true", help="Also build app.main.app, as a worker does.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the fastest one is reported.")
+    parser.add_argument("--top", type=int, default=10, help="Modules listed in each ranking.")
+    parser.add_argument("--max-ms", type=float, help="Exit with status 1 when the wall time exceeds this budget.")
+    args = parser.parse_args()
+    report = run(args.module, args.build_app, args.repeat, args.top, args.max_ms)
+    print(json.dumps(report, indent=2))
+    if not report.get("within_budget", True):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Cost of serializing a page of patients: ``response_model`` path vs. the fast path.
+
+Both endpoints answer the same in-memory page of ORM rows, driven through the ASGI
+interface without a server or a database, so the difference is the serialization:
+
+* ``response_model``: every row validated into ``PatientOut``, the page validated
+  again by FastAPI against ``PageResponse[PatientOut]`` and encoded with ``json``;
+* ``fast_path``: DTOs built from the trusted rows and the page dumped to bytes once
+  by pydantic-core (:mod:`app.utils.serialization`).
+
+    python -m benchmarks.list_serialization --items 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from typing import List, Tuple
+from uuid import uuid4
+
+from fastapi import FastAPI
+
+from app.models.enums import GenderEnum
+from app.models.patient import Patient
+from app.schemas.common import PageResponse
+from app.schemas.patient import PatientOut
+from app.utils.pagination import build_page
+from app.utils.serialization import from_rows, page_response
+
+
+def _rows(items: int) -> List[Patient]:
+    genders = list(GenderEnum)
+    return [
+        Patient(
+            id=uuid4(),
+            name=f"Paciente Número {index}",
+            email=f"paciente{index}@hospital.com",
+            document=f"{index:011d}",
+            birth_date=date(1980 + index % 30, 1 + index % 12, 1 + index % 28),
+            gender=genders[index % len(genders)],
+            phone="(11) 99999-0000",
+            notes="Observações gerais do paciente." if index % 2 else None,
+            user_id=uuid4() if index % 3 else None,
+            created_at=datetime(2024, 1, 1, 12, 0, index % 60),
+        )
+        for index in range(items)
+    ]
+
+
+def _build_app(rows: List[Patient]) -> FastAPI:
+    app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+    size = len(rows)
+
+    @app.get("/response_model", response_model=PageResponse[PatientOut])
+    async def response_model_path():
+        dtos = [PatientOut.model_validate(row) for row in rows]
+        return PageResponse(content=dtos, page=0, size=size, totalElements=size, totalPages=1, last=True)
+
+    @app.get("/fast_path", response_model=PageResponse[PatientOut])
+    async def fast_path():
+        return page_response(build_page(from_rows(PatientOut, rows), total=size, page=0, size=size, item_type=PatientOut))
+
+    return app
+
+
+async def _measure(app: FastAPI, path: str, requests: int) -> Tuple[float, bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 80),
+    }
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(dict(scope), receive, send)
+    first_body = bytes(body)
+    for _ in range(min(requests, 50)):
+        await app(dict(scope), receive, send)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000, first_body
+
+
+def run(items: int, requests: int, repeat: int) -> dict:
+    app = _build_app(_rows(items))
+    results = {}
+    bodies = {}
+    for path in ("response_model", "fast_path"):
+        timings = []
+        for _ in range(repeat):
+            elapsed, bodies[path] = asyncio.run(_measure(app, f"/{path}", requests))
+            timings.append(elapsed)
+        results[path] = min(timings)
+
+    return {
+        "items": items,
+        "requests": requests,
+        "per_request_us": {name: round(value, 2) for name, value in results.items()},
+        "speedup": round(results["response_model"] / results["fast_path"], 1),
+        "identical_json": json.loads(bodies["response_model"]) == json.loads(bodies["fast_path"]),
+        "identical_bytes": bodies["response_model"] == bodies["fast_path"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="Rows in the page.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per timing run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs; the fastest one is reported.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.requests, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Throughput of a running API under many concurrent keep-alive clients.
+
+Start the server once per mode and point the load test at it:
+
+    DATABASE_ASYNC=false uvicorn app.main:app --port 8080
+    python -m benchmarks.load_test --url http://localhost:8080 --concurrency 500
+
+    DATABASE_ASYNC=true uvicorn app.main:app --port 8080
+    python -m benchmarks.load_test --url http://localhost:8080 --concurrency 500
+
+Each client keeps one connection open and issues authenticated requests back to back
+for ``--duration`` seconds. Only the standard library is used, so the client adds no
+dependency to the project.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import urllib.request
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    request = urllib.request.Request(
+        base_url.rstrip("/") + "/login",
+        data=json.dumps({"email": email, "password": password}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.headers["Authorization"]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by the server.")
+    status = int(status_line.split()[1])
+
+    length: Optional[int] = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(
+    host: str,
+    port: int,
+    raw_request: bytes,
+    deadline: float,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(raw_request)
+            await writer.drain()
+            status = await _read_response(reader)
+            if status >= 400:
+                errors.append(str(status))
+            else:
+                latencies.append(time.perf_counter() - started)
+    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+        errors.append(type(exc).__name__)
+    finally:
+        writer.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(url: str, path: str, token: str, concurrency: int, duration: float) -> dict:
+    parts = urlsplit(url)
+    host = parts.hostname or "localhost"
+    port = parts.port or 80
+    raw_request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Authorization: {token}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode("latin-1")
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(_client(host, port, raw_request, deadline, latencies, errors) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+        },
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080", help="Base URL of the running API.")
+    parser.add_argument("--path", default="/patients?size=10", help="Request path to hammer.")
+    parser.add_argument("--concurrency", type=int, default=500, help="Concurrent keep-alive clients.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run.")
+    parser.add_argument("--email", default="admin@hospital.com")
+    parser.add_argument("--password", default="123456")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    token = login(args.url, args.email, args.password)
+    print(json.dumps(asyncio.run(run(args.url, args.path, token, args.concurrency, args.duration)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Per-request cost of the correlation-id middleware on ``GET /health``.
+
+Requests are driven straight through the ASGI interface, without a server or
+sockets, so the difference between the runs is the middleware itself:
+
+    python -m benchmarks.middleware_overhead --requests 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Optional
+from uuid import uuid4
+
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware import CorrelationIdMiddleware
+from app.routers import health
+
+
+class _BaseHTTPCorrelationIdMiddleware(BaseHTTPMiddleware):
+    """The previous ``BaseHTTPMiddleware`` implementation, kept here as the baseline."""
+
+    header = "X-Correlation-Id"
+
+    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
+        correlation_id = request.headers.get(self.header, "") or str(uuid4())
+        request.state.correlation_id = correlation_id
+
+        response = await call_next(request)
+        response.headers[self.header] = correlation_id
+        return response
+
+
+def _build_app(middleware: Optional[type]) -> FastAPI:
+    app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+    if middleware is not None:
+        app.add_middleware(middleware)
+    app.include_router(health.router)
+    return app
+
+
+async def _measure(app: FastAPI, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(min(requests, 500)):
+        await app(dict(scope), receive, send)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+def run(requests: int, repeat: int) -> dict:
+    variants = {
+        "no_middleware": None,
+        "base_http_middleware": _BaseHTTPCorrelationIdMiddleware,
+        "pure_asgi_middleware": CorrelationIdMiddleware,
+    }
+    results = {}
+    for name, middleware in variants.items():
+        app = _build_app(middleware)
+        results[name] = min(asyncio.run(_measure(app, requests)) for _ in range(repeat))
+
+    baseline = results["no_middleware"]
+    return {
+        "requests": requests,
+        "per_request_us": {name: round(value, 2) for name, value in results.items()},
+        "overhead_us": {
+            name: round(value - baseline, 2) for name, value in results.items() if name != "no_middleware"
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000, help="Requests per timing run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs; the fastest one is reported.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
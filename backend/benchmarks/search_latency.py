@@ -0,0 +1,123 @@
+"""Latency of the patients `text` search with and without the trigram indexes.
+
+Seeds a large synthetic patients table, runs the same `patient_service.list_patients`
+call the API makes for a few search terms, first without and then with the
+`gin_trgm_ops` indexes, and prints the timings as JSON. Everything happens inside a
+single transaction that is rolled back at the end, so the database is left untouched:
+
+    python -m benchmarks.search_latency --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services import patient_service
+
+TRIGRAM_INDEXES = {
+    "ix_patients_name_trgm": "lower(name)",
+    "ix_patients_email_trgm": "lower(email)",
+    "ix_patients_document_trgm": "lower(document)",
+}
+
+DEFAULT_TERMS = ["silva", "bench4242", "00012345", "ana ro", "zzzz"]
+
+_SEED_SQL = text(
+    """
+    INSERT INTO patients (id, name, email, document, birth_date, gender, created_at)
+    SELECT gen_random_uuid(),
+           (ARRAY['Ana','Bruno','Carla','Daniel','Eduarda','Felipe','Gabriela','Henrique','Isabela','João'])[1 + n % 10]
+             || ' ' ||
+           (ARRAY['Silva','Souza','Costa','Rocha','Lima','Torres','Ramos','Castro','Nogueira','Amaral'])[1 + (n / 10) % 10]
+             || ' ' || n,
+           'bench' || n || '@example.com',
+           'bench-' || lpad(n::text, 11, '0'),
+           DATE '1940-01-01' + (n % 25000),
+           (ARRAY['FEMALE','MALE','OTHER'])[1 + n % 3],
+           NOW()
+      FROM generate_series(1, :rows) AS n
+    """
+)
+
+
+def _measure(session: Session, term: str, repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        patient_service.list_patients(
+            session,
+            page=0,
+            size=10,
+            gender=None,
+            text=term,
+            sort_field="name",
+            sort_direction="asc",
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+
+def _run_phase(session: Session, terms: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    session.execute(text("ANALYZE patients"))
+    return {term: _measure(session, term, repeat) for term in terms}
+
+
+def run(rows: int, terms: List[str], repeat: int) -> dict:
+    engine = create_engine(settings.database_url)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            session = Session(bind=conn)
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+            start = time.perf_counter()
+            conn.execute(_SEED_SQL, {"rows": rows})
+            seed_seconds = time.perf_counter() - start
+
+            for name in TRIGRAM_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            before = _run_phase(session, terms, repeat)
+
+            start = time.perf_counter()
+            for name, expression in TRIGRAM_INDEXES.items():
+                conn.execute(text(f"CREATE INDEX {name} ON patients USING gin ({expression} gin_trgm_ops)"))
+            index_seconds = time.perf_counter() - start
+            after = _run_phase(session, terms, repeat)
+        finally:
+            trans.rollback()
+    engine.dispose()
+
+    return {
+        "rows": rows,
+        "seed_seconds": round(seed_seconds, 1),
+        "index_build_seconds": round(index_seconds, 1),
+        "before": before,
+        "after": after,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic patients to insert.")
+    parser.add_argument("--repeat", type=int, default=20, help="Executions per search term.")
+    parser.add_argument("--term", action="append", dest="terms", help="Search term (repeatable).")
+    args = parser.parse_args()
+
+    result = run(args.rows, args.terms or DEFAULT_TERMS, args.repeat)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
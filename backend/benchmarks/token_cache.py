@@ -0,0 +1,107 @@
+"""Cost of resolving a bearer token with and without the verified-token cache.
+
+Measures the code every authenticated route runs: `verify_token` alone, then the
+`get_current_principal` dependency for a subject-only token and for a self-contained
+one (``JWT_EMBED_CLAIMS``). The principal and token-version caches are primed, so no
+database access happens and the measurement isolates token verification (HMAC check
+and claim parsing) plus the cache lookups:
+
+    python -m benchmarks.token_cache --iterations 100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import timeit
+from typing import Callable, Dict
+from uuid import uuid4
+
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.enums import RoleEnum
+from app.schemas.auth import Principal
+from app.security import auth, jwt
+from app.utils.cache import TTLCache
+
+
+def _measure(call: Callable[[], None], iterations: int, repeat: int) -> float:
+    timings = timeit.repeat(call, number=1, repeat=repeat)
+    return min(timings) / iterations * 1_000_000
+
+
+def _verify_many(token: str, iterations: int) -> Callable[[], None]:
+    def call() -> None:
+        for _ in range(iterations):
+            jwt.verify_token(token)
+
+    return call
+
+
+def _resolve_many(loop: asyncio.AbstractEventLoop, token: str, db, iterations: int) -> Callable[[], None]:
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def resolve() -> None:
+        for _ in range(iterations):
+            await auth.get_current_principal(request, credentials, db)
+
+    return lambda: loop.run_until_complete(resolve())
+
+
+def _compare(measure: Callable[[], float]) -> Dict[str, float]:
+    original = jwt._token_cache
+    try:
+        jwt._token_cache = TTLCache(maxsize=0, ttl=0)
+        without_cache = measure()
+
+        jwt._token_cache = TTLCache(maxsize=settings.jwt_token_cache_size, ttl=settings.jwt_expiration_seconds)
+        with_cache = measure()
+    finally:
+        jwt._token_cache = original
+
+    return {
+        "without_cache_us": round(without_cache, 2),
+        "with_cache_us": round(with_cache, 2),
+        "speedup": round(without_cache / with_cache, 1),
+    }
+
+
+def run(iterations: int, repeat: int) -> dict:
+    principal = Principal(id=uuid4(), name="Benchmark", email="benchmark@hospital.com", role=RoleEnum.ADMIN)
+    subject_token = jwt.create_access_token(principal.email)
+    claims_token = jwt.create_access_token(
+        principal.email, claims={"uid": str(principal.id), "role": principal.role.value, "ver": 0}
+    )
+    auth._principal_cache.set(principal.email, principal)
+    auth._token_versions.set(principal.id, 0)
+
+    loop = asyncio.new_event_loop()
+    db = SessionLocal()
+    try:
+        return {
+            "iterations": iterations,
+            "verify_token": _compare(lambda: _measure(_verify_many(subject_token, iterations), iterations, repeat)),
+            "get_current_principal": {
+                kind: _compare(lambda: _measure(_resolve_many(loop, token, db, iterations), iterations, repeat))
+                for kind, token in (("subject_token", subject_token), ("claims_token", claims_token))
+            },
+        }
+    finally:
+        db.close()
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100_000, help="Calls per timing run.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs; the fastest one is reported.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.iterations, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+/* Description:
+ * Composite (sort column, id) indexes backing keyset pagination on the listings.
+ * E-mail, document and CRM are unique, so their existing indexes already serve
+ * the (column, id) row comparison and are not duplicated here.
+ *
+ * Built with CONCURRENTLY, outside a transaction, so writes to the tables go on
+ * during the build. Each index is dropped first: a build interrupted halfway leaves
+ * an invalid index behind, which the next attempt must replace.
+ */
+
+-- migrate:no-transaction
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_name_id;
+CREATE INDEX CONCURRENTLY ix_patients_name_id ON public.patients (name, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_birth_date_id;
+CREATE INDEX CONCURRENTLY ix_patients_birth_date_id ON public.patients (birth_date, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_created_at_id;
+CREATE INDEX CONCURRENTLY ix_patients_created_at_id ON public.patients (created_at, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_name_id;
+CREATE INDEX CONCURRENTLY ix_doctors_name_id ON public.doctors (name, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_specialty_id;
+CREATE INDEX CONCURRENTLY ix_doctors_specialty_id ON public.doctors (specialty, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_created_at_id;
+CREATE INDEX CONCURRENTLY ix_doctors_created_at_id ON public.doctors (created_at, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_users_name_id;
+CREATE INDEX CONCURRENTLY ix_users_name_id ON public.users (name, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_users_role_id;
+CREATE INDEX CONCURRENTLY ix_users_role_id ON public.users (role, id);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_users_created_at_id;
+CREATE INDEX CONCURRENTLY ix_users_created_at_id ON public.users (created_at, id);
@@ -0,0 +1,32 @@
+/* Description:
+ * Enables pg_trgm and indexes the lowercased columns searched by the `text`
+ * filter of the listings, so substring searches (LIKE '%term%') are answered
+ * from GIN trigram indexes instead of sequential scans.
+ *
+ * Built with CONCURRENTLY, outside a transaction, so writes to the tables go on
+ * during the build. Each index is dropped first: a build interrupted halfway leaves
+ * an invalid index behind, which the next attempt must replace.
+ */
+
+-- migrate:no-transaction
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_name_trgm;
+CREATE INDEX CONCURRENTLY ix_patients_name_trgm ON public.patients USING gin (lower(name) gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_email_trgm;
+CREATE INDEX CONCURRENTLY ix_patients_email_trgm ON public.patients USING gin (lower(email) gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_patients_document_trgm;
+CREATE INDEX CONCURRENTLY ix_patients_document_trgm ON public.patients USING gin (lower(document) gin_trgm_ops);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_name_trgm;
+CREATE INDEX CONCURRENTLY ix_doctors_name_trgm ON public.doctors USING gin (lower(name) gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_email_trgm;
+CREATE INDEX CONCURRENTLY ix_doctors_email_trgm ON public.doctors USING gin (lower(email) gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_doctors_crm_trgm;
+CREATE INDEX CONCURRENTLY ix_doctors_crm_trgm ON public.doctors USING gin (lower(crm) gin_trgm_ops);
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_users_name_trgm;
+CREATE INDEX CONCURRENTLY ix_users_name_trgm ON public.users USING gin (lower(name) gin_trgm_ops);
+DROP INDEX CONCURRENTLY IF EXISTS public.ix_users_email_trgm;
+CREATE INDEX CONCURRENTLY ix_users_email_trgm ON public.users USING gin (lower(email) gin_trgm_ops);
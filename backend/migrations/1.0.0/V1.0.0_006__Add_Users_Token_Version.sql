@@ -0,0 +1,9 @@
+/* Description:
+ * Adds a per-user token version, embedded in self-contained access tokens and
+ * incremented whenever the role, password or e-mail of the user changes, so
+ * tokens issued before the change stop being accepted.
+ */
+
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN public.users.token_version IS 'Incremented to revoke previously issued self-contained tokens';
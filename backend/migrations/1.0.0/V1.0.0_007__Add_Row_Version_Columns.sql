@@ -0,0 +1,32 @@
+/* Description:
+ * Adds a row version to users, patients and doctors, exposed by the API as the
+ * ETag of each record. A trigger increments it on every UPDATE, so it changes no
+ * matter which code path (ORM, bulk statement or manual SQL) modified the row.
+ */
+
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE public.patients ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE public.doctors ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+COMMENT ON COLUMN public.users.version IS 'Row version, incremented on every update (ETag)';
+COMMENT ON COLUMN public.patients.version IS 'Row version, incremented on every update (ETag)';
+COMMENT ON COLUMN public.doctors.version IS 'Row version, incremented on every update (ETag)';
+
+CREATE OR REPLACE FUNCTION public.increment_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_version ON public.users;
+CREATE TRIGGER trg_users_version BEFORE UPDATE ON public.users
+    FOR EACH ROW EXECUTE FUNCTION public.increment_row_version();
+
+DROP TRIGGER IF EXISTS trg_patients_version ON public.patients;
+CREATE TRIGGER trg_patients_version BEFORE UPDATE ON public.patients
+    FOR EACH ROW EXECUTE FUNCTION public.increment_row_version();
+
+DROP TRIGGER IF EXISTS trg_doctors_version ON public.doctors;
+CREATE TRIGGER trg_doctors_version BEFORE UPDATE ON public.doctors
+    FOR EACH ROW EXECUTE FUNCTION public.increment_row_version();
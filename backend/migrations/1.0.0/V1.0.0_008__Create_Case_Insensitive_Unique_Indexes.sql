@@ -0,0 +1,30 @@
+/* Description:
+ * Unique indexes on the lowercased e-mail, document and CRM columns.
+ *
+ * The API stores these keys in lowercase and compares them with lower(), which the
+ * plain unique constraints cannot serve. With these indexes the lookups are index
+ * scans and inserts rely on the database for uniqueness (INSERT ... ON CONFLICT DO
+ * NOTHING), instead of checking each key with a query first.
+ *
+ * Built with CONCURRENTLY, outside a transaction, so writes to the tables go on
+ * during the build. Each index is dropped first: a build interrupted halfway leaves
+ * an invalid index behind, which the next attempt must replace.
+ *
+ * A unique build fails when existing rows already collide in lowercase; the
+ * duplicates must be merged before the migration is run again.
+ */
+
+-- migrate:no-transaction
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ux_users_email_lower;
+CREATE UNIQUE INDEX CONCURRENTLY ux_users_email_lower ON public.users (lower(email));
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ux_patients_email_lower;
+CREATE UNIQUE INDEX CONCURRENTLY ux_patients_email_lower ON public.patients (lower(email));
+DROP INDEX CONCURRENTLY IF EXISTS public.ux_patients_document_lower;
+CREATE UNIQUE INDEX CONCURRENTLY ux_patients_document_lower ON public.patients (lower(document));
+
+DROP INDEX CONCURRENTLY IF EXISTS public.ux_doctors_email_lower;
+CREATE UNIQUE INDEX CONCURRENTLY ux_doctors_email_lower ON public.doctors (lower(email));
+DROP INDEX CONCURRENTLY IF EXISTS public.ux_doctors_crm_lower;
+CREATE UNIQUE INDEX CONCURRENTLY ux_doctors_crm_lower ON public.doctors (lower(crm));
@@ -1,12 +1,43 @@
+"""Apply the SQL migrations in ``migrations/`` that are not in ``schema_version`` yet.
+
+Files run in version order, each in its own transaction together with its
+``schema_version`` row. A file whose leading comments, before the first
+statement, include the line
+
+    -- migrate:no-transaction
+
+runs outside a transaction instead, one statement at a time, which is what
+``CREATE INDEX CONCURRENTLY`` needs. Such a file is not atomic: if it fails halfway
+it runs again from the top on the next attempt, so its statements must be
+idempotent. An interrupted ``CREATE INDEX CONCURRENTLY`` leaves an invalid index that
+``IF NOT EXISTS`` would keep, so such files drop the index first.
+
+Many instances can start at once: the runner takes a Postgres advisory lock, so a
+single one applies the migrations while the others wait and then find nothing to do.
+The checksum of every applied file is stored, and the run stops if an applied file
+was changed afterwards. Pass ``--repair`` to accept the current contents.
+"""
 from __future__ import annotations
 
+import argparse
+import hashlib
 import os
+import re
+import time
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
 import psycopg
 
 MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
 SCHEMA_TABLE = "schema_version"
+NO_TRANSACTION_DIRECTIVE = "-- migrate:no-transaction"
+
+# Arbitrary key of the advisory lock serializing runners on the same database.
+LOCK_KEY = 7_241_033_318_470_115
+LOCK_POLL_SECONDS = 1.0
+
+_DOLLAR_QUOTE = re.compile(r"\$[A-Za-z_]*\$")
 
 
 def _database_url() -> str:
@@ -18,7 +49,7 @@ def _database_url() -> str:
 
 
 def ensure_schema_table(conn: psycopg.Connection) -> None:
-    with conn.cursor() as cur:
+    with conn.transaction(), conn.cursor() as cur:
         cur.execute(
             f"""
             CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
@@ -28,7 +59,38 @@ def ensure_schema_table(conn: psycopg.Connection) -> None:
             )
             """
         )
-    conn.commit()
+        cur.execute(f"ALTER TABLE {SCHEMA_TABLE} ADD COLUMN IF NOT EXISTS checksum VARCHAR(64)")
+        cur.execute(f"ALTER TABLE {SCHEMA_TABLE} ADD COLUMN IF NOT EXISTS execution_ms INTEGER")
+
+
+def acquire_lock(conn: psycopg.Connection, timeout: float) -> None:
+    """Wait for the runner lock, polling.
+
+    A blocking ``pg_advisory_lock`` would keep a statement (and its snapshot) open on
+    every waiting instance, and ``CREATE INDEX CONCURRENTLY`` run by the lock holder
+    waits for such snapshots to finish: the two would deadlock.
+    """
+    deadline = time.monotonic() + timeout
+    announced = False
+    while True:
+        if conn.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,)).fetchone()[0]:
+            return
+        if time.monotonic() >= deadline:
+            raise SystemExit(f"Timed out after {timeout:.0f}s waiting for another migration runner")
+        if not announced:
+            print("Another instance is running the migrations; waiting", flush=True)
+            announced = True
+        time.sleep(LOCK_POLL_SECONDS)
+
+
+def release_lock(conn: psycopg.Connection) -> None:
+    conn.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+
+
+def applied_migrations(conn: psycopg.Connection) -> Dict[str, Optional[str]]:
+    """Applied versions and their stored checksums, in a single query."""
+    rows = conn.execute(f"SELECT version, checksum FROM {SCHEMA_TABLE}").fetchall()
+    return dict(rows)
 
 
 def migration_version(path: Path) -> tuple[str, str]:
@@ -37,28 +99,140 @@ def migration_version(path: Path) -> tuple[str, str]:
     return prefix, description.replace("_", " ")
 
 
-def has_migration(conn: psycopg.Connection, version: str) -> bool:
-    with conn.cursor() as cur:
-        cur.execute(f"SELECT 1 FROM {SCHEMA_TABLE} WHERE version = %s", (version,))
-        return cur.fetchone() is not None
+def checksum(sql: str) -> str:
+    """SHA-256 of the file with normalized line endings, so checkouts on Windows match."""
+    return hashlib.sha256(sql.replace("\r\n", "\n").encode("utf-8")).hexdigest()
 
 
-def register_migration(conn: psycopg.Connection, version: str, description: str) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
-            f"INSERT INTO {SCHEMA_TABLE} (version, description) VALUES (%s, %s)",
-            (version, description),
+def is_non_transactional(sql: str) -> bool:
+    """Whether the directive is one of the comments before the first statement.
+
+    The same text further down, e.g. in a comment next to a statement, does not count.
+    """
+    return any(comment.strip().lower() == NO_TRANSACTION_DIRECTIVE for comment in _header_comments(sql))
+
+
+def _header_comments(sql: str) -> Iterator[str]:
+    """The ``--`` comments of the leading comment block, up to the first statement."""
+    i, length = 0, len(sql)
+    while i < length:
+        if sql[i].isspace():
+            i += 1
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = length if end == -1 else end
+            yield sql[i:end]
+            i = end
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        else:
+            return
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script on the semicolons outside of comments, quotes and dollar quotes."""
+    statements: List[str] = []
+    start = i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = length if end == -1 else end + 1
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+        elif char in ("'", '"'):
+            i += 1
+            while i < length:
+                if sql[i] == char:
+                    if sql.startswith(char * 2, i):
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+        elif char == "$" and (match := _DOLLAR_QUOTE.match(sql, i)):
+            end = sql.find(match.group(), match.end())
+            i = length if end == -1 else end + len(match.group())
+        elif char == ";":
+            statements.append(sql[start:i])
+            i += 1
+            start = i
+        else:
+            i += 1
+    statements.append(sql[start:])
+    return [statement.strip() for statement in statements if _has_code(statement)]
+
+
+def _has_code(statement: str) -> bool:
+    without_comments = re.sub(r"/\*.*?\*/|--[^\n]*", "", statement, flags=re.DOTALL)
+    return bool(without_comments.strip())
+
+
+def _register(cur: psycopg.Cursor, version: str, description: str, digest: str, elapsed_ms: int) -> None:
+    cur.execute(
+        f"INSERT INTO {SCHEMA_TABLE} (version, description, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+        (version, description, digest, elapsed_ms),
+    )
+
+
+def apply_migration(conn: psycopg.Connection, path: Path, sql: str) -> int:
+    """Run ``sql`` and record it; returns the time it took in milliseconds."""
+    version, description = migration_version(path)
+    digest = checksum(sql)
+    started = time.perf_counter()
+    if is_non_transactional(sql):
+        with conn.cursor() as cur:
+            for statement in split_statements(sql):
+                cur.execute(statement)
+            elapsed_ms = round((time.perf_counter() - started) * 1000)
+            _register(cur, version, description, digest, elapsed_ms)
+    else:
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(sql)
+            elapsed_ms = round((time.perf_counter() - started) * 1000)
+            _register(cur, version, description, digest, elapsed_ms)
+    return elapsed_ms
+
+
+def validate_checksums(
+    conn: psycopg.Connection,
+    migrations: List[Path],
+    applied: Dict[str, Optional[str]],
+    repair: bool,
+) -> None:
+    """Fail when an applied file changed; store the checksum of files applied before it was tracked."""
+    changed = []
+    for path in migrations:
+        version, _ = migration_version(path)
+        if version not in applied:
+            continue
+        digest = checksum(path.read_text(encoding="utf-8"))
+        stored = applied[version]
+        if stored == digest:
+            continue
+        if stored is None or repair:
+            conn.execute(f"UPDATE {SCHEMA_TABLE} SET checksum = %s WHERE version = %s", (digest, version))
+        else:
+            changed.append(version)
+    if changed:
+        raise SystemExit(
+            "Applied migrations were modified since they ran: "
+            + ", ".join(changed)
+            + ". Restore them, or rerun with --repair to accept the current contents."
         )
-    conn.commit()
 
 
-def apply_sql(conn: psycopg.Connection, sql: str) -> None:
-    with conn.cursor() as cur:
-        cur.execute(sql)
-    conn.commit()
+def _pending(migrations: List[Path], applied: Dict[str, Optional[str]]) -> Iterator[Path]:
+    for path in migrations:
+        version, _ = migration_version(path)
+        if version not in applied:
+            yield path
 
 
-def run() -> None:
+def run(repair: bool = False) -> None:
     database_url = _database_url()
     migrations = sorted(MIGRATIONS_DIR.glob("**/*.sql"))
 
@@ -66,21 +240,40 @@ def run() -> None:
         print("No migrations found", flush=True)
         return
 
-    with psycopg.connect(database_url, autocommit=False) as conn:
-        ensure_schema_table(conn)
+    lock_timeout = float(os.getenv("MIGRATION_LOCK_TIMEOUT_SECONDS", "600"))
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        acquire_lock(conn, lock_timeout)
+        try:
+            ensure_schema_table(conn)
+            applied = applied_migrations(conn)
+            validate_checksums(conn, migrations, applied, repair)
+
+            total_started = time.perf_counter()
+            count = 0
+            for path in _pending(migrations, applied):
+                version, description = migration_version(path)
+                sql = path.read_text(encoding="utf-8")
+                mode = " (no transaction)" if is_non_transactional(sql) else ""
+                print(f"Applying migration {version}: {description}{mode}", flush=True)
+                elapsed_ms = apply_migration(conn, path, sql)
+                print(f"  done in {elapsed_ms} ms", flush=True)
+                count += 1
 
-        for path in migrations:
-            version, description = migration_version(path)
-            if has_migration(conn, version):
-                continue
+            total_ms = round((time.perf_counter() - total_started) * 1000)
+            print(f"Migrations complete: {count} applied in {total_ms} ms", flush=True)
+        finally:
+            release_lock(conn)
 
-            sql = path.read_text(encoding="utf-8")
-            print(f"Applying migration {version}: {description}", flush=True)
-            apply_sql(conn, sql)
-            register_migration(conn, version, description)
 
-        print("Migrations complete", flush=True)
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="Store the current checksum of applied migrations that were modified instead of failing.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run()
+    run(repair=_parse_args().repair)
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+
+
+@pytest.fixture()
+def make_session():
+    """Sessionmaker of a fresh in-memory SQLite database, shared by every thread of the test."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(make_session):
+    with make_session() as session:
+        yield session
+
+
+@pytest.fixture()
+def session_override(make_session):
+    """Replacement for ``get_session`` opening sessions on the test database."""
+
+    def session():
+        db = make_session()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    return session
@@ -0,0 +1,110 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_session
+from app.models.enums import RoleEnum
+from app.models.user import User
+from app.security import auth
+from app.security.auth import get_current_principal, require_token_roles
+from app.security.jwt import create_access_token
+from app.services import user_service
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    for name in ("_principal_cache", "_token_versions", "_recent_writers"):
+        monkeypatch.setattr(auth, name, TTLCache(maxsize=64, ttl=60))
+
+
+@pytest.fixture()
+def client(session_override):
+    app = FastAPI()
+    app.dependency_overrides[get_session] = session_override
+
+    @app.get("/me")
+    async def me(principal=Depends(get_current_principal)):
+        return {"role": principal.role.value}
+
+    @app.get("/staff")
+    async def staff(principal=Depends(require_token_roles(RoleEnum.ADMIN, RoleEnum.DOCTOR))):
+        return {"email": principal.email}
+
+    return TestClient(app)
+
+
+def _add_user(make_session, email, role=RoleEnum.PATIENT):
+    with make_session() as db:
+        user = User(name="Ana", email=email, password="hash", role=role)
+        db.add(user)
+        db.commit()
+    return user
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_principal_is_cached_until_a_committed_change(client, make_session):
+    user = _add_user(make_session, "ana@hospital.com")
+    headers = _bearer(create_access_token(user.email))
+    assert client.get("/me", headers=headers).json() == {"role": "PATIENT"}
+    assert auth._principal_cache.get(user.email).role is RoleEnum.PATIENT
+
+    with make_session() as db:
+        user_service.change_role(db, user.id, "DOCTOR")
+        assert auth._principal_cache.get(user.email) is not None
+        db.commit()
+    assert auth._principal_cache.get(user.email) is None
+
+    assert client.get("/me", headers=headers).json() == {"role": "DOCTOR"}
+
+
+def test_rolled_back_change_keeps_the_cached_principal(client, make_session):
+    user = _add_user(make_session, "ana@hospital.com")
+    client.get("/me", headers=_bearer(create_access_token(user.email)))
+
+    with make_session() as db:
+        user_service.change_role(db, user.id, "DOCTOR")
+        db.rollback()
+
+    assert auth._principal_cache.get(user.email).role is RoleEnum.PATIENT
+
+
+@pytest.mark.parametrize("role, expected", [(RoleEnum.DOCTOR, 200), (RoleEnum.PATIENT, 403)])
+def test_subject_only_token_is_checked_against_the_database(client, make_session, role, expected):
+    user = _add_user(make_session, f"{role.value.lower()}@hospital.com", role)
+
+    response = client.get("/staff", headers=_bearer(create_access_token(user.email)))
+
+    assert response.status_code == expected, response.text
+
+
+def _claims_token(user, version):
+    return create_access_token(user.email, claims={"uid": str(user.id), "role": user.role.value, "ver": version})
+
+
+def test_self_contained_token_is_revoked_by_a_committed_change(client, make_session):
+    user = _add_user(make_session, "ana@hospital.com")
+    old_token = _claims_token(user, 0)
+    assert client.get("/me", headers=_bearer(old_token)).json() == {"role": "PATIENT"}
+    assert auth._principal_cache.get(user.email) is None
+
+    with make_session() as db:
+        user = user_service.change_role(db, user.id, "DOCTOR")
+        assert client.get("/me", headers=_bearer(old_token)).status_code == 200
+        db.commit()
+
+    assert client.get("/me", headers=_bearer(old_token)).status_code == 401
+    assert client.get("/me", headers=_bearer(_claims_token(user, 1))).json() == {"role": "DOCTOR"}
+
+
+def test_self_contained_token_of_a_deleted_user_is_rejected(client, make_session):
+    user = _add_user(make_session, "ana@hospital.com")
+    token = _claims_token(user, 0)
+    with make_session() as db:
+        user_service.delete_user(db, user.id)
+        db.commit()
+
+    assert client.get("/me", headers=_bearer(token)).status_code == 401
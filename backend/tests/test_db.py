@@ -0,0 +1,10 @@
+from app import db
+from app.main import create_app
+
+
+def test_create_app_registers_the_engine_hooks_once():
+    create_app()
+    hooks = list(db._init_hooks)
+    create_app()
+    create_app()
+    assert db._init_hooks == hooks
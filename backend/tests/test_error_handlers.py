@@ -0,0 +1,30 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.error_handlers import register_exception_handlers
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+    register_exception_handlers(app)
+
+    @app.put("/stale")
+    async def stale():
+        raise StaleDataError("UPDATE statement on table 'patients' expected to update 1 row(s); 0 were matched.")
+
+    return TestClient(app)
+
+
+def test_stale_write_without_if_match_is_a_conflict(client):
+    response = client.put("/stale")
+    assert response.status_code == 409
+    assert response.json()["code"] == "ERR_CONFLICT"
+
+
+def test_stale_write_with_if_match_fails_the_precondition(client):
+    response = client.put("/stale", headers={"If-Match": '"3"'})
+    assert response.status_code == 412
+    assert response.json()["code"] == "ERR_PRECONDITION_FAILED"
@@ -0,0 +1,72 @@
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.config import settings
+from app.dependencies import get_session
+from app.main import create_app
+from app.models.enums import RoleEnum
+from app.models.user import User
+from app.replicas import get_read_session
+from app.routers import users
+from app.schemas.auth import Principal
+from app.utils.etags import IF_MATCH_DESCRIPTION, PRECONDITION_FAILED_DESCRIPTION
+
+
+@pytest.mark.parametrize("path", ["/users/{user_id}", "/patients/{patient_id}", "/doctors/{doctor_id}"])
+def test_conditional_updates_are_documented_alike(path):
+    operation = create_app().openapi()["paths"][f"{settings.api_prefix or ''}{path}"]["put"]
+
+    if_match = next(parameter for parameter in operation["parameters"] if parameter["name"] == "if-match")
+    assert if_match["description"] == IF_MATCH_DESCRIPTION
+    assert operation["responses"]["412"]["description"] == PRECONDITION_FAILED_DESCRIPTION
+
+
+@pytest.fixture()
+def client(session_override):
+    app = create_app()
+    admin = Principal(id=uuid4(), email="admin@hospital.com", role=RoleEnum.ADMIN)
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_read_session] = session_override
+    app.dependency_overrides[users.read_permission] = lambda: admin
+    app.dependency_overrides[users.write_permission] = lambda: admin
+    return TestClient(app)
+
+
+@pytest.fixture()
+def user_url(make_session):
+    with make_session() as db:
+        user = User(name="Ana", email="ana@hospital.com", password="hash", role=RoleEnum.PATIENT)
+        db.add(user)
+        db.commit()
+    return f"{settings.api_prefix or ''}/users/{user.id}"
+
+
+def test_conditional_get_answers_not_modified(client, user_url):
+    etag = client.get(user_url).headers["ETag"]
+
+    response = client.get(user_url, headers={"If-None-Match": f"W/{etag}"})
+    assert (response.status_code, response.headers["ETag"], response.content) == (304, etag, b"")
+
+    sparse = client.get(f"{user_url}?fields=name", headers={"If-None-Match": etag})
+    assert sparse.status_code == 200
+    assert sparse.headers["ETag"] != etag
+
+
+def test_update_with_a_stale_if_match_fails(client, make_session, user_url):
+    etag = client.get(user_url).headers["ETag"]
+    payload = {"name": "Ana Souza", "email": "ana@hospital.com"}
+    # Another request changed the user meanwhile (PostgreSQL bumps the version in a trigger).
+    with make_session() as db:
+        db.execute(update(User).values(version=User.version + 1))
+        db.commit()
+
+    stale = client.put(user_url, json=payload, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+    current = client.get(user_url).headers["ETag"]
+    updated = client.put(user_url, json=payload, headers={"If-Match": current})
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["name"] == "Ana Souza"
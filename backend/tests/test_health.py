@@ -0,0 +1,47 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import create_app
+from app.routers import health, metrics
+
+
+@pytest.fixture()
+def client():
+    return TestClient(create_app())
+
+
+def test_health_is_public(client):
+    assert client.get(f"{settings.api_prefix or ''}/health").status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/health/caches", "/health/pool"])
+def test_worker_statistics_require_a_token(client, path):
+    assert client.get(f"{settings.api_prefix or ''}{path}").status_code == 401
+
+
+def test_worker_statistics_for_admins(client):
+    client.app.dependency_overrides[health.stats_permission] = lambda: None
+    response = client.get(f"{settings.api_prefix or ''}/health/caches")
+    assert response.status_code == 200
+    assert set(response.json()) == {"principal", "token"}
+
+
+def test_metrics_require_a_token():
+    if not settings.metrics_enabled:
+        pytest.skip("metrics are disabled")
+    assert TestClient(create_app()).get("/metrics").status_code == 401
+
+
+@pytest.mark.parametrize("header, expected", [(None, 401), ("Bearer wrong", 401), ("Bearer s3cret", 200)])
+def test_scraper_token(monkeypatch, header, expected):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    app = FastAPI()
+
+    @app.get("/scrape")
+    async def scrape(_: None = Depends(metrics._require_scraper_token)):
+        return {}
+
+    headers = {"Authorization": header} if header else {}
+    assert TestClient(app).get("/scrape", headers=headers).status_code == expected
@@ -0,0 +1,40 @@
+import pytest
+
+from app.security import jwt
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch):
+    cache = TTLCache(maxsize=16, ttl=3600)
+    monkeypatch.setattr(jwt, "_token_cache", cache)
+    return cache
+
+
+def test_verified_claims_are_cached(monkeypatch, token_cache):
+    token = jwt.create_access_token("ana@hospital.com", claims={"role": "ADMIN"})
+    claims = jwt.verify_token(token)
+    assert claims["sub"] == "ana@hospital.com" and claims["role"] == "ADMIN"
+
+    monkeypatch.setattr(jwt, "decode_token", lambda token: pytest.fail("decoded again"))
+    assert jwt.verify_token(token) is claims
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_cached_claims_are_read_only():
+    claims = jwt.verify_token(jwt.create_access_token("ana@hospital.com"))
+    with pytest.raises(TypeError):
+        claims["sub"] = "eve@hospital.com"
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        jwt.create_access_token("ana@hospital.com", expires_in_seconds=-10),
+        jwt.create_access_token("ana@hospital.com")[:-2] + "xx",
+        "not-a-token",
+    ],
+)
+def test_invalid_tokens_are_rejected_and_not_cached(token, token_cache):
+    assert jwt.verify_token(token) is None
+    assert token_cache.stats()["size"] == 0
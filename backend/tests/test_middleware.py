@@ -0,0 +1,37 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware import CorrelationIdMiddleware
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CorrelationIdMiddleware)
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"correlation_id": request.state.correlation_id}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_correlation_id_is_echoed_and_timing_reported():
+    response = _client().get("/ping", headers={"X-Correlation-Id": "abc-123"})
+
+    assert response.headers["X-Correlation-Id"] == "abc-123"
+    assert response.json() == {"correlation_id": "abc-123"}
+    db_timing, app_timing = response.headers["Server-Timing"].split(", ")
+    assert db_timing.startswith("db;dur=") and db_timing.endswith(';desc="0 queries"')
+    assert app_timing.startswith("app;dur=")
+
+
+def test_streaming_responses_pass_through():
+    response = _client().get("/stream")
+
+    assert response.text == "abc"
+    assert response.headers["X-Correlation-Id"]
@@ -0,0 +1,17 @@
+import multiprocessing
+
+from app.config import settings
+from app.security import password
+
+
+def test_shutdown_executor_stops_the_hashing_workers(monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_workers", 1)
+    assert password.hash_password("123456").startswith("$2b$")
+    assert multiprocessing.active_children()
+
+    password.shutdown_executor()
+
+    assert password._executor is None
+    for child in multiprocessing.active_children():
+        child.join(5)
+    assert not multiprocessing.active_children()
@@ -0,0 +1,105 @@
+import json
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.dependencies import get_session
+from app.main import create_app
+from app.models.enums import RoleEnum
+from app.models.patient import Patient
+from app.models.user import User
+from app.routers import patients
+from app.schemas.auth import Principal
+from app.services import patient_service
+
+
+def _row(line, email, document):
+    payload = {"name": "Maria", "email": email, "document": document, "birth_date": date(1990, 5, 10)}
+    return line, {**payload, "gender": "FEMALE"}
+
+
+def test_rows_taken_after_the_check_become_row_errors(db, monkeypatch):
+    rows = [_row(1, "maria@hospital.com", "111"), _row(2, "joana@hospital.com", "222")]
+    patient_service.import_patients(db, rows, create_portal_users=False)
+    db.commit()
+    # A concurrent import committed the first two rows after this batch checked the keys.
+    checks = iter([(set(), set())])
+    real = patient_service._taken_keys
+    monkeypatch.setattr(patient_service, "_taken_keys", lambda *args: next(checks, None) or real(*args))
+
+    imported, errors = patient_service.import_patients(
+        db,
+        [_row(2, "MARIA@hospital.com", "333"), _row(3, "ana@hospital.com", "222"), _row(4, "bia@hospital.com", "444")],
+        create_portal_users=False,
+    )
+
+    assert imported == 1
+    assert errors == [
+        (2, "email", "E-mail already used by another patient."),
+        (3, "document", "Document already used by another patient."),
+    ]
+    assert db.query(Patient).count() == 3
+
+
+@pytest.fixture()
+def client(session_override, monkeypatch):
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    monkeypatch.setattr(settings, "password_hash_workers", 0)
+    app = create_app()
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[patients.write_permission] = lambda: Principal(
+        id=uuid4(), email="admin@hospital.com", role=RoleEnum.ADMIN
+    )
+    return TestClient(app)
+
+
+_CSV = """name,email,document,birth_date,gender
+Maria,maria@hospital.com,111,1990-05-10,FEMALE
+Joana,not-an-email,222,1990-05-10,FEMALE
+Ana,ana@hospital.com,111,1990-05-10,FEMALE
+Bia,bia@hospital.com,333,1990-05-10,OTHER
+Carla,carla@hospital.com,444,1990-05-10,FEMALE
+"""
+
+
+def test_csv_import_reports_rejected_rows(client, make_session):
+    response = client.post(
+        f"{settings.api_prefix or ''}/patients/import?create_users=false",
+        content=_CSV,
+        headers={"Content-Type": "text/csv"},
+    )
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["received"], report["imported"], report["failed"]) == (5, 3, 2)
+    assert [(error["line"], error["field"]) for error in report["errors"]] == [(3, "email"), (4, "document")]
+    with make_session() as db:
+        assert {email for (email,) in db.query(Patient.email)} == {
+            "maria@hospital.com",
+            "bia@hospital.com",
+            "carla@hospital.com",
+        }
+
+
+def test_ndjson_import_creates_portal_users(client, make_session):
+    body = "\n".join(
+        [
+            json.dumps({"name": "Maria", "email": "Maria@hospital.com", "document": "111", "birth_date": "1990-05-10", "gender": "FEMALE"}),
+            "{not json",
+        ]
+    )
+    response = client.post(
+        f"{settings.api_prefix or ''}/patients/import",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200, response.text
+    assert (response.json()["imported"], response.json()["failed"]) == (1, 1)
+    with make_session() as db:
+        patient = db.query(Patient).one()
+        user = db.get(User, patient.user_id)
+        assert (user.email, user.role) == ("maria@hospital.com", RoleEnum.PATIENT)
@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine, text
+
+from app.pool import InstrumentedQueuePool, ping_idle_on_checkout
+
+
+def _engine(tmp_path, monkeypatch, idle_seconds):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0)
+    ping_idle_on_checkout(engine, idle_seconds)
+    pings = []
+    ping = engine.dialect.do_ping
+
+    def counting_ping(dbapi_connection):
+        pings.append(dbapi_connection)
+        return ping(dbapi_connection)
+
+    monkeypatch.setattr(engine.dialect, "do_ping", counting_ping)
+    return engine, pings
+
+
+def test_only_idle_connections_are_pinged(tmp_path, monkeypatch):
+    engine, pings = _engine(tmp_path, monkeypatch, idle_seconds=3600)
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("select 1"))
+    assert pings == []
+
+    engine, pings = _engine(tmp_path, monkeypatch, idle_seconds=1e-9)
+    with engine.connect():
+        pass
+    with engine.connect() as connection:
+        assert connection.execute(text("select 1")).scalar() == 1
+    assert len(pings) == 1
+
+
+def test_dead_idle_connection_is_replaced(tmp_path, monkeypatch):
+    engine, pings = _engine(tmp_path, monkeypatch, idle_seconds=1e-9)
+    with engine.connect() as connection:
+        dead = connection.connection.dbapi_connection
+    dead.close()
+
+    with engine.connect() as connection:
+        assert connection.execute(text("select 1")).scalar() == 1
+        assert connection.connection.dbapi_connection is not dead
+    assert pings == [dead]
+    assert (engine.pool.checkedin(), engine.pool.checkedout()) == (1, 0)
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import reference_data
+from app.main import create_app
+from app.models.doctor import Doctor
+from app.routers import domains
+from app.services import doctor_service
+
+
+@pytest.fixture()
+def client(make_session, monkeypatch):
+    monkeypatch.setattr(reference_data, "_bundle", None)
+    monkeypatch.setattr(reference_data, "ReadSessionLocal", make_session)
+    monkeypatch.setattr(reference_data, "read_engine", lambda use_primary=False: make_session.kw["bind"])
+    app = create_app()
+    app.dependency_overrides[domains.read_permission] = lambda: None
+    return TestClient(app)
+
+
+@pytest.fixture()
+def doctor(make_session):
+    with make_session() as db:
+        doctor = Doctor(name="Ana", email="ana@hospital.com", crm="123-sp", specialty="Cardiologia")
+        db.add(doctor)
+        db.commit()
+    return doctor
+
+
+def _specialties(response):
+    return [specialty["code"] for specialty in response.json()["specialties"]]
+
+
+def test_unchanged_bundle_is_not_modified(client, doctor):
+    response = client.get("/domains/bundle")
+    assert response.status_code == 200
+    assert _specialties(response) == ["Cardiologia"]
+    etag = response.headers["ETag"]
+    assert etag == f'"{response.json()["version"]}"'
+
+    response = client.get("/domains/bundle", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_committed_specialty_change_rebuilds_the_bundle(client, make_session, doctor):
+    etag = client.get("/domains/bundle").headers["ETag"]
+
+    with make_session() as db:
+        doctor_service.update_doctor(db, doctor.id, {"specialty": "Pediatria"})
+        assert client.get("/domains/bundle", headers={"If-None-Match": etag}).status_code == 304
+        db.commit()
+
+    response = client.get("/domains/bundle", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert _specialties(response) == ["Pediatria"]
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,25 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "run_migrations", Path(__file__).resolve().parent.parent / "scripts" / "run_migrations.py"
+)
+run_migrations = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(run_migrations)
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("/* Description */\n\n-- migrate:no-transaction\n\nCREATE INDEX CONCURRENTLY ix ON t (c);", True),
+        ("-- migrate:no-transaction\nCREATE INDEX CONCURRENTLY ix ON t (c);", True),
+        ("/* Description */\nCREATE TABLE t (c int);\n-- migrate:no-transaction\n", False),
+        ("CREATE TABLE t (c int); -- migrate:no-transaction\n", False),
+        ("/*\n-- migrate:no-transaction\n*/\nCREATE TABLE t (c int);", False),
+    ],
+)
+def test_directive_only_counts_before_the_first_statement(sql, expected):
+    assert run_migrations.is_non_transactional(sql) is expected
+
@@ -0,0 +1,49 @@
+import anyio
+
+from app.utils.streaming import ExportFormat, export_response
+
+
+class _Session:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _export(db):
+    return export_response(db, iter(range(100_000)), lambda n: {"n": n}, ExportFormat.NDJSON, "numbers")
+
+
+async def _stream(response, *, disconnect_after):
+    sent = []
+    disconnected = anyio.Event()
+
+    async def send(message):
+        sent.append(message)
+        if len(sent) > disconnect_after:
+            disconnected.set()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    await response({"type": "http", "method": "GET", "path": "/export", "headers": []}, receive, send)
+    return sent
+
+
+def test_session_is_closed_when_the_client_disconnects():
+    db = _Session()
+
+    sent = anyio.run(lambda: _stream(_export(db), disconnect_after=2))
+
+    assert sent[-1].get("more_body", True)
+    assert db.closed
+
+
+def test_session_is_closed_after_a_complete_export():
+    db = _Session()
+
+    sent = anyio.run(lambda: _stream(_export(db), disconnect_after=10**9))
+
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert db.closed
@@ -0,0 +1,42 @@
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.dependencies import get_session
+from app.main import create_app
+from app.models.enums import RoleEnum
+from app.models.user import User
+from app.routers import users
+from app.schemas.auth import Principal
+from app.schemas.user import UserBulkRoleUpdate, UserCreate, UserRoleUpdate
+
+
+@pytest.fixture()
+def client(session_override):
+    app = create_app()
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[users.write_permission] = lambda: Principal(
+        id=uuid4(), email="admin@hospital.com", role=RoleEnum.ADMIN
+    )
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("model", [UserCreate, UserRoleUpdate, UserBulkRoleUpdate])
+@pytest.mark.parametrize("role", ["DOCTOR", RoleEnum.DOCTOR, {"code": "DOCTOR", "label": "Médico"}])
+def test_role_schemas_accept_code_enum_and_object(model, role):
+    payload = {"name": "Ana", "email": "ana@hospital.com", "password": "123456", "ids": [str(uuid4())], "role": role}
+    assert model.model_validate(payload).role == "DOCTOR"
+
+
+def test_change_role_accepts_the_role_object(client, make_session):
+    with make_session() as db:
+        user = User(name="Ana", email="ana@hospital.com", password="hash", role=RoleEnum.PATIENT)
+        db.add(user)
+        db.commit()
+
+    response = client.patch(f"{settings.api_prefix or ''}/users/{user.id}/role", json={"role": {"code": "DOCTOR", "label": "Médico"}})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["role"]["code"] == "DOCTOR"
@@ -0,0 +1,45 @@
+import pytest
+
+from app.models.enums import RoleEnum
+from app.models.user import User
+from app.security import password
+from app.services import user_service
+from app.utils import pagination
+from app.utils.cache import TTLCache
+
+
+def test_duplicate_email_is_refused_before_hashing(db, monkeypatch):
+    db.add(User(name="Ana", email="ana@hospital.com", password="hash", role=RoleEnum.PATIENT))
+    db.commit()
+    hashed = []
+    monkeypatch.setattr(password, "hash_password", hashed.append)
+
+    with pytest.raises(user_service.EmailAlreadyInUseError):
+        user_service.create_user(db, {"name": "Ana", "email": "ANA@hospital.com", "password": "123456", "role": "PATIENT"})
+
+    assert hashed == []
+
+
+def _count_users(db):
+    _, total, _, _ = user_service.list_users(
+        db, page=0, size=10, role=None, text=None, sort_field="name", sort_direction="asc"
+    )
+    return total
+
+
+def test_cached_count_is_dropped_only_when_the_delete_commits(db, monkeypatch):
+    monkeypatch.setattr(pagination, "_count_cache", TTLCache(maxsize=16, ttl=60))
+    users = [User(name=name, email=f"{name}@hospital.com", password="hash", role=RoleEnum.PATIENT) for name in ("ana", "bia")]
+    db.add_all(users)
+    db.commit()
+    assert _count_users(db) == 2
+
+    user_service.delete_user(db, users[0].id)
+    db.flush()
+    assert _count_users(db) == 2
+    db.rollback()
+    assert _count_users(db) == 2
+
+    user_service.delete_user(db, users[0].id)
+    db.commit()
+    assert _count_users(db) == 1
@@ -2,7 +2,22 @@ export type PaginatedResponse<T> = {
   content: T[];
   page: number;
   size: number;
-  totalElements: number;
-  totalPages: number;
+  /** Missing or null when the listing was requested with `count=none`. */
+  totalElements?: number | null;
+  totalPages?: number | null;
+  totalType?: 'exact' | 'estimate' | 'none';
   last: boolean;
+  nextCursor?: string | null;
 };
+
+/**
+ * Length to give the paginator. Without a total, the pages seen so far are counted,
+ * plus one more item when this is not the last page so "next" stays enabled.
+ */
+export function paginatorLength<T>(response: PaginatedResponse<T>): number {
+  if (response.totalElements != null) {
+    return response.totalElements;
+  }
+  const seen = response.page * response.size + response.content.length;
+  return response.last ? seen : seen + 1;
+}
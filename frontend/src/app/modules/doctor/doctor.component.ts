@@ -7,6 +7,7 @@ import { ToastrService } from 'ngx-toastr';
 
 import { Doctor, DoctorPayload, DoctorQueryParams } from '../../models/doctor';
 import { DoctorService } from '../../services/doctor.service';
+import { paginatorLength } from '../../models/paginated-response';
 import { DialogService } from '../../layout/dialog/dialog.service';
 import { DoctorFormComponent } from './doctor-form/doctor-form.component';
 
@@ -76,9 +77,9 @@ export class DoctorComponent implements OnInit, AfterViewInit {
       specialty: this.specialtyFilter,
     };
 
-    this.doctorService.list(params).subscribe(({ content, totalElements }) => {
-      this.doctors = content;
-      this.totalItems = totalElements;
+    this.doctorService.list(params).subscribe((response) => {
+      this.doctors = response.content;
+      this.totalItems = paginatorLength(response);
     });
   }
 
@@ -9,6 +9,7 @@ import { Domain } from '../../models/domain';
 import { Patient, PatientPayload, PatientQueryParams } from '../../models/patient';
 import { PatientService } from '../../services/patient.service';
 import { DomainService } from '../../services/domain.service';
+import { paginatorLength } from '../../models/paginated-response';
 import { DialogService } from '../../layout/dialog/dialog.service';
 import { PatientFormComponent } from './patient-form/patient-form.component';
 
@@ -94,7 +95,7 @@ export class PatientComponent implements OnInit, AfterViewInit {
     this.patientService.list(params).subscribe({
       next: (response) => {
         this.patients = response.content;
-        this.totalItems = response.totalElements;
+        this.totalItems = paginatorLength(response);
       }
     });
   }
@@ -10,6 +10,7 @@ import { Domain } from '../../models/domain';
 import { UserService } from '../../services/user.service';
 import { DomainService } from '../../services/domain.service';
 import { DialogService } from '../../layout/dialog/dialog.service';
+import { paginatorLength } from '../../models/paginated-response';
 import { UserFormComponent } from './user-form/user-form.component';
 import { RoleFormComponent } from './role-form/role-form.component';
 
@@ -89,7 +90,7 @@ export class UserComponent implements OnInit, AfterViewInit {
     this.userService.list(params).subscribe({
       next: (response) => {
         this.users = response.content;
-        this.totalItems = response.totalElements;
+        this.totalItems = paginatorLength(response);
       }
     });
   }